@@ -5,8 +5,32 @@ from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+from . import cli
 from .config import load_config
-from .repositories import FirestoreGateway, TinyDbGateway
+from .routes import unit_of_work
+from .routes.responses import PydanticJSONProvider
+from .repositories import (
+    AsyncFirestoreGateway,
+    AsyncGatewayAdapter,
+    AsyncInstrumentedGateway,
+    CachingGateway,
+    CollectionVersions,
+    FirestoreGateway,
+    GatewayMetrics,
+    InstrumentedGateway,
+    SnapshotStore,
+    SqliteGateway,
+    TinyDbGateway,
+    VersionedGateway,
+)
+from .models import RendaVariavelTipo
+from .services.historico import COLUNAS
+from .services.cotacoes import (
+    LocalQuoteProvider,
+    PeriodicRefresh,
+    QuoteCache,
+    QuoteFetcher,
+)
 
 
 def create_app(env: str | None = None) -> Flask:
@@ -14,9 +38,13 @@ def create_app(env: str | None = None) -> Flask:
     load_dotenv()
 
     app = Flask(__name__)
+    app.json = PydanticJSONProvider(app)
     app.config.from_mapping(load_config(env))
 
     _configure_data_gateway(app)
+    _configure_quotes(app)
+    _configure_snapshots(app)
+    unit_of_work.register(app)
 
     cors_origins = app.config.get("CORS_ORIGINS")
     cors_resources = {r"/*": {"origins": cors_origins}} if cors_origins else None
@@ -24,17 +52,20 @@ def create_app(env: str | None = None) -> Flask:
     CORS(app, **cors_kwargs)
 
     register_blueprints(app)
+    cli.register(app)
     return app
 
 
 def register_blueprints(app: Flask) -> None:
     """Register Flask blueprints grouped by domain."""
-    from .routes import home, passivos, renda_fixa, renda_variavel
+    from .routes import historico, home, passivos, renda_fixa, renda_variavel, resumo
 
+    historico.register(app)
     home.register(app)
     passivos.register(app)
     renda_variavel.register(app)
     renda_fixa.register(app)
+    resumo.register(app)
 
 
 def _configure_data_gateway(app: Flask) -> None:
@@ -44,11 +75,108 @@ def _configure_data_gateway(app: Flask) -> None:
 
     if backend == "tinydb":
         tinydb_path = app.config.get("TINYDB_FILE") or "var/tinydb.json"
-        gateway = TinyDbGateway.from_file(tinydb_path)
+        gateway = TinyDbGateway.from_file(
+            tinydb_path,
+            storage=app.config.get("TINYDB_STORAGE") or "json",
+        )
+    elif backend == "sqlite":
+        gateway = SqliteGateway.from_file(app.config.get("SQLITE_FILE") or "var/app.sqlite3")
     else:
         gateway = FirestoreGateway.from_settings(
             project_id=app.config.get("FIRESTORE_PROJECT_ID")
         )
 
+    metrics: GatewayMetrics | None = None
+    if app.config.get("GATEWAY_METRICS_ENABLED", True):
+        # Instrument below the cache so only real round trips are counted.
+        metrics = GatewayMetrics()
+        gateway = InstrumentedGateway(gateway, metrics)
+
+    cache_ttl = float(app.config.get("GATEWAY_CACHE_TTL_SECONDS") or 0)
+    if cache_ttl > 0:
+        gateway = CachingGateway(
+            gateway,
+            ttl_seconds=cache_ttl,
+            max_entries=int(app.config.get("GATEWAY_CACHE_MAX_ENTRIES") or 1024),
+        )
+
+    if backend == "tinydb":
+        # TinyDB is not thread-safe: async reads run inline on the loop.
+        async_gateway = AsyncGatewayAdapter(gateway)
+    elif backend == "sqlite" or cache_ttl > 0:
+        # Thread-safe gateways overlap gathered reads on worker threads.
+        async_gateway = AsyncGatewayAdapter(gateway, offload=True)
+    else:
+        async_gateway = AsyncFirestoreGateway.from_settings(
+            project_id=app.config.get("FIRESTORE_PROJECT_ID")
+        )
+        if metrics is not None:
+            async_gateway = AsyncInstrumentedGateway(async_gateway, metrics)
+
+    # Counters live in the datastore, so writes from other processes count.
+    versions = CollectionVersions(gateway)
+    # Outermost, so every write bumps the versions behind the ETags: in
+    # requests, background jobs and CLI commands alike.
+    gateway = VersionedGateway(gateway, versions)
+
     app.extensions["data_gateway"] = gateway
-    app.config["DATA_GATEWAY_FACTORY"] = lambda gateway=gateway: gateway
+    app.extensions["async_data_gateway"] = async_gateway
+    app.extensions["gateway_metrics"] = metrics
+    app.extensions["collection_versions"] = versions
+    app.config["DATA_GATEWAY_FACTORY"] = lambda gateway=gateway: unit_of_work.request_gateway(
+        gateway
+    )
+    app.config["ASYNC_DATA_GATEWAY_FACTORY"] = lambda async_gateway=async_gateway: async_gateway
+
+
+def _configure_quotes(app: Flask) -> None:
+    """Attach the quote fetcher and, when configured, schedule its refresh."""
+
+    provider_name = app.config.get("QUOTE_PROVIDER")
+    if provider_name is None:
+        app.extensions["quote_fetcher"] = None
+        return
+    if provider_name != "local":
+        raise ValueError(f"provedor de cotacoes desconhecido: {provider_name}")
+
+    quotes_file = app.config.get("QUOTES_FILE")
+    max_concorrencia = int(app.config.get("QUOTE_MAX_CONCURRENCY") or 4)
+    provider = (
+        LocalQuoteProvider.from_file(quotes_file, max_concorrencia=max_concorrencia)
+        if quotes_file
+        else LocalQuoteProvider(max_concorrencia=max_concorrencia)
+    )
+    cache_ttl = float(app.config.get("QUOTE_CACHE_TTL_SECONDS") or 0)
+    app.extensions["quote_fetcher"] = QuoteFetcher(
+        dict.fromkeys(RendaVariavelTipo, provider),
+        QuoteCache(cache_ttl) if cache_ttl > 0 else None,
+    )
+
+    interval = float(app.config.get("QUOTE_REFRESH_INTERVAL_SECONDS") or 0)
+    if interval > 0 and not app.testing:
+        from .routes.renda_variavel import build_quote_refresher
+
+        refresh = PeriodicRefresh(app, interval, lambda: build_quote_refresher().refresh())
+        refresh.start()
+        app.extensions["quote_refresh"] = refresh
+
+
+def _configure_snapshots(app: Flask) -> None:
+    """Open the daily snapshot store and, when configured, schedule the snapshot."""
+
+    snapshots_dir = app.config.get("SNAPSHOTS_DIR")
+    if not snapshots_dir:
+        app.extensions["snapshot_store"] = None
+        return
+    app.extensions["snapshot_store"] = SnapshotStore(snapshots_dir, COLUNAS)
+
+    interval = float(app.config.get("SNAPSHOT_INTERVAL_SECONDS") or 0)
+    if interval > 0 and not app.testing:
+        from .routes.historico import build_snapshot_service
+
+        # Runs more than once a day are no-ops until the date changes.
+        snapshot = PeriodicRefresh(
+            app, interval, lambda: build_snapshot_service().registrar(), nome="daily-snapshot"
+        )
+        snapshot.start()
+        app.extensions["snapshot_job"] = snapshot
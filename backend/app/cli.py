@@ -0,0 +1,80 @@
+"""Flask CLI commands (run with ``flask --app wsgi <command>``)."""
+from __future__ import annotations
+
+import click
+from flask import Flask
+from flask.cli import with_appcontext
+
+from .services import ImportacaoError, TradeNotAllowedError
+from .services.importacao import ler_csv
+
+
+@click.command("importar-transacoes")
+@click.argument("arquivo", type=click.File("r", encoding="utf-8-sig", lazy=False))
+@with_appcontext
+def importar_transacoes(arquivo) -> None:
+    """Import renda variavel trades from a broker note CSV export."""
+
+    from .routes.renda_variavel import build_import_service
+
+    try:
+        result = build_import_service().importar(ler_csv(arquivo))
+    except ImportacaoError as exc:
+        for erro in exc.erros:
+            click.echo(f"erro: {erro}", err=True)
+        raise click.ClickException(str(exc)) from exc
+    except TradeNotAllowedError as exc:
+        raise click.ClickException(str(exc)) from exc
+
+    click.echo(
+        f"{result['transacoes']} transacoes importadas em {result['posicoes']} posicoes "
+        f"({result['criadas']} criadas, {result['reprocessadas']} reprocessadas)"
+    )
+
+
+@click.command("atualizar-cotacoes")
+@with_appcontext
+def atualizar_cotacoes() -> None:
+    """Fetch the quotes of every renda variavel position once."""
+
+    from .routes.renda_variavel import build_quote_refresher
+
+    try:
+        refresher = build_quote_refresher()
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc)) from exc
+    result = refresher.refresh()
+
+    click.echo(
+        f"{result['atualizadas']} cotacoes atualizadas, {result['inalteradas']} inalteradas"
+    )
+    if result["falhas"]:
+        click.echo(f"sem cotacao: {', '.join(result['falhas'])}", err=True)
+
+
+@click.command("registrar-snapshot")
+@click.option("--data", "dia", type=click.DateTime(["%Y-%m-%d"]), default=None)
+@with_appcontext
+def registrar_snapshot(dia) -> None:
+    """Append today's (or --data's) snapshot of the positions to the history."""
+
+    from .routes.historico import build_snapshot_service
+
+    try:
+        service = build_snapshot_service()
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc)) from exc
+
+    dia = dia.date() if dia is not None else None
+    if service.registrar(dia):
+        click.echo("snapshot registrado")
+    else:
+        click.echo("snapshot ja registrado para a data")
+
+
+def register(app: Flask) -> None:
+    """Attach the commands to the app's CLI group."""
+
+    app.cli.add_command(importar_transacoes)
+    app.cli.add_command(atualizar_cotacoes)
+    app.cli.add_command(registrar_snapshot)
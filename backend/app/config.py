@@ -16,6 +16,19 @@ class Config:
     cors_origins: str | list[str] | None = None
     data_backend: str = "firestore"
     tinydb_file: str | None = None
+    tinydb_storage: str = "json"
+    sqlite_file: str | None = None
+    gateway_cache_ttl_seconds: float = 0.0
+    gateway_cache_max_entries: int = 1024
+    gateway_metrics_enabled: bool = True
+    ledger_replay_workers: int = 0
+    quote_provider: str | None = None
+    quotes_file: str | None = None
+    quote_cache_ttl_seconds: float = 60.0
+    quote_refresh_interval_seconds: float = 0.0
+    quote_max_concurrency: int = 4
+    snapshots_dir: str | None = None
+    snapshot_interval_seconds: float = 0.0
 
 
 def load_config(env: str | None = None) -> Dict[str, Any]:
@@ -28,6 +41,20 @@ def load_config(env: str | None = None) -> Dict[str, Any]:
     cors_origins_env = os.environ.get("CORS_ORIGINS")
     data_backend = (os.environ.get("DATA_BACKEND") or "firestore").lower()
     tinydb_file = os.environ.get("TINYDB_FILE")
+    tinydb_storage = (os.environ.get("TINYDB_STORAGE") or "json").lower()
+    sqlite_file = os.environ.get("SQLITE_FILE")
+    gateway_cache_ttl_seconds = float(os.environ.get("GATEWAY_CACHE_TTL_SECONDS") or 0)
+    gateway_cache_max_entries = int(os.environ.get("GATEWAY_CACHE_MAX_ENTRIES") or 1024)
+    metrics_flag = (os.environ.get("GATEWAY_METRICS_ENABLED") or "true").lower()
+    gateway_metrics_enabled = metrics_flag not in {"0", "false", "no"}
+    ledger_replay_workers = int(os.environ.get("LEDGER_REPLAY_WORKERS") or 0)
+    quote_provider = (os.environ.get("QUOTE_PROVIDER") or "").lower() or None
+    quotes_file = os.environ.get("QUOTES_FILE")
+    quote_cache_ttl_seconds = float(os.environ.get("QUOTE_CACHE_TTL_SECONDS") or 60)
+    quote_refresh_interval_seconds = float(os.environ.get("QUOTE_REFRESH_INTERVAL_SECONDS") or 0)
+    quote_max_concurrency = int(os.environ.get("QUOTE_MAX_CONCURRENCY") or 4)
+    snapshots_dir = os.environ.get("SNAPSHOTS_DIR")
+    snapshot_interval_seconds = float(os.environ.get("SNAPSHOT_INTERVAL_SECONDS") or 0)
 
     cors_origins: str | list[str] | None = None
     if cors_origins_env:
@@ -43,6 +70,19 @@ def load_config(env: str | None = None) -> Dict[str, Any]:
                 cors_origins=cors_origins,
                 data_backend=data_backend,
                 tinydb_file=tinydb_file,
+                tinydb_storage=tinydb_storage,
+                sqlite_file=sqlite_file,
+                gateway_cache_ttl_seconds=gateway_cache_ttl_seconds,
+                gateway_cache_max_entries=gateway_cache_max_entries,
+                gateway_metrics_enabled=gateway_metrics_enabled,
+                ledger_replay_workers=ledger_replay_workers,
+                quote_provider=quote_provider,
+                quotes_file=quotes_file,
+                quote_cache_ttl_seconds=quote_cache_ttl_seconds,
+                quote_refresh_interval_seconds=quote_refresh_interval_seconds,
+                quote_max_concurrency=quote_max_concurrency,
+                snapshots_dir=snapshots_dir,
+                snapshot_interval_seconds=snapshot_interval_seconds,
             )
         case "testing":
             config = Config(
@@ -53,6 +93,19 @@ def load_config(env: str | None = None) -> Dict[str, Any]:
                 cors_origins=cors_origins,
                 data_backend=data_backend or "tinydb",
                 tinydb_file=tinydb_file or ":memory:",
+                tinydb_storage=tinydb_storage,
+                sqlite_file=sqlite_file or ":memory:",
+                gateway_cache_ttl_seconds=gateway_cache_ttl_seconds,
+                gateway_cache_max_entries=gateway_cache_max_entries,
+                gateway_metrics_enabled=gateway_metrics_enabled,
+                ledger_replay_workers=ledger_replay_workers,
+                quote_provider=quote_provider,
+                quotes_file=quotes_file,
+                quote_cache_ttl_seconds=quote_cache_ttl_seconds,
+                quote_refresh_interval_seconds=quote_refresh_interval_seconds,
+                quote_max_concurrency=quote_max_concurrency,
+                snapshots_dir=snapshots_dir,
+                snapshot_interval_seconds=snapshot_interval_seconds,
             )
         case _:
             config = Config(
@@ -63,6 +116,19 @@ def load_config(env: str | None = None) -> Dict[str, Any]:
                 cors_origins=cors_origins or "http://localhost:5173",
                 data_backend=data_backend,
                 tinydb_file=tinydb_file or "var/tinydb.json",
+                tinydb_storage=tinydb_storage,
+                sqlite_file=sqlite_file or "var/app.sqlite3",
+                gateway_cache_ttl_seconds=gateway_cache_ttl_seconds,
+                gateway_cache_max_entries=gateway_cache_max_entries,
+                gateway_metrics_enabled=gateway_metrics_enabled,
+                ledger_replay_workers=ledger_replay_workers,
+                quote_provider=quote_provider,
+                quotes_file=quotes_file,
+                quote_cache_ttl_seconds=quote_cache_ttl_seconds,
+                quote_refresh_interval_seconds=quote_refresh_interval_seconds,
+                quote_max_concurrency=quote_max_concurrency,
+                snapshots_dir=snapshots_dir or "var/snapshots",
+                snapshot_interval_seconds=snapshot_interval_seconds,
             )
 
     return {
@@ -74,4 +140,17 @@ def load_config(env: str | None = None) -> Dict[str, Any]:
         "CORS_ORIGINS": config.cors_origins,
         "DATA_BACKEND": config.data_backend,
         "TINYDB_FILE": config.tinydb_file,
+        "TINYDB_STORAGE": config.tinydb_storage,
+        "SQLITE_FILE": config.sqlite_file,
+        "GATEWAY_CACHE_TTL_SECONDS": config.gateway_cache_ttl_seconds,
+        "GATEWAY_CACHE_MAX_ENTRIES": config.gateway_cache_max_entries,
+        "GATEWAY_METRICS_ENABLED": config.gateway_metrics_enabled,
+        "LEDGER_REPLAY_WORKERS": config.ledger_replay_workers,
+        "QUOTE_PROVIDER": config.quote_provider,
+        "QUOTES_FILE": config.quotes_file,
+        "QUOTE_CACHE_TTL_SECONDS": config.quote_cache_ttl_seconds,
+        "QUOTE_REFRESH_INTERVAL_SECONDS": config.quote_refresh_interval_seconds,
+        "QUOTE_MAX_CONCURRENCY": config.quote_max_concurrency,
+        "SNAPSHOTS_DIR": config.snapshots_dir,
+        "SNAPSHOT_INTERVAL_SECONDS": config.snapshot_interval_seconds,
     }
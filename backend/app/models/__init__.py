@@ -3,12 +3,16 @@ from .passivo import Passivo, PassivoCategoria
 from .renda_fixa import RendaFixaIndexador, RendaFixaPosition, RendaFixaTipo
 from .renda_variavel import (
     Moeda,
+    RendaVariavelCheckpoint,
+    RendaVariavelCotacoes,
     RendaVariavelPosition,
     RendaVariavelProvento,
     RendaVariavelTradeInput,
     RendaVariavelTipo,
     RendaVariavelTrade,
+    as_utc,
 )
+from .resumo import Resumo, ResumoGrupo
 
 __all__ = [
     "Moeda",
@@ -17,9 +21,14 @@ __all__ = [
     "RendaFixaIndexador",
     "RendaFixaPosition",
     "RendaFixaTipo",
+    "RendaVariavelCheckpoint",
+    "RendaVariavelCotacoes",
     "RendaVariavelPosition",
     "RendaVariavelProvento",
     "RendaVariavelTradeInput",
     "RendaVariavelTipo",
     "RendaVariavelTrade",
+    "Resumo",
+    "ResumoGrupo",
+    "as_utc",
 ]
@@ -1,11 +1,21 @@
 """Domain models for renda variavel assets."""
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PositiveFloat, RootModel, field_validator
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Datas sem fuso sao tratadas como UTC; as demais sao convertidas para UTC."""
+
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
 
 
 class RendaVariavelTipo(str, Enum):
@@ -19,6 +29,14 @@ class RendaVariavelTipo(str, Enum):
     FUNDO_INVESTIMENTO = "fundo_investimento"
     OUTROS = "outros"
 
+    @property
+    def moeda(self) -> "Moeda":
+        """Moeda em que ativos do tipo sao negociados."""
+
+        if self in (RendaVariavelTipo.STOCK_US, RendaVariavelTipo.REIT):
+            return Moeda.USD
+        return Moeda.BRL
+
 
 class Moeda(str, Enum):
     """Moedas permitidas para ativos e proventos."""
@@ -59,6 +77,8 @@ class RendaVariavelTrade(BaseModel):
     resultado_monetario: Optional[float] = None
     performance_percentual: Optional[float] = None
 
+    _data_utc = field_validator("data")(as_utc)
+
 
 class RendaVariavelTradeInput(BaseModel):
     """Payload esperado para registrar uma nova transacao."""
@@ -68,6 +88,30 @@ class RendaVariavelTradeInput(BaseModel):
     cotacao: float = Field(gt=0)
     data: Optional[datetime] = None
 
+    _data_utc = field_validator("data")(as_utc)
+
+
+class RendaVariavelCotacoes(RootModel[dict[str, PositiveFloat]]):
+    """Payload de atualizacao de cotacoes: ``{ticker: cotacao}``."""
+
+
+class RendaVariavelCheckpoint(BaseModel):
+    """Saldo de uma posicao apos as primeiras ``trades`` transacoes em ordem de data.
+
+    O checkpoint de abertura (``trades == 0``, sem ``data``) guarda o saldo
+    anterior a qualquer transacao registrada.
+    """
+
+    id: Optional[str] = Field(default=None)
+    position_id: str = Field(min_length=1)
+    trades: int = Field(ge=0)
+    data: Optional[datetime] = None
+    quantidade: float = Field(ge=0)
+    preco_medio: float = Field(ge=0)
+    total_compra: float = Field(ge=0)
+
+    _data_utc = field_validator("data")(as_utc)
+
 
 class RendaVariavelProvento(BaseModel):
     """Proventos associados a ativos de renda variavel."""
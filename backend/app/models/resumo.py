@@ -0,0 +1,35 @@
+"""Materialised summary documents."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+class ResumoGrupo(BaseModel):
+    """Totais acumulados pelos documentos de um grupo (ex.: tipo fii)."""
+
+    quantidade: int = Field(default=0, ge=0)
+    totais: dict[str, float] = Field(default_factory=dict)
+
+
+class Resumo(BaseModel):
+    """Documento da coleção resumos, um por dominio.
+
+    ``grupos`` mapeia a dimensao (tipo, moeda, categoria...) para os
+    grupos dessa dimensao. ``mudancas`` guarda os pares ``(antes, depois)``
+    aplicados desde a leitura, reaplicados sobre o documento armazenado
+    ao salvar.
+    """
+
+    id: Optional[str] = Field(default=None)
+    dominio: str = Field(min_length=1)
+    grupos: dict[str, dict[str, ResumoGrupo]] = Field(default_factory=dict)
+    atualizado_em: Optional[datetime] = None
+
+    _mudancas: list[tuple[Any, Any]] = PrivateAttr(default_factory=list)
+
+    @property
+    def mudancas(self) -> list[tuple[Any, Any]]:
+        return self._mudancas
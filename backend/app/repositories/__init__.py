@@ -1,27 +1,50 @@
 """Data access layer interacting with Firestore collections."""
 
+from .async_firestore_gateway import AsyncFirestoreGateway
+from .async_gateway import AsyncGatewayAdapter
 from .base import FirestoreRepository
+from .caching_gateway import CachingGateway
 from .errors import DocumentConflictError, DocumentNotFoundError, PersistenceLayerError, RepositoryError
 from .firestore_gateway import FirestoreGateway
+from .instrumented_gateway import AsyncInstrumentedGateway, GatewayMetrics, InstrumentedGateway
+from .snapshot_store import SnapshotStore
+from .sqlite_gateway import SqliteGateway
 from .tinydb_gateway import TinyDbGateway
+from .unit_of_work import UnitOfWork
+from .versioned_gateway import CollectionVersions, VersionedGateway
 from .passivos import PassivosRepository
 from .renda_fixa import RendaFixaRepository
+from .resumos import ResumosRepository
 from .renda_variavel import (
+    RendaVariavelCheckpointsRepository,
     RendaVariavelPositionsRepository,
     RendaVariavelProventosRepository,
     RendaVariavelTradesRepository,
 )
 
 __all__ = [
+    "AsyncFirestoreGateway",
+    "AsyncGatewayAdapter",
+    "AsyncInstrumentedGateway",
+    "CachingGateway",
+    "CollectionVersions",
     "DocumentConflictError",
     "DocumentNotFoundError",
     "PersistenceLayerError",
     "RepositoryError",
     "FirestoreGateway",
+    "GatewayMetrics",
+    "InstrumentedGateway",
+    "SnapshotStore",
+    "SqliteGateway",
     "TinyDbGateway",
+    "UnitOfWork",
+    "VersionedGateway",
     "FirestoreRepository",
     "PassivosRepository",
     "RendaFixaRepository",
+    "ResumosRepository",
+    "RendaVariavelCheckpointsRepository",
     "RendaVariavelPositionsRepository",
     "RendaVariavelProventosRepository",
     "RendaVariavelTradesRepository",
@@ -0,0 +1,227 @@
+"""Asyncio Firestore gateway implementation."""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, Mapping, Sequence, TypeVar
+
+from google.api_core import exceptions as google_exceptions
+from google.cloud import firestore
+
+from .errors import DocumentNotFoundError, PersistenceLayerError
+from .firestore_gateway import FirestoreGateway, _filtered_query
+from .interfaces import AsyncFirestoreGatewayProtocol, QueryFilter
+
+T = TypeVar("T")
+
+
+def _on_gateway_loop(
+    method: Callable[..., Coroutine[Any, Any, T]]
+) -> Callable[..., Awaitable[T]]:
+    @functools.wraps(method)
+    async def wrapper(self: "AsyncFirestoreGateway", *args: Any, **kwargs: Any) -> T:
+        return await self._submit(method(self, *args, **kwargs))
+
+    return wrapper
+
+
+class AsyncFirestoreGateway(AsyncFirestoreGatewayProtocol):
+    """Gateway that wraps ``firestore.AsyncClient``.
+
+    The gRPC channel of an async client is bound to the event loop it was
+    created on, while Flask runs each async view on a loop of its own. The
+    gateway therefore keeps a single client, built from ``client_factory``,
+    on a long-lived loop running in a daemon thread; every call is sent to
+    that loop and awaited from the caller's.
+    """
+
+    MAX_BATCH_SIZE = FirestoreGateway.MAX_BATCH_SIZE
+
+    def __init__(self, client_factory: Callable[[], firestore.AsyncClient]):
+        self._client_factory = client_factory
+        self._client_instance: firestore.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(
+        cls,
+        project_id: str | None = None,
+    ) -> "AsyncFirestoreGateway":
+        """Factory that respects emulator configuration automatically."""
+
+        return cls(lambda: firestore.AsyncClient(project=project_id))
+
+    @property
+    def _client(self) -> firestore.AsyncClient:
+        # Only read by coroutines running on the gateway loop.
+        if self._client_instance is None:
+            self._client_instance = self._client_factory()
+        return self._client_instance
+
+    def _gateway_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="async-firestore", daemon=True
+                ).start()
+                self._loop = loop
+            return self._loop
+
+    async def _submit(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._gateway_loop())
+        return await asyncio.wrap_future(future)
+
+    @_on_gateway_loop
+    async def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        try:
+            collection_ref = self._client.collection(collection)
+            doc_ref = collection_ref.document(document_id) if document_id else collection_ref.document()
+            await doc_ref.set(dict(payload), merge=merge)
+            return doc_ref.id
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao salvar documento no firestore") from exc
+
+    @_on_gateway_loop
+    async def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        document_ids: list[str] = []
+        try:
+            client = self._client
+            collection_ref = client.collection(collection)
+            for start in range(0, len(documents), self.MAX_BATCH_SIZE):
+                batch = client.batch()
+                for document_id, payload in documents[start : start + self.MAX_BATCH_SIZE]:
+                    doc_ref = (
+                        collection_ref.document(document_id)
+                        if document_id
+                        else collection_ref.document()
+                    )
+                    batch.set(doc_ref, dict(payload), merge=merge)
+                    document_ids.append(doc_ref.id)
+                await batch.commit()
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao salvar documentos no firestore") from exc
+        return document_ids
+
+    @_on_gateway_loop
+    async def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        try:
+            await self._client.collection(collection).document(document_id).update(dict(payload))
+        except google_exceptions.NotFound as exc:
+            raise DocumentNotFoundError(f"documento {document_id} nao encontrado") from exc
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao atualizar documento no firestore") from exc
+
+    @_on_gateway_loop
+    async def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        try:
+            snapshot = await self._client.collection(collection).document(document_id).get()
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao buscar documento no firestore") from exc
+
+        if not snapshot.exists:
+            return None
+
+        data = snapshot.to_dict() or {}
+        data.setdefault("id", snapshot.id)
+        return data
+
+    @_on_gateway_loop
+    async def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        unique_ids = list(dict.fromkeys(document_ids))
+        if not unique_ids:
+            return {}
+        client = self._client
+        collection_ref = client.collection(collection)
+        references = [collection_ref.document(document_id) for document_id in unique_ids]
+        documents: dict[str, Mapping[str, Any]] = {}
+        try:
+            async for snapshot in client.get_all(references):
+                if not snapshot.exists:
+                    continue
+                data = snapshot.to_dict() or {}
+                data.setdefault("id", snapshot.id)
+                documents[snapshot.id] = data
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao buscar documentos no firestore") from exc
+        return documents
+
+    @_on_gateway_loop
+    async def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        query = _filtered_query(self._client.collection(collection), (), fields)
+        try:
+            return await _collect(query)
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao listar documentos no firestore") from exc
+
+    @_on_gateway_loop
+    async def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        query = _filtered_query(self._client.collection(collection), filters, fields)
+        if order_by:
+            direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            query = query.order_by(order_by, direction=direction)
+        if limit is not None:
+            query = query.limit(limit)
+
+        try:
+            return await _collect(query)
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao consultar documentos no firestore") from exc
+
+    @_on_gateway_loop
+    async def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        option = firestore.AsyncClient.write_option(exists=True) if must_exist else None
+        try:
+            await self._client.collection(collection).document(document_id).delete(option=option)
+        except google_exceptions.NotFound as exc:
+            raise DocumentNotFoundError(f"documento {document_id} nao encontrado") from exc
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao excluir documento no firestore") from exc
+
+
+async def _collect(query: Any) -> list[Mapping[str, Any]]:
+    items: list[Mapping[str, Any]] = []
+    async for snapshot in query.stream():
+        data = snapshot.to_dict() or {}
+        data.setdefault("id", snapshot.id)
+        items.append(data)
+    return items
@@ -0,0 +1,114 @@
+"""Adapter exposing a blocking gateway through the async protocol."""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Mapping, Sequence, TypeVar
+
+from .interfaces import AsyncFirestoreGatewayProtocol, FirestoreGatewayProtocol, QueryFilter
+
+T = TypeVar("T")
+
+
+class AsyncGatewayAdapter(AsyncFirestoreGatewayProtocol):
+    """Await the calls of a blocking gateway.
+
+    With ``offload=True`` each call runs on one of ``max_workers`` threads
+    owned by the adapter, so gathered reads overlap and the threads (and any
+    per-thread resources of the gateway) outlive the event loop of a single
+    request; use it only for thread-safe gateways (Firestore, SQLite, or a
+    ``CachingGateway`` over them). The default runs calls inline, which
+    keeps single-threaded backends such as TinyDB safe at the cost of
+    concurrency.
+    """
+
+    def __init__(
+        self, gateway: FirestoreGatewayProtocol, offload: bool = False, max_workers: int = 8
+    ) -> None:
+        self._gateway = gateway
+        self._executor = (
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="async-gateway")
+            if offload
+            else None
+        )
+
+    async def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        return await self._call(
+            self._gateway.add_document, collection, payload, document_id, merge=merge
+        )
+
+    async def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        return await self._call(self._gateway.add_documents, collection, documents, merge=merge)
+
+    async def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        await self._call(self._gateway.update_document, collection, document_id, payload)
+
+    async def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        return await self._call(self._gateway.get_document, collection, document_id)
+
+    async def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        return await self._call(self._gateway.get_documents, collection, document_ids)
+
+    async def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        return await self._call(self._gateway.list_documents, collection, fields=fields)
+
+    async def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        return await self._call(
+            self._gateway.query_documents,
+            collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+            fields=fields,
+        )
+
+    async def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        await self._call(
+            self._gateway.delete_document, collection, document_id, must_exist=must_exist
+        )
+
+    async def _call(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self._executor is not None:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, partial(function, *args, **kwargs)
+            )
+        return function(*args, **kwargs)
@@ -1,27 +1,69 @@
 """Shared repository utilities."""
 from __future__ import annotations
 
-from typing import Generic, Mapping, TypeVar
+from functools import lru_cache
+from itertools import islice
+from typing import Generic, Iterator, Mapping, Sequence, TypeVar
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, create_model
 
+from .async_gateway import AsyncGatewayAdapter
 from .errors import DocumentNotFoundError
-from .interfaces import FirestoreGatewayProtocol
+from .interfaces import AsyncFirestoreGatewayProtocol, FirestoreGatewayProtocol, QueryFilter
 
 TModel = TypeVar("TModel", bound=BaseModel)
 
 
+@lru_cache(maxsize=128)
+def projection_model(model_type: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    """Return a model validating only ``fields`` (plus ``id``) of ``model_type``."""
+
+    definitions = {
+        name: (info.annotation, info)
+        for name, info in model_type.model_fields.items()
+        if name in fields or name == "id"
+    }
+    return create_model(f"{model_type.__name__}Projection", **definitions)  # type: ignore[call-overload]
+
+
+@lru_cache(maxsize=128)
+def list_adapter(model_type: type[BaseModel]) -> TypeAdapter:
+    """Return a compiled ``TypeAdapter(list[model_type])``, built once per model."""
+
+    return TypeAdapter(list[model_type])  # type: ignore[valid-type]
+
+
 class FirestoreRepository(Generic[TModel]):
-    """Generic repository with basic CRUD semantics."""
+    """Generic repository with basic CRUD semantics.
+
+    By default writes return models built from the validated payload and the
+    id reported by the gateway, and existence checks are delegated to the
+    datastore. Set ``READ_AFTER_WRITE`` to re-read documents after writing
+    and check existence with a separate read instead.
+
+    The ``a``-prefixed read methods are coroutines served by
+    ``async_gateway``, which defaults to an inline adapter over ``gateway``.
+
+    Set ``TRUSTED_READS`` on collections whose documents are only written
+    through validated payloads: multi-document reads then hydrate the whole
+    result with one ``list_adapter`` call instead of a ``model_validate``
+    call per document. Documents are still validated, so a corrupt one
+    raises ``ValidationError`` for the whole read.
+    """
+
+    READ_AFTER_WRITE = False
+    TRUSTED_READS = False
 
     def __init__(
         self,
         collection: str,
         gateway: FirestoreGatewayProtocol,
         model_type: type[TModel],
+        async_gateway: AsyncFirestoreGatewayProtocol | None = None,
     ) -> None:
         self._collection = collection
         self._gateway = gateway
+        self._async_gateway = async_gateway or AsyncGatewayAdapter(gateway)
         self._model_type = model_type
 
     def create(self, payload: Mapping[str, object]) -> TModel:
@@ -30,18 +72,89 @@ class FirestoreRepository(Generic[TModel]):
         data = dict(payload)
         document_id = data.pop("id", None)
         created_id = self._gateway.add_document(self._collection, data, document_id)
-        return self._hydrate(created_id)
+        if self.READ_AFTER_WRITE:
+            return self._hydrate(created_id)
+        return self._model_type.model_validate({**data, "id": created_id})
+
+    def create_many(self, payloads: Sequence[Mapping[str, object]]) -> list[TModel]:
+        """Persist new documents using a single batched write.
+
+        Like ``update_many``, the returned models are built from the payloads.
+        """
+
+        documents = []
+        for payload in payloads:
+            data = dict(payload)
+            documents.append((data.pop("id", None), data))
+
+        created_ids = self._gateway.add_documents(self._collection, documents, merge=False)
+        return [
+            self._model_type.model_validate({**data, "id": created_id})
+            for created_id, (_, data) in zip(created_ids, documents)
+        ]
 
     def update(self, document_id: str, payload: Mapping[str, object]) -> TModel:
         """Replace an existing document."""
 
-        if not self._gateway.get_document(self._collection, document_id):
-            raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
-
         data = dict(payload)
         data.pop("id", None)
-        self._gateway.add_document(self._collection, data, document_id, merge=False)
-        return self._hydrate(document_id)
+
+        if self.READ_AFTER_WRITE:
+            if not self._gateway.get_document(self._collection, document_id):
+                raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+            self._gateway.add_document(self._collection, data, document_id, merge=False)
+            return self._hydrate(document_id)
+
+        self._gateway.update_document(self._collection, document_id, self._replacement(data))
+        return self._model_type.model_validate({**data, "id": document_id})
+
+    def update_fields(self, document_id: str, fields: Mapping[str, object]) -> None:
+        """Overwrite only ``fields`` of an existing document.
+
+        The other fields keep whatever the datastore holds, so concurrent
+        writes to them are not undone. Raises ``DocumentNotFoundError`` when
+        the document does not exist.
+        """
+
+        data = dict(fields)
+        data.pop("id", None)
+        self._gateway.update_document(self._collection, document_id, data)
+
+    def update_fields_many(self, fields: Mapping[str, Mapping[str, object]]) -> list[str]:
+        """Overwrite only the given fields of several documents in one batch.
+
+        ``fields`` maps document ids to their fields, as in ``update_fields``.
+        Documents that do not exist are skipped and their ids returned.
+        """
+
+        documents = []
+        for document_id, values in fields.items():
+            data = dict(values)
+            data.pop("id", None)
+            documents.append((document_id, data))
+        if not documents:
+            return []
+        return self._gateway.update_documents(self._collection, documents)
+
+    def update_many(self, payloads: Mapping[str, Mapping[str, object]]) -> list[TModel]:
+        """Replace several existing documents using a single batched write.
+
+        Documents are not re-read after the write: the returned models are
+        built from the payloads, so callers must only pass ids they have just
+        loaded from the collection.
+        """
+
+        documents = []
+        for document_id, payload in payloads.items():
+            data = dict(payload)
+            data.pop("id", None)
+            documents.append((document_id, data))
+
+        self._gateway.add_documents(self._collection, documents, merge=False)
+        return [
+            self._model_type.model_validate({**data, "id": document_id})
+            for document_id, data in documents
+        ]
 
     def get(self, document_id: str) -> TModel:
         """Return a single document or raise when missing."""
@@ -51,18 +164,176 @@ class FirestoreRepository(Generic[TModel]):
             raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
         return self._model_type.model_validate(data)
 
-    def list(self) -> list[TModel]:
-        """Return all documents stored in the collection."""
+    def get_many(self, document_ids: Sequence[str]) -> dict[str, TModel]:
+        """Return the existing documents among ``document_ids`` keyed by id."""
+
+        documents = self._gateway.get_documents(self._collection, document_ids)
+        return dict(zip(documents, self._hydrate_many(list(documents.values()), None)))
 
-        items = self._gateway.list_documents(self._collection)
-        return [self._model_type.model_validate(item) for item in items]
+    def list(self, fields: Sequence[str] | None = None) -> list[TModel]:
+        """Return all documents stored in the collection.
+
+        With ``fields`` only those fields are read and the items are
+        projection models (see ``projection_model``) instead of ``TModel``.
+        """
+
+        items = self._gateway.list_documents(self._collection, fields=fields)
+        return self._hydrate_many(items, fields)
+
+    def find(
+        self,
+        filters: Sequence[QueryFilter] = (),
+        *,
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[TModel]:
+        """Return documents matching the filters, evaluated by the datastore."""
+
+        items = self._gateway.query_documents(
+            self._collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+            fields=fields,
+        )
+        return self._hydrate_many(items, fields)
+
+    async def aget(self, document_id: str) -> TModel:
+        """Async variant of ``get``."""
+
+        data = await self._async_gateway.get_document(self._collection, document_id)
+        if data is None:
+            raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+        return self._model_type.model_validate(data)
+
+    async def aget_many(self, document_ids: Sequence[str]) -> dict[str, TModel]:
+        """Async variant of ``get_many``."""
+
+        documents = await self._async_gateway.get_documents(self._collection, document_ids)
+        return dict(zip(documents, self._hydrate_many(list(documents.values()), None)))
+
+    async def alist(self, fields: Sequence[str] | None = None) -> list[TModel]:
+        """Async variant of ``list``."""
+
+        items = await self._async_gateway.list_documents(self._collection, fields=fields)
+        return self._hydrate_many(items, fields)
+
+    async def afind(
+        self,
+        filters: Sequence[QueryFilter] = (),
+        *,
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[TModel]:
+        """Async variant of ``find``."""
+
+        items = await self._async_gateway.query_documents(
+            self._collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+            fields=fields,
+        )
+        return self._hydrate_many(items, fields)
+
+    def iter(
+        self,
+        filters: Sequence[QueryFilter] = (),
+        *,
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[TModel]:
+        """Yield documents lazily, fetching them from the gateway page by page."""
+
+        items = self._gateway.iter_documents(
+            self._collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            page_size=page_size,
+            start_after=start_after,
+            fields=fields,
+        )
+        if self.TRUSTED_READS:
+            # Hydrate a page at a time to keep bulk validation lazy.
+            while page := list(islice(items, page_size)):
+                yield from self._hydrate_many(page, fields)
+            return
+        validator = self._validator(fields)
+        for item in items:
+            yield validator.model_validate(item)
+
+    def list_page(
+        self,
+        limit: int,
+        cursor: str | None = None,
+        filters: Sequence[QueryFilter] = (),
+        *,
+        order_by: str | None = None,
+        descending: bool = False,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[list[TModel], str | None]:
+        """Return up to ``limit`` documents after ``cursor`` and the next cursor."""
+
+        # Fetching one extra document tells whether another page exists.
+        items = list(
+            islice(
+                self.iter(
+                    filters,
+                    order_by=order_by,
+                    descending=descending,
+                    page_size=limit + 1,
+                    start_after=cursor,
+                    fields=fields,
+                ),
+                limit + 1,
+            )
+        )
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, getattr(items[-1], "id", None)
 
     def delete(self, document_id: str) -> None:
         """Remove a document. Successful when document exists."""
 
-        if not self._gateway.get_document(self._collection, document_id):
-            raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
-        self._gateway.delete_document(self._collection, document_id)
+        if self.READ_AFTER_WRITE:
+            if not self._gateway.get_document(self._collection, document_id):
+                raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+            self._gateway.delete_document(self._collection, document_id)
+            return
+
+        self._gateway.delete_document(self._collection, document_id, must_exist=True)
+
+    def _validator(self, fields: Sequence[str] | None) -> type[BaseModel]:
+        if fields is None:
+            return self._model_type
+        return projection_model(self._model_type, tuple(sorted(fields)))
+
+    def _hydrate_many(
+        self,
+        items: Sequence[Mapping[str, object]],
+        fields: Sequence[str] | None,
+    ) -> list[TModel]:
+        validator = self._validator(fields)
+        if self.TRUSTED_READS:
+            return list_adapter(validator).validate_python(items)
+        return [validator.model_validate(item) for item in items]
+
+    def _replacement(self, data: Mapping[str, object]) -> dict[str, object]:
+        # update_document only overwrites the fields it receives, so fields
+        # dropped from the payload are cleared explicitly.
+        cleared = {name: None for name in self._model_type.model_fields if name != "id"}
+        return {**cleared, **data}
 
     def _hydrate(self, document_id: str) -> TModel:
         data = self._gateway.get_document(self._collection, document_id)
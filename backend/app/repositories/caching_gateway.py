@@ -0,0 +1,266 @@
+"""Read-through cache decorator for gateway implementations."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Mapping, Sequence
+
+from .interfaces import FirestoreGatewayProtocol, QueryFilter
+
+_MISSING = object()
+
+
+class CachingGateway(FirestoreGatewayProtocol):
+    """Cache reads of a wrapped gateway and invalidate them on writes.
+
+    Single documents are cached per ``(collection, id)`` and collection reads
+    (``list_documents``/``query_documents``) per collection and arguments.
+    Entries expire after ``ttl_seconds`` and the least recently used ones are
+    evicted past ``max_entries``. Any write to a collection drops its
+    collection-level entries plus the entries of the written documents.
+    """
+
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        ttl_seconds: float = 60.0,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._gateway = gateway
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[tuple[Hashable, ...], tuple[float, Any]] = OrderedDict()
+        # Bumped on every write so a read that raced with a write is not cached.
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._gateway, name)
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+
+        with self._lock:
+            self._entries.clear()
+
+    def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        try:
+            created_id = self._gateway.add_document(collection, payload, document_id, merge=merge)
+        finally:
+            self._invalidate(collection, [document_id] if document_id else [])
+        return created_id
+
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        try:
+            return self._gateway.add_documents(collection, documents, merge=merge)
+        finally:
+            self._invalidate(collection, [doc_id for doc_id, _ in documents if doc_id])
+
+    def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        try:
+            self._gateway.update_document(collection, document_id, payload)
+        finally:
+            self._invalidate(collection, [document_id])
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        try:
+            return self._gateway.update_documents(collection, documents)
+        finally:
+            self._invalidate(collection, [document_id for document_id, _ in documents])
+
+    def transform_document(
+        self,
+        collection: str,
+        document_id: str,
+        transform: Callable[[Mapping[str, Any] | None], Mapping[str, Any]],
+    ) -> Mapping[str, Any]:
+        try:
+            return self._gateway.transform_document(collection, document_id, transform)
+        finally:
+            self._invalidate(collection, [document_id])
+
+    def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        key = (collection, "document", document_id)
+        cached = self._lookup(key)
+        if cached is not _MISSING:
+            return None if cached is None else dict(cached)
+
+        generation = self._generations.get(collection, 0)
+        data = self._gateway.get_document(collection, document_id)
+        self._store(key, None if data is None else dict(data), generation)
+        return data
+
+    def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        documents: dict[str, Mapping[str, Any]] = {}
+        missing: list[str] = []
+        for document_id in dict.fromkeys(document_ids):
+            cached = self._lookup((collection, "document", document_id))
+            if cached is _MISSING:
+                missing.append(document_id)
+            elif cached is not None:
+                documents[document_id] = dict(cached)
+
+        if missing:
+            generation = self._generations.get(collection, 0)
+            fetched = self._gateway.get_documents(collection, missing)
+            for document_id in missing:
+                data = fetched.get(document_id)
+                self._store(
+                    (collection, "document", document_id),
+                    None if data is None else dict(data),
+                    generation,
+                )
+                if data is not None:
+                    documents[document_id] = data
+        return documents
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        key = (collection, "list", _freeze(fields))
+        cached = self._lookup(key)
+        if cached is not _MISSING:
+            return [dict(item) for item in cached]
+
+        generation = self._generations.get(collection, 0)
+        items = self._gateway.list_documents(collection, fields=fields)
+        self._store(key, [dict(item) for item in items], generation)
+        return items
+
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        key = (collection, "query", _freeze(filters), order_by, descending, limit, _freeze(fields))
+        cached = self._lookup(key)
+        if cached is not _MISSING:
+            return [dict(item) for item in cached]
+
+        generation = self._generations.get(collection, 0)
+        items = self._gateway.query_documents(
+            collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+            fields=fields,
+        )
+        self._store(key, [dict(item) for item in items], generation)
+        return items
+
+    def iter_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[Mapping[str, Any]]:
+        # Streams are consumed lazily and are not cached.
+        return self._gateway.iter_documents(
+            collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            page_size=page_size,
+            start_after=start_after,
+            fields=fields,
+        )
+
+    def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        try:
+            self._gateway.delete_document(collection, document_id, must_exist=must_exist)
+        finally:
+            self._invalidate(collection, [document_id])
+
+    def _lookup(self, key: tuple[Hashable, ...]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _store(self, key: tuple[Hashable, ...], value: Any, generation: int) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return
+            self._entries[key] = (self._clock() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def _invalidate(self, collection: str, document_ids: Sequence[str]) -> None:
+        written = {(collection, "document", document_id) for document_id in document_ids}
+        with self._lock:
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+            stale = [
+                key
+                for key in self._entries
+                if key in written or (key[0] == collection and key[1] != "document")
+            ]
+            for key in stale:
+                del self._entries[key]
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
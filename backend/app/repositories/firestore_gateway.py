@@ -1,18 +1,22 @@
 """Firestore gateway implementation."""
 from __future__ import annotations
 
-from typing import Any, Mapping
+from typing import Any, Callable, Iterator, Mapping, Sequence
 
 from google.api_core import exceptions as google_exceptions
 from google.cloud import firestore
+from google.cloud.firestore_v1.field_path import FieldPath
 
-from .errors import PersistenceLayerError
-from .interfaces import FirestoreGatewayProtocol
+from .errors import DocumentNotFoundError, PersistenceLayerError
+from .interfaces import QUERY_OPERATORS, FirestoreGatewayProtocol, QueryFilter
 
 
 class FirestoreGateway(FirestoreGatewayProtocol):
     """Concrete gateway that wraps a google-cloud-firestore client."""
 
+    #: Firestore rejects commits with more than 500 writes.
+    MAX_BATCH_SIZE = 500
+
     def __init__(self, client: firestore.Client):
         self._client = client
 
@@ -41,6 +45,105 @@ class FirestoreGateway(FirestoreGatewayProtocol):
         except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
             raise PersistenceLayerError("erro ao salvar documento no firestore") from exc
 
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        document_ids: list[str] = []
+        try:
+            collection_ref = self._client.collection(collection)
+            for start in range(0, len(documents), self.MAX_BATCH_SIZE):
+                batch = self._client.batch()
+                for document_id, payload in documents[start : start + self.MAX_BATCH_SIZE]:
+                    doc_ref = (
+                        collection_ref.document(document_id)
+                        if document_id
+                        else collection_ref.document()
+                    )
+                    batch.set(doc_ref, dict(payload), merge=merge)
+                    document_ids.append(doc_ref.id)
+                batch.commit()
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao salvar documentos no firestore") from exc
+        return document_ids
+
+    def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        try:
+            # update() carries an exists=True precondition, so a missing
+            # document fails server-side instead of needing a prior read.
+            self._client.collection(collection).document(document_id).update(dict(payload))
+        except google_exceptions.NotFound as exc:
+            raise DocumentNotFoundError(f"documento {document_id} nao encontrado") from exc
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao atualizar documento no firestore") from exc
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        collection_ref = self._client.collection(collection)
+
+        @firestore.transactional
+        def run(
+            transaction: firestore.Transaction, chunk: Sequence[tuple[str, Mapping[str, Any]]]
+        ) -> list[str]:
+            # Reading in the transaction makes a delete racing the batch
+            # retry it instead of being undone by a blind set.
+            references = [collection_ref.document(document_id) for document_id, _ in chunk]
+            found = {
+                snapshot.id
+                for snapshot in transaction.get_all(references)
+                if snapshot.exists
+            }
+            for reference, (document_id, payload) in zip(references, chunk):
+                if document_id in found:
+                    transaction.update(reference, dict(payload))
+            return [document_id for document_id, _ in chunk if document_id not in found]
+
+        missing: list[str] = []
+        try:
+            for start in range(0, len(documents), self.MAX_BATCH_SIZE):
+                missing.extend(
+                    run(self._client.transaction(), documents[start : start + self.MAX_BATCH_SIZE])
+                )
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao atualizar documentos no firestore") from exc
+        return missing
+
+    def transform_document(
+        self,
+        collection: str,
+        document_id: str,
+        transform: Callable[[Mapping[str, Any] | None], Mapping[str, Any]],
+    ) -> Mapping[str, Any]:
+        reference = self._client.collection(collection).document(document_id)
+
+        @firestore.transactional
+        def run(transaction: firestore.Transaction) -> dict[str, Any]:
+            # Firestore retries the function when another write races it.
+            snapshot = reference.get(transaction=transaction)
+            current = None
+            if snapshot.exists:
+                current = snapshot.to_dict() or {}
+                current.setdefault("id", snapshot.id)
+            document = dict(transform(current))
+            document.pop("id", None)
+            transaction.set(reference, document)
+            return {**document, "id": document_id}
+
+        try:
+            return run(self._client.transaction())
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao atualizar documento no firestore") from exc
+
     def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
         try:
             snapshot = self._client.collection(collection).document(document_id).get()
@@ -54,9 +157,38 @@ class FirestoreGateway(FirestoreGatewayProtocol):
         data.setdefault("id", snapshot.id)
         return data
 
-    def list_documents(self, collection: str) -> list[Mapping[str, Any]]:
+    def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        unique_ids = list(dict.fromkeys(document_ids))
+        if not unique_ids:
+            return {}
+        collection_ref = self._client.collection(collection)
+        references = [collection_ref.document(document_id) for document_id in unique_ids]
+        documents: dict[str, Mapping[str, Any]] = {}
+        try:
+            for snapshot in self._client.get_all(references):
+                if not snapshot.exists:
+                    continue
+                data = snapshot.to_dict() or {}
+                data.setdefault("id", snapshot.id)
+                documents[snapshot.id] = data
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao buscar documentos no firestore") from exc
+        return documents
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        query = self._client.collection(collection)
+        if fields is not None:
+            query = query.select(list(fields))
         try:
-            snapshots = self._client.collection(collection).stream()
+            snapshots = query.stream()
         except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
             raise PersistenceLayerError("erro ao listar documentos no firestore") from exc
 
@@ -67,8 +199,99 @@ class FirestoreGateway(FirestoreGatewayProtocol):
             items.append(data)
         return items
 
-    def delete_document(self, collection: str, document_id: str) -> None:
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        query = _filtered_query(self._client.collection(collection), filters, fields)
+        if order_by:
+            direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+            query = query.order_by(order_by, direction=direction)
+        if limit is not None:
+            query = query.limit(limit)
+
         try:
-            self._client.collection(collection).document(document_id).delete()
+            snapshots = query.stream()
+            items: list[Mapping[str, Any]] = []
+            for snapshot in snapshots:
+                data = snapshot.to_dict() or {}
+                data.setdefault("id", snapshot.id)
+                items.append(data)
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao consultar documentos no firestore") from exc
+        return items
+
+    def iter_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[Mapping[str, Any]]:
+        if fields is not None and order_by and order_by not in fields:
+            # Page cursors are built from the last snapshot's order_by value.
+            fields = [*fields, order_by]
+        collection_ref = self._client.collection(collection)
+        query = _filtered_query(collection_ref, filters, fields)
+        direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+        if order_by:
+            query = query.order_by(order_by, direction=direction)
+        query = query.order_by(FieldPath.document_id(), direction=direction)
+
+        try:
+            cursor: Any = None
+            if start_after and order_by:
+                # Resuming on a field ordering needs that field's value.
+                cursor = collection_ref.document(start_after).get()
+                if not cursor.exists:
+                    return
+            elif start_after:
+                cursor = {FieldPath.document_id(): start_after}
+
+            while True:
+                page = query.limit(page_size)
+                if cursor is not None:
+                    page = page.start_after(cursor)
+                snapshots = list(page.stream())
+                for snapshot in snapshots:
+                    data = snapshot.to_dict() or {}
+                    data.setdefault("id", snapshot.id)
+                    yield data
+                if len(snapshots) < page_size:
+                    return
+                cursor = snapshots[-1]
+        except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
+            raise PersistenceLayerError("erro ao listar documentos no firestore") from exc
+
+    def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        option = self._client.write_option(exists=True) if must_exist else None
+        try:
+            self._client.collection(collection).document(document_id).delete(option=option)
+        except google_exceptions.NotFound as exc:
+            raise DocumentNotFoundError(f"documento {document_id} nao encontrado") from exc
         except google_exceptions.GoogleAPICallError as exc:  # pragma: no cover - defensive
             raise PersistenceLayerError("erro ao excluir documento no firestore") from exc
+
+
+def _filtered_query(query: Any, filters: Sequence[QueryFilter], fields: Sequence[str] | None) -> Any:
+    for field, operator, value in filters:
+        if operator not in QUERY_OPERATORS:
+            raise ValueError(f"operador de filtro invalido: {operator}")
+        query = query.where(filter=firestore.FieldFilter(field, operator, value))
+    if fields is not None:
+        # Field masks keep unrequested fields out of the response payload.
+        query = query.select(list(fields))
+    return query
@@ -0,0 +1,410 @@
+"""Instrumentation decorators recording gateway metrics."""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Mapping, Sequence
+
+from .interfaces import AsyncFirestoreGatewayProtocol, FirestoreGatewayProtocol, QueryFilter
+
+#: Upper bounds (seconds) of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Series:
+    __slots__ = ("calls", "errors", "documents", "bucket_counts", "duration_sum")
+
+    def __init__(self, buckets: int) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.documents = 0
+        self.bucket_counts = [0] * (buckets + 1)
+        self.duration_sum = 0.0
+
+
+class GatewayMetrics:
+    """Thread-safe registry of per ``(operation, collection)`` gateway metrics."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self._buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        operation: str,
+        collection: str,
+        seconds: float,
+        documents: int = 0,
+        error: bool = False,
+    ) -> None:
+        """Record one gateway call."""
+
+        with self._lock:
+            series = self._series.get((operation, collection))
+            if series is None:
+                series = self._series[(operation, collection)] = _Series(len(self._buckets))
+            series.calls += 1
+            series.errors += int(error)
+            series.documents += documents
+            series.duration_sum += seconds
+            series.bucket_counts[bisect.bisect_left(self._buckets, seconds)] += 1
+
+    def snapshot(self) -> dict[tuple[str, str], dict[str, float]]:
+        """Return calls, errors, documents and total seconds per series."""
+
+        with self._lock:
+            return {
+                key: {
+                    "calls": series.calls,
+                    "errors": series.errors,
+                    "documents": series.documents,
+                    "seconds": series.duration_sum,
+                }
+                for key, series in self._series.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """Render every series in the Prometheus text exposition format."""
+
+        with self._lock:
+            series = sorted(
+                (key, (s.calls, s.errors, s.documents, list(s.bucket_counts), s.duration_sum))
+                for key, s in self._series.items()
+            )
+
+        lines = [
+            "# HELP gateway_operations_total Gateway calls per operation and collection.",
+            "# TYPE gateway_operations_total counter",
+        ]
+        lines += [f"gateway_operations_total{{{_labels(key)}}} {values[0]}" for key, values in series]
+        lines += [
+            "# HELP gateway_operation_errors_total Gateway calls that raised.",
+            "# TYPE gateway_operation_errors_total counter",
+        ]
+        lines += [
+            f"gateway_operation_errors_total{{{_labels(key)}}} {values[1]}" for key, values in series
+        ]
+        lines += [
+            "# HELP gateway_documents_total Documents read or written by gateway calls.",
+            "# TYPE gateway_documents_total counter",
+        ]
+        lines += [f"gateway_documents_total{{{_labels(key)}}} {values[2]}" for key, values in series]
+        lines += [
+            "# HELP gateway_operation_duration_seconds Gateway call latency.",
+            "# TYPE gateway_operation_duration_seconds histogram",
+        ]
+        for key, (calls, _, _, bucket_counts, duration_sum) in series:
+            labels = _labels(key)
+            cumulative = 0
+            for bound, count in zip((*self._buckets, float("inf")), bucket_counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'gateway_operation_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}'
+                )
+            lines.append(f"gateway_operation_duration_seconds_sum{{{labels}}} {duration_sum!r}")
+            lines.append(f"gateway_operation_duration_seconds_count{{{labels}}} {calls}")
+        return "\n".join(lines) + "\n"
+
+
+class _Observation:
+    __slots__ = ("documents",)
+
+    def __init__(self) -> None:
+        self.documents = 0
+
+
+class _Instrumented:
+    def __init__(
+        self,
+        gateway: Any,
+        metrics: GatewayMetrics | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self._gateway = gateway
+        self.metrics = metrics or GatewayMetrics()
+        self._clock = clock
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._gateway, name)
+
+    @contextmanager
+    def _observe(self, operation: str, collection: str) -> Iterator[_Observation]:
+        observation = _Observation()
+        started = self._clock()
+        error = False
+        try:
+            yield observation
+        except GeneratorExit:
+            # A stream closed early by its consumer is not a failure.
+            raise
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.metrics.observe(
+                operation,
+                collection,
+                self._clock() - started,
+                observation.documents,
+                error,
+            )
+
+
+class InstrumentedGateway(_Instrumented, FirestoreGatewayProtocol):
+    """Record call counts, errors, latency and document counts of a gateway.
+
+    Wrap the datastore gateway itself (inside any cache) so the metrics
+    reflect real round trips. ``iter_documents`` is measured from the first
+    to the last page, and recorded when the stream is exhausted or closed.
+    """
+
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        metrics: GatewayMetrics | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        super().__init__(gateway, metrics, clock)
+
+    def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        with self._observe("add_document", collection) as observation:
+            observation.documents = 1
+            return self._gateway.add_document(collection, payload, document_id, merge=merge)
+
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        with self._observe("add_documents", collection) as observation:
+            observation.documents = len(documents)
+            return self._gateway.add_documents(collection, documents, merge=merge)
+
+    def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        with self._observe("update_document", collection) as observation:
+            observation.documents = 1
+            self._gateway.update_document(collection, document_id, payload)
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        with self._observe("update_documents", collection) as observation:
+            observation.documents = len(documents)
+            return self._gateway.update_documents(collection, documents)
+
+    def transform_document(
+        self,
+        collection: str,
+        document_id: str,
+        transform: Callable[[Mapping[str, Any] | None], Mapping[str, Any]],
+    ) -> Mapping[str, Any]:
+        with self._observe("transform_document", collection) as observation:
+            observation.documents = 1
+            return self._gateway.transform_document(collection, document_id, transform)
+
+    def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        with self._observe("get_document", collection) as observation:
+            data = self._gateway.get_document(collection, document_id)
+            observation.documents = int(data is not None)
+            return data
+
+    def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        with self._observe("get_documents", collection) as observation:
+            documents = self._gateway.get_documents(collection, document_ids)
+            observation.documents = len(documents)
+            return documents
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        with self._observe("list_documents", collection) as observation:
+            items = self._gateway.list_documents(collection, fields=fields)
+            observation.documents = len(items)
+            return items
+
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        with self._observe("query_documents", collection) as observation:
+            items = self._gateway.query_documents(
+                collection,
+                filters,
+                order_by=order_by,
+                descending=descending,
+                limit=limit,
+                fields=fields,
+            )
+            observation.documents = len(items)
+            return items
+
+    def iter_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[Mapping[str, Any]]:
+        with self._observe("iter_documents", collection) as observation:
+            for item in self._gateway.iter_documents(
+                collection,
+                filters,
+                order_by=order_by,
+                descending=descending,
+                page_size=page_size,
+                start_after=start_after,
+                fields=fields,
+            ):
+                observation.documents += 1
+                yield item
+
+    def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        with self._observe("delete_document", collection) as observation:
+            observation.documents = 1
+            self._gateway.delete_document(collection, document_id, must_exist=must_exist)
+
+
+class AsyncInstrumentedGateway(_Instrumented, AsyncFirestoreGatewayProtocol):
+    """Async counterpart of ``InstrumentedGateway``, usually sharing its metrics."""
+
+    def __init__(
+        self,
+        gateway: AsyncFirestoreGatewayProtocol,
+        metrics: GatewayMetrics | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        super().__init__(gateway, metrics, clock)
+
+    async def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        with self._observe("add_document", collection) as observation:
+            observation.documents = 1
+            return await self._gateway.add_document(collection, payload, document_id, merge=merge)
+
+    async def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        with self._observe("add_documents", collection) as observation:
+            observation.documents = len(documents)
+            return await self._gateway.add_documents(collection, documents, merge=merge)
+
+    async def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        with self._observe("update_document", collection) as observation:
+            observation.documents = 1
+            await self._gateway.update_document(collection, document_id, payload)
+
+    async def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        with self._observe("get_document", collection) as observation:
+            data = await self._gateway.get_document(collection, document_id)
+            observation.documents = int(data is not None)
+            return data
+
+    async def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        with self._observe("get_documents", collection) as observation:
+            documents = await self._gateway.get_documents(collection, document_ids)
+            observation.documents = len(documents)
+            return documents
+
+    async def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        with self._observe("list_documents", collection) as observation:
+            items = await self._gateway.list_documents(collection, fields=fields)
+            observation.documents = len(items)
+            return items
+
+    async def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        with self._observe("query_documents", collection) as observation:
+            items = await self._gateway.query_documents(
+                collection,
+                filters,
+                order_by=order_by,
+                descending=descending,
+                limit=limit,
+                fields=fields,
+            )
+            observation.documents = len(items)
+            return items
+
+    async def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        with self._observe("delete_document", collection) as observation:
+            observation.documents = 1
+            await self._gateway.delete_document(collection, document_id, must_exist=must_exist)
+
+
+def _labels(key: tuple[str, str]) -> str:
+    operation, collection = key
+    return f'operation="{_escape(operation)}",collection="{_escape(collection)}"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
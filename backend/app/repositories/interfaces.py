@@ -1,7 +1,21 @@
 """Interfaces and protocols used by repository implementations."""
 from __future__ import annotations
 
-from typing import Any, Iterable, Mapping, MutableMapping, Protocol
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    Protocol,
+    Sequence,
+)
+
+QueryFilter = tuple[str, str, Any]
+"""A ``(field, operator, value)`` triple understood by ``query_documents``."""
+
+QUERY_OPERATORS = frozenset({"==", "<", "<=", ">", ">=", "in"})
 
 
 class SupportsDocument(Protocol):
@@ -53,11 +67,169 @@ class FirestoreGatewayProtocol(Protocol):
     ) -> str:
         """Create or update a document and return its id."""
 
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        """Persist several documents in a single batch and return their ids."""
+
+    def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        """Overwrite the fields of an existing document.
+
+        Raises ``DocumentNotFoundError`` when the document does not exist,
+        without a separate read.
+        """
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        """Overwrite the fields of several existing documents in one batch.
+
+        Documents that do not exist are left missing; their ids are returned.
+        """
+
+    def transform_document(
+        self,
+        collection: str,
+        document_id: str,
+        transform: Callable[[Mapping[str, Any] | None], Mapping[str, Any]],
+    ) -> Mapping[str, Any]:
+        """Replace a document with ``transform(current)`` atomically and return it.
+
+        ``current`` is None when the document does not exist. No write
+        lands between the read and the write; ``transform`` may run more
+        than once (contended Firestore transactions are retried), so it
+        must not have side effects.
+        """
+
     def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
         """Return the data for a document or None if missing."""
 
-    def list_documents(self, collection: str) -> list[Mapping[str, Any]]:
+    def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        """Return existing documents among ``document_ids`` keyed by id, in one call."""
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        """Return all documents in the collection.
+
+        ``fields`` projects each document onto those fields (plus ``id``).
+        """
+
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        """Return documents matching every filter, optionally ordered and limited."""
+
+    def iter_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[Mapping[str, Any]]:
+        """Yield matching documents ordered by ``order_by`` then id, one page at a time.
+
+        ``start_after`` is the id of the last document already seen.
+        """
+
+    def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        """Remove a document, raising ``DocumentNotFoundError`` if ``must_exist``."""
+
+
+class AsyncFirestoreGatewayProtocol(Protocol):
+    """Coroutine counterpart of ``FirestoreGatewayProtocol``.
+
+    Methods share names and semantics with the blocking protocol so
+    independent reads can be awaited together with ``asyncio.gather``.
+    """
+
+    async def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        """Create or update a document and return its id."""
+
+    async def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        """Persist several documents in a single batch and return their ids."""
+
+    async def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        """Overwrite the fields of an existing document."""
+
+    async def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        """Return the data for a document or None if missing."""
+
+    async def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        """Return existing documents among ``document_ids`` keyed by id, in one call."""
+
+    async def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
         """Return all documents in the collection."""
 
-    def delete_document(self, collection: str, document_id: str) -> None:
-        """Remove a document from the collection."""
+    async def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        """Return documents matching every filter, optionally ordered and limited."""
+
+    async def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        """Remove a document, raising ``DocumentNotFoundError`` if ``must_exist``."""
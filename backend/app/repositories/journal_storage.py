@@ -0,0 +1,197 @@
+"""Append-only journal storage for TinyDB."""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Iterable
+
+from tinydb.storages import Storage
+
+from .errors import RepositoryError
+
+_Tables = dict[str, dict[str, dict[str, Any]]]
+
+
+class JournalStorage(Storage):
+    """TinyDB storage that appends changed documents to a journal file.
+
+    The database lives in two files: a compacted JSON snapshot at ``path``
+    (same layout as TinyDB's ``JSONStorage``) and ``path + ".journal"`` with
+    one JSON operation per line. ``TinyDbGateway`` writes through
+    ``set_documents`` and ``delete_documents``, which journal and apply only
+    the documents given, so both disk I/O and CPU follow the size of the
+    change; ``read`` hands out the live tables without copying them. Writes
+    made through TinyDB's own API still work: ``write`` journals every table
+    TinyDB rebuilt. The journal is folded back into the snapshot once it
+    grows past ``compact_ratio`` times the snapshot size (and at least
+    ``min_compact_bytes``); the new snapshot is written to a temporary file
+    and swapped in with ``os.replace``.
+
+    The in-memory tables are authoritative, so only one process may have
+    the files open: an exclusive ``flock`` on ``path + ".lock"`` is held
+    until ``close`` and a second opener gets ``RepositoryError``.
+    """
+
+    JOURNAL_SUFFIX = ".journal"
+    LOCK_SUFFIX = ".lock"
+
+    def __init__(
+        self,
+        path: str,
+        min_compact_bytes: int = 1024 * 1024,
+        compact_ratio: float = 1.0,
+    ) -> None:
+        super().__init__()
+        self._path = path
+        self._journal_path = path + self.JOURNAL_SUFFIX
+        self._min_compact_bytes = min_compact_bytes
+        self._compact_ratio = compact_ratio
+        self._lock = threading.RLock()
+
+        self._lock_file = open(path + self.LOCK_SUFFIX, "a", encoding="utf-8")
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as exc:
+            self._lock_file.close()
+            raise RepositoryError(f"banco tinydb em uso por outro processo: {path}") from exc
+
+        self._tables: _Tables = self._load_snapshot()
+        self._snapshot_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+        self._replay_journal()
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+        self._journal_bytes = self._journal.tell()
+
+    def read(self) -> _Tables | None:
+        with self._lock:
+            # TinyDB only reads documents (copying them into ``Document``)
+            # or rebuilds whole tables before ``write``, so a new outer dict
+            # is enough to tell the rebuilt tables apart.
+            return dict(self._tables)
+
+    def write(self, data: _Tables) -> None:
+        with self._lock:
+            operations: list[dict[str, Any]] = [
+                {"op": "drop", "table": name} for name in self._tables.keys() - data.keys()
+            ]
+            operations.extend(
+                {"op": "table", "table": name, "docs": table}
+                for name, table in data.items()
+                if table is not self._tables.get(name)
+            )
+            self._commit(operations)
+
+    def table(self, name: str) -> dict[str, dict[str, Any]]:
+        """Return the live documents of table ``name``; do not mutate them."""
+
+        with self._lock:
+            return self._tables.get(name, {})
+
+    def set_documents(self, name: str, documents: dict[str, dict[str, Any]]) -> None:
+        """Store ``documents`` (keyed by TinyDB doc id) in table ``name``."""
+
+        with self._lock:
+            self._commit(
+                [
+                    {"op": "set", "table": name, "id": doc_id, "doc": document}
+                    for doc_id, document in documents.items()
+                ]
+            )
+
+    def delete_documents(self, name: str, doc_ids: Iterable[str]) -> None:
+        """Remove the documents with ``doc_ids`` from table ``name``."""
+
+        with self._lock:
+            self._commit([{"op": "delete", "table": name, "id": doc_id} for doc_id in doc_ids])
+
+    def compact(self) -> None:
+        """Fold the journal into a fresh snapshot and truncate the journal."""
+
+        with self._lock:
+            directory = os.path.dirname(os.path.abspath(self._path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tinydb-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                    json.dump(self._tables, handle)
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                os.replace(temp_path, self._path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+
+            # Replaying the old journal over the new snapshot is idempotent, so
+            # a crash before this truncation cannot lose or duplicate data.
+            self._journal.close()
+            self._journal = open(self._journal_path, "w", encoding="utf-8")
+            self._journal_bytes = 0
+            self._snapshot_bytes = os.path.getsize(self._path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._journal.close()
+            if not self._lock_file.closed:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                self._lock_file.close()
+
+    def _commit(self, operations: list[dict[str, Any]]) -> None:
+        if not operations:
+            return
+        lines = "".join(json.dumps(operation) + "\n" for operation in operations)
+        self._journal.write(lines)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_bytes += len(lines.encode("utf-8"))
+
+        for operation in operations:
+            _apply(self._tables, operation)
+
+        if self._should_compact():
+            self.compact()
+
+    def _should_compact(self) -> bool:
+        threshold = max(self._min_compact_bytes, self._snapshot_bytes * self._compact_ratio)
+        return self._journal_bytes > threshold
+
+    def _load_snapshot(self) -> _Tables:
+        if not os.path.exists(self._path) or os.path.getsize(self._path) == 0:
+            return {}
+        with open(self._path, encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def _replay_journal(self) -> None:
+        if not os.path.exists(self._journal_path):
+            return
+        valid_bytes = 0
+        with open(self._journal_path, "rb") as handle:
+            for line in handle:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete journal entry")
+                    operation = json.loads(line)
+                except ValueError:
+                    # A torn final line means the process died mid-append;
+                    # drop it so new entries do not get glued onto it.
+                    break
+                _apply(self._tables, operation)
+                valid_bytes += len(line)
+        if valid_bytes < os.path.getsize(self._journal_path):
+            os.truncate(self._journal_path, valid_bytes)
+
+
+def _apply(tables: _Tables, operation: dict[str, Any]) -> None:
+    name = operation["table"]
+    match operation["op"]:
+        case "drop":
+            tables.pop(name, None)
+        case "create":
+            tables.setdefault(name, {})
+        case "table":
+            tables[name] = operation["docs"]
+        case "delete":
+            tables.get(name, {}).pop(operation["id"], None)
+        case "set":
+            tables.setdefault(name, {})[operation["id"]] = operation["doc"]
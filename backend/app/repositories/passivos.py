@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from .base import FirestoreRepository
-from .interfaces import FirestoreGatewayProtocol
+from .interfaces import AsyncFirestoreGatewayProtocol, FirestoreGatewayProtocol
 from ..models import Passivo
 
 
@@ -11,6 +11,10 @@ class PassivosRepository(FirestoreRepository[Passivo]):
 
     COLLECTION = "passivos"
 
-    def __init__(self, gateway: FirestoreGatewayProtocol) -> None:
-        super().__init__(self.COLLECTION, gateway, Passivo)
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        async_gateway: AsyncFirestoreGatewayProtocol | None = None,
+    ) -> None:
+        super().__init__(self.COLLECTION, gateway, Passivo, async_gateway)
 
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from .base import FirestoreRepository
-from .interfaces import FirestoreGatewayProtocol
+from .interfaces import AsyncFirestoreGatewayProtocol, FirestoreGatewayProtocol
 from ..models import RendaFixaPosition
 
 
@@ -11,6 +11,10 @@ class RendaFixaRepository(FirestoreRepository[RendaFixaPosition]):
 
     COLLECTION = "renda_fixa_positions"
 
-    def __init__(self, gateway: FirestoreGatewayProtocol) -> None:
-        super().__init__(self.COLLECTION, gateway, RendaFixaPosition)
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        async_gateway: AsyncFirestoreGatewayProtocol | None = None,
+    ) -> None:
+        super().__init__(self.COLLECTION, gateway, RendaFixaPosition, async_gateway)
 
@@ -1,41 +1,171 @@
 """Repositories for renda variavel domain."""
 from __future__ import annotations
 
+from datetime import datetime
+from itertools import islice
+from typing import Sequence
+
 from .base import FirestoreRepository
-from .interfaces import FirestoreGatewayProtocol
-from ..models import RendaVariavelPosition, RendaVariavelProvento, RendaVariavelTrade
+from .interfaces import AsyncFirestoreGatewayProtocol, FirestoreGatewayProtocol
+from ..models import (
+    RendaVariavelCheckpoint,
+    RendaVariavelPosition,
+    RendaVariavelProvento,
+    RendaVariavelTipo,
+    RendaVariavelTrade,
+)
 
 
 class RendaVariavelPositionsRepository(FirestoreRepository[RendaVariavelPosition]):
     """Repository bound to renda_variavel_positions."""
 
     COLLECTION = "renda_variavel_positions"
+    TRUSTED_READS = True
 
-    def __init__(self, gateway: FirestoreGatewayProtocol) -> None:
-        super().__init__(self.COLLECTION, gateway, RendaVariavelPosition)
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        async_gateway: AsyncFirestoreGatewayProtocol | None = None,
+    ) -> None:
+        super().__init__(self.COLLECTION, gateway, RendaVariavelPosition, async_gateway)
 
     def list_raw_documents(self) -> list[dict[str, object]]:
         """Return raw documents as stored in the gateway."""
 
         return [dict(item) for item in self._gateway.list_documents(self._collection)]
 
+    async def alist_raw_documents(self) -> list[dict[str, object]]:
+        """Async variant of ``list_raw_documents``."""
+
+        items = await self._async_gateway.list_documents(self._collection)
+        return [dict(item) for item in items]
+
+    def list_raw_page(
+        self,
+        tipo: RendaVariavelTipo,
+        limit: int,
+        cursor: str | None = None,
+    ) -> tuple[list[dict[str, object]], str | None]:
+        """Return one page of raw documents of the tipo, as ``list_page`` would."""
+
+        items = list(
+            islice(
+                self._gateway.iter_documents(
+                    self._collection,
+                    [("tipo", "==", tipo.value)],
+                    page_size=limit + 1,
+                    start_after=cursor,
+                ),
+                limit + 1,
+            )
+        )
+        if len(items) <= limit:
+            return [dict(item) for item in items], None
+        items = items[:limit]
+        return [dict(item) for item in items], items[-1].get("id")
+
+    def list_by_tipo(
+        self,
+        tipo: RendaVariavelTipo,
+        fields: Sequence[str] | None = None,
+    ) -> list[RendaVariavelPosition]:
+        """Return positions of a single tipo, filtered by the datastore."""
+
+        return self.find([("tipo", "==", tipo.value)], fields=fields)
+
+    async def alist_by_tipo(
+        self,
+        tipo: RendaVariavelTipo,
+        fields: Sequence[str] | None = None,
+    ) -> list[RendaVariavelPosition]:
+        """Async variant of ``list_by_tipo``."""
+
+        return await self.afind([("tipo", "==", tipo.value)], fields=fields)
+
 
 class RendaVariavelTradesRepository(FirestoreRepository[RendaVariavelTrade]):
     """Repository bound to renda_variavel_trades."""
 
     COLLECTION = "renda_variavel_trades"
+    TRUSTED_READS = True
 
-    def __init__(self, gateway: FirestoreGatewayProtocol) -> None:
-        super().__init__(self.COLLECTION, gateway, RendaVariavelTrade)
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        async_gateway: AsyncFirestoreGatewayProtocol | None = None,
+    ) -> None:
+        super().__init__(self.COLLECTION, gateway, RendaVariavelTrade, async_gateway)
 
     def list_by_position(self, position_id: str) -> list[RendaVariavelTrade]:
         """Return trades associated with a single position id."""
 
-        return [
-            trade
-            for trade in self.list()
-            if trade.position_id == position_id
-        ]
+        return self.find([("position_id", "==", position_id)])
+
+    async def alist_by_position(self, position_id: str) -> list[RendaVariavelTrade]:
+        """Async variant of ``list_by_position``."""
+
+        return await self.afind([("position_id", "==", position_id)])
+
+
+class RendaVariavelCheckpointsRepository(FirestoreRepository[RendaVariavelCheckpoint]):
+    """Repository bound to renda_variavel_checkpoints.
+
+    Document ids are ``<position_id>:<trades>``, so replaying a position
+    again overwrites the checkpoints it reaches.
+    """
+
+    COLLECTION = "renda_variavel_checkpoints"
+    TRUSTED_READS = True
+
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        async_gateway: AsyncFirestoreGatewayProtocol | None = None,
+    ) -> None:
+        super().__init__(self.COLLECTION, gateway, RendaVariavelCheckpoint, async_gateway)
+
+    @staticmethod
+    def document_id(position_id: str, trades: int) -> str:
+        return f"{position_id}:{trades}"
+
+    def abertura(self, position_id: str) -> RendaVariavelCheckpoint | None:
+        """Return the opening checkpoint of a position, if stored."""
+
+        data = self._gateway.get_document(self._collection, self.document_id(position_id, 0))
+        return None if data is None else RendaVariavelCheckpoint.model_validate(data)
+
+    def latest_before(self, position_id: str, data: datetime) -> RendaVariavelCheckpoint | None:
+        """Return the newest dated checkpoint of a position taken before ``data``."""
+
+        found = self.find(
+            [("position_id", "==", position_id), ("data", "<", data)],
+            order_by="data",
+            descending=True,
+            limit=1,
+        )
+        return found[0] if found else None
+
+    def list_by_position(self, position_id: str) -> list[RendaVariavelCheckpoint]:
+        """Return every checkpoint of a position."""
+
+        return self.find([("position_id", "==", position_id)])
+
+    def save_many(self, checkpoints: Sequence[RendaVariavelCheckpoint]) -> None:
+        """Store checkpoints under their deterministic ids with one batched write."""
+
+        if not checkpoints:
+            return
+        self._gateway.add_documents(
+            self._collection,
+            [
+                (
+                    self.document_id(checkpoint.position_id, checkpoint.trades),
+                    checkpoint.model_dump(mode="json", exclude={"id"}),
+                )
+                for checkpoint in checkpoints
+            ],
+            merge=False,
+        )
 
 
 class RendaVariavelProventosRepository(FirestoreRepository[RendaVariavelProvento]):
@@ -43,5 +173,9 @@ class RendaVariavelProventosRepository(FirestoreRepository[RendaVariavelProvento
 
     COLLECTION = "renda_variavel_proventos"
 
-    def __init__(self, gateway: FirestoreGatewayProtocol) -> None:
-        super().__init__(self.COLLECTION, gateway, RendaVariavelProvento)
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        async_gateway: AsyncFirestoreGatewayProtocol | None = None,
+    ) -> None:
+        super().__init__(self.COLLECTION, gateway, RendaVariavelProvento, async_gateway)
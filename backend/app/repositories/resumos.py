@@ -0,0 +1,47 @@
+"""Repository for materialised summary documents."""
+from __future__ import annotations
+
+from typing import Any, Callable, Mapping, Sequence
+
+from .base import FirestoreRepository
+from .interfaces import AsyncFirestoreGatewayProtocol, FirestoreGatewayProtocol
+from ..models import Resumo
+
+
+class ResumosRepository(FirestoreRepository[Resumo]):
+    """Repository bound to `resumos`, one document per dominio (id = dominio)."""
+
+    COLLECTION = "resumos"
+
+    def __init__(
+        self,
+        gateway: FirestoreGatewayProtocol,
+        async_gateway: AsyncFirestoreGatewayProtocol | None = None,
+    ) -> None:
+        super().__init__(self.COLLECTION, gateway, Resumo, async_gateway)
+
+    def save_many(self, resumos: Sequence[Resumo]) -> None:
+        """Store whole summaries, keyed by dominio, with a single batched write."""
+
+        self._gateway.add_documents(
+            self._collection,
+            [
+                (resumo.dominio, resumo.model_dump(mode="json", exclude={"id"}))
+                for resumo in resumos
+            ],
+            merge=False,
+        )
+
+    def transform(self, dominio: str, transform: Callable[[Resumo | None], Resumo]) -> Resumo:
+        """Replace the summary of ``dominio`` with ``transform(current)`` atomically.
+
+        ``current`` is None when no summary is stored. ``transform`` may run
+        more than once and must not have side effects.
+        """
+
+        def apply(document: Mapping[str, Any] | None) -> Mapping[str, Any]:
+            current = None if document is None else Resumo.model_validate(document)
+            return transform(current).model_dump(mode="json", exclude={"id"})
+
+        stored = self._gateway.transform_document(self._collection, dominio, apply)
+        return Resumo.model_validate({**stored, "id": dominio})
@@ -0,0 +1,276 @@
+"""Append-only columnar store of daily portfolio snapshots."""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterator, Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from .errors import DocumentConflictError, RepositoryError
+
+_INDEX = "indice.json"
+_LOCK = ".lock"
+# Column files as (name, dtype). ``datas`` is appended last and acts as the
+# commit record; the other files are truncated back to it when opening.
+_DATAS = ("datas", np.int32)
+_FIM = ("fim", np.int64)
+_GRUPOS = ("grupos", np.float64)
+_POSICAO = ("posicao", np.int32)
+VALORES = ("quantidade", "cotacao", "total_mercado")
+
+
+class SnapshotStore:
+    """Daily snapshots kept as flat NumPy columns in ``directory``.
+
+    Day ``i`` (the date index) has its ordinal in ``datas[i]`` and one
+    value per group in row ``i`` of ``grupos`` (named by ``colunas``, fixed
+    when the store is created). Per-position values live in columns shared
+    by all days: day ``i`` owns rows ``fim[i - 1]:fim[i]`` of ``posicao``
+    (the position index, resolved through ``indice.json``) and of the
+    ``VALORES`` columns. Files are only ever appended to and are read
+    through ``np.memmap``, so a range query touches the pages of that range
+    and never the whole history.
+
+    Several processes (web workers, the CLI) may share a directory: appends
+    hold an exclusive ``flock`` on ``.lock`` and reads a shared one, and
+    both reload the day count and position index from disk first.
+    """
+
+    def __init__(self, directory: str, colunas: Sequence[str]) -> None:
+        self._directory = directory
+        self._colunas = list(colunas)
+        self._lock = threading.Lock()
+        self._posicoes: list[dict[str, str]] = []
+        self._indices: dict[str, int] = {}
+        self._index_stat: tuple[int, int, int] | None = None
+        self._dias = 0
+        self._maps: dict[str, np.memmap] = {}
+        if os.path.isdir(directory):
+            # Validates the columns and drops any interrupted append.
+            with self._locked(exclusive=True):
+                pass
+
+    @property
+    def colunas(self) -> list[str]:
+        return list(self._colunas)
+
+    def __len__(self) -> int:
+        with self._locked():
+            return self._dias
+
+    def ultimo_dia(self) -> date | None:
+        with self._locked():
+            if not self._dias:
+                return None
+            return date.fromordinal(int(self._column(*_DATAS)[-1]))
+
+    def append(
+        self,
+        dia: date,
+        ids: Sequence[str],
+        tickers: Sequence[str],
+        grupos: ArrayLike,
+        valores: dict[str, ArrayLike],
+    ) -> None:
+        """Append the snapshot of ``dia``, which must follow the last one.
+
+        ``grupos`` holds one value per column; ``valores`` one array per
+        name in ``VALORES``, aligned with ``ids``.
+        """
+
+        grupos = np.asarray(grupos, dtype=np.float64)
+        if grupos.shape != (len(self._colunas),):
+            raise ValueError("grupos deve ter um valor por coluna")
+        columns = {nome: np.asarray(valores[nome], dtype=np.float64) for nome in VALORES}
+        if any(column.shape != (len(ids),) for column in columns.values()):
+            raise ValueError("valores devem ter um item por posicao")
+
+        with self._locked(exclusive=True):
+            datas = self._column(*_DATAS)
+            if self._dias and dia.toordinal() <= int(datas[-1]):
+                raise DocumentConflictError(f"snapshot de {dia.isoformat()} ja registrado")
+
+            novas = [
+                {"id": position_id, "ticker": ticker}
+                for position_id, ticker in zip(ids, tickers)
+                if position_id not in self._indices
+            ]
+            if novas:
+                for posicao in novas:
+                    self._indices[posicao["id"]] = len(self._posicoes)
+                    self._posicoes.append(posicao)
+                self._write_index()
+
+            fim = int(self._column(*_FIM)[-1]) if self._dias else 0
+            indices = np.fromiter(
+                (self._indices[position_id] for position_id in ids), dtype=np.int32, count=len(ids)
+            )
+            self._append(_POSICAO[0], indices)
+            for nome in VALORES:
+                self._append(nome, columns[nome])
+            self._append(_GRUPOS[0], grupos)
+            self._append(_FIM[0], np.array([fim + len(ids)], dtype=np.int64))
+            self._append(_DATAS[0], np.array([dia.toordinal()], dtype=np.int32))
+            self._dias += 1
+            self._maps.clear()
+
+    def serie_grupos(
+        self, inicio: date | None = None, fim: date | None = None
+    ) -> tuple[list[date], NDArray[np.float64]]:
+        """Return the days in ``[inicio, fim]`` and their group values (days x colunas)."""
+
+        with self._locked():
+            primeiro, ultimo = self._range(inicio, fim)
+            datas = self._column(*_DATAS)[primeiro:ultimo]
+            valores = self._column(*_GRUPOS).reshape(-1, len(self._colunas))[primeiro:ultimo]
+            return _dias(datas), np.array(valores)
+
+    def serie_posicao(
+        self, position_id: str, inicio: date | None = None, fim: date | None = None
+    ) -> tuple[list[date], dict[str, NDArray[np.float64]]]:
+        """Return the days in ``[inicio, fim]`` holding ``position_id`` and its values.
+
+        A position never snapshotted has an empty series.
+        """
+
+        with self._locked():
+            indice = self._indices.get(position_id)
+            primeiro, ultimo = self._range(inicio, fim)
+            if indice is None or primeiro >= ultimo:
+                return [], {nome: np.empty(0) for nome in VALORES}
+            fins = self._column(*_FIM)
+            de = int(fins[primeiro - 1]) if primeiro else 0
+            ate = int(fins[ultimo - 1])
+            linhas = np.flatnonzero(self._column(*_POSICAO)[de:ate] == indice)
+            # Each matching row belongs to the first day whose end lies past it.
+            dias = np.searchsorted(fins[primeiro:ultimo], linhas + de, side="right") + primeiro
+            datas = self._column(*_DATAS)[dias]
+            return _dias(datas), {
+                nome: np.array(self._column(nome, np.float64)[de:ate][linhas]) for nome in VALORES
+            }
+
+    def ticker(self, position_id: str) -> str | None:
+        with self._locked():
+            indice = self._indices.get(position_id)
+            return None if indice is None else self._posicoes[indice]["ticker"]
+
+    @contextmanager
+    def _locked(self, exclusive: bool = False) -> Iterator[None]:
+        """Hold the thread lock and the directory ``flock`` with fresh state."""
+
+        with self._lock:
+            if not exclusive and not os.path.isdir(self._directory):
+                yield
+                return
+            os.makedirs(self._directory, exist_ok=True)
+            with open(os.path.join(self._directory, _LOCK), "ab") as handle:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    self._reload(exclusive)
+                    yield
+                finally:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _reload(self, repair: bool) -> None:
+        """Pick up appends made by other processes since the last call."""
+
+        index_path = os.path.join(self._directory, _INDEX)
+        try:
+            stat = os.stat(index_path)
+        except FileNotFoundError:
+            self._posicoes, self._indices, self._index_stat = [], {}, None
+        else:
+            index_stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if index_stat != self._index_stat:
+                with open(index_path, encoding="utf-8") as handle:
+                    index = json.load(handle)
+                if index["colunas"] != self._colunas:
+                    raise RepositoryError(
+                        f"colunas do historico em {self._directory} nao correspondem: "
+                        f"{index['colunas']}"
+                    )
+                self._posicoes = index["posicoes"]
+                self._indices = {
+                    posicao["id"]: indice for indice, posicao in enumerate(self._posicoes)
+                }
+                self._index_stat = index_stat
+
+        dias = self._length(*_DATAS)
+        if dias != self._dias:
+            self._dias = dias
+            self._maps.clear()
+        if repair:
+            # Drop the tail of an append interrupted before ``datas`` was
+            # written; only writers may, as readers share the lock.
+            self._maps.clear()
+            self._truncate(_DATAS[0], np.int32, self._dias)
+            self._truncate(_FIM[0], np.int64, self._dias)
+            self._truncate(_GRUPOS[0], np.float64, self._dias * len(self._colunas))
+            valores = int(self._column(*_FIM)[-1]) if self._dias else 0
+            self._truncate(_POSICAO[0], np.int32, valores)
+            for nome in VALORES:
+                self._truncate(nome, np.float64, valores)
+            self._maps.clear()
+
+    def _path(self, nome: str) -> str:
+        return os.path.join(self._directory, f"{nome}.bin")
+
+    def _length(self, nome: str, dtype: type[np.generic]) -> int:
+        path = self._path(nome)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        return size // np.dtype(dtype).itemsize
+
+    def _truncate(self, nome: str, dtype: type[np.generic], count: int) -> None:
+        if self._length(nome, dtype) < count:
+            raise RepositoryError(f"arquivo do historico incompleto: {self._path(nome)}")
+        if self._length(nome, dtype) > count:
+            os.truncate(self._path(nome), count * np.dtype(dtype).itemsize)
+
+    def _column(self, nome: str, dtype: type[np.generic]) -> NDArray:
+        column = self._maps.get(nome)
+        if column is None:
+            count = self._length(nome, dtype)
+            if count == 0:
+                return np.empty(0, dtype=dtype)
+            column = np.memmap(self._path(nome), dtype=dtype, mode="r", shape=(count,))
+            self._maps[nome] = column
+        return column
+
+    def _range(self, inicio: date | None, fim: date | None) -> tuple[int, int]:
+        datas = self._column(*_DATAS)
+        primeiro = 0 if inicio is None else int(np.searchsorted(datas, inicio.toordinal()))
+        ultimo = (
+            self._dias
+            if fim is None
+            else int(np.searchsorted(datas, fim.toordinal(), side="right"))
+        )
+        return primeiro, max(primeiro, ultimo)
+
+    def _append(self, nome: str, values: NDArray) -> None:
+        with open(self._path(nome), "ab") as handle:
+            values.tofile(handle)
+            handle.flush()
+            # Durable before the next column, so ``datas`` is written last.
+            os.fsync(handle.fileno())
+
+    def _write_index(self) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump({"colunas": self._colunas, "posicoes": self._posicoes}, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        index_path = os.path.join(self._directory, _INDEX)
+        os.replace(temp_path, index_path)
+        stat = os.stat(index_path)
+        self._index_stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _dias(ordinais: NDArray) -> list[date]:
+    return [date.fromordinal(ordinal) for ordinal in ordinais.tolist()]
@@ -0,0 +1,456 @@
+"""SQLite-backed gateway implementing Firestore-like semantics."""
+from __future__ import annotations
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Mapping, Sequence
+from uuid import uuid4
+
+from .errors import DocumentNotFoundError, PersistenceLayerError
+from .interfaces import QUERY_OPERATORS, FirestoreGatewayProtocol, QueryFilter
+from .tinydb_gateway import _convert, _project
+
+#: Document fields copied into their own indexed columns.
+INDEXED_FIELDS = ("tipo", "position_id", "data")
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# Keeps ``id IN (...)`` lookups under SQLite's bound-parameter limit.
+_MAX_VARIABLES = 500
+
+
+class SqliteGateway(FirestoreGatewayProtocol):
+    """Gateway storing each collection in its own SQLite table.
+
+    Documents are kept as JSON next to indexed ``id``, ``tipo``,
+    ``position_id`` and ``data`` columns, so the common filters and the
+    trade ordering are answered by indexes instead of full scans. File
+    databases run in WAL mode, letting readers proceed while a write is in
+    progress. Calls borrow a connection from a pool of at most
+    ``max_connections``, so the count stays bounded however many threads
+    use the gateway.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0, max_connections: int = 8) -> None:
+        if path == ":memory:":
+            # A named shared-cache database is visible to every pooled
+            # connection.
+            self._target = f"file:sqlite-gateway-{uuid4().hex}?mode=memory&cache=shared"
+        else:
+            self._target = "file:" + os.path.abspath(path)
+        self._timeout = timeout
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._idle: list[sqlite3.Connection] = []
+        self._available = threading.BoundedSemaphore(max(max_connections, 1))
+        self._tables: set[str] = set()
+        self._lock = threading.Lock()
+        # Keeps a shared in-memory database alive between borrowed connections.
+        self._keeper = self._connect() if path == ":memory:" else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "SqliteGateway":
+        """Build a gateway backed by a database file or an in-memory database."""
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return cls(path)
+
+    def close(self) -> None:
+        """Close every connection opened by the gateway."""
+
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+            self._idle.clear()
+
+    def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        return self.add_documents(collection, [(document_id, payload)], merge=merge)[0]
+
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        table = self._table(collection)
+        records: dict[str, dict[str, Any]] = {}
+        document_ids: list[str] = []
+        for document_id, payload in documents:
+            doc_id = document_id or uuid4().hex
+            record = {key: _convert(value) for key, value in payload.items()}
+            record["id"] = doc_id
+            if merge and doc_id in records:
+                records[doc_id].update(record)
+            else:
+                records[doc_id] = record
+            document_ids.append(doc_id)
+
+        with self._transaction("erro ao salvar documentos no sqlite") as connection:
+            if merge:
+                stored = self._fetch(connection, table, list(records))
+                for doc_id, record in records.items():
+                    if doc_id in stored:
+                        records[doc_id] = {**stored[doc_id], **record}
+            connection.executemany(
+                f'INSERT OR REPLACE INTO "{table}" (id, tipo, position_id, data, doc) '
+                "VALUES (?, ?, ?, ?, ?)",
+                [_row(record) for record in records.values()],
+            )
+        return document_ids
+
+    def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        table = self._table(collection)
+        changes = {key: _convert(value) for key, value in payload.items()}
+        with self._transaction("erro ao atualizar documento no sqlite") as connection:
+            # Fields not in the payload keep their stored values, as on Firestore.
+            current = self._fetch(connection, table, [document_id]).get(document_id)
+            if current is None:
+                raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+            record = {**current, **changes, "id": document_id}
+            connection.execute(
+                f'UPDATE "{table}" SET tipo = ?, position_id = ?, data = ?, doc = ? WHERE id = ?',
+                (*_row(record)[1:], document_id),
+            )
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        table = self._table(collection)
+        changes: dict[str, dict[str, Any]] = {}
+        for document_id, payload in documents:
+            changes.setdefault(document_id, {}).update(
+                {key: _convert(value) for key, value in payload.items()}
+            )
+        with self._transaction("erro ao atualizar documentos no sqlite") as connection:
+            stored = self._fetch(connection, table, list(changes))
+            records = [
+                {**stored[document_id], **fields, "id": document_id}
+                for document_id, fields in changes.items()
+                if document_id in stored
+            ]
+            connection.executemany(
+                f'UPDATE "{table}" SET tipo = ?, position_id = ?, data = ?, doc = ? WHERE id = ?',
+                [(*_row(record)[1:], record["id"]) for record in records],
+            )
+        return [document_id for document_id in changes if document_id not in stored]
+
+    def transform_document(
+        self,
+        collection: str,
+        document_id: str,
+        transform: Callable[[Mapping[str, Any] | None], Mapping[str, Any]],
+    ) -> Mapping[str, Any]:
+        table = self._table(collection)
+        # ``BEGIN IMMEDIATE`` holds the write lock from the read onwards.
+        with self._transaction("erro ao atualizar documento no sqlite") as connection:
+            current = self._fetch(connection, table, [document_id]).get(document_id)
+            record = {key: _convert(value) for key, value in transform(current).items()}
+            record["id"] = document_id
+            connection.execute(
+                f'INSERT OR REPLACE INTO "{table}" (id, tipo, position_id, data, doc) '
+                "VALUES (?, ?, ?, ?, ?)",
+                _row(record),
+            )
+        return record
+
+    def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        return self.get_documents(collection, [document_id]).get(document_id)
+
+    def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        table = self._table(collection)
+        with self._reading("erro ao buscar documentos no sqlite") as connection:
+            return self._fetch(connection, table, list(dict.fromkeys(document_ids)))
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        return self.query_documents(collection, fields=fields)
+
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        table = self._table(collection)
+        clauses, parameters = _conditions(filters)
+        sql = f'SELECT doc FROM "{table}"' + _where(clauses)
+        if order_by:
+            sql += " ORDER BY " + _order(_column(order_by), descending)
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        with self._reading("erro ao consultar documentos no sqlite") as connection:
+            rows = connection.execute(sql, parameters).fetchall()
+        return [_project(json.loads(doc), fields) for (doc,) in rows]
+
+    def iter_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[Mapping[str, Any]]:
+        table = self._table(collection)
+        clauses, parameters = _conditions(filters)
+        lookup = ["id"]
+        phases: list[tuple[list[str], list[str], bool]] = [([], ["id"], False)]
+        if order_by:
+            # Present and missing values are paged separately so every page
+            # seeks an index; missing values sort last, like TinyDB.
+            column = _column(order_by)
+            lookup = [column, "id"]
+            phases = [
+                ([f"{column} IS NOT NULL"], [column, "id"], False),
+                ([f"{column} IS NULL"], ["id"], True),
+            ]
+            if descending:
+                phases.reverse()
+
+        cursor: tuple[Any, ...] | None = None
+        if start_after is not None:
+            with self._reading("erro ao listar documentos no sqlite") as connection:
+                row = connection.execute(
+                    f'SELECT {", ".join(lookup)} FROM "{table}" WHERE id = ?', (start_after,)
+                ).fetchone()
+            if row is None:
+                return
+            missing = order_by is not None and row[0] is None
+            start = next(index for index, phase in enumerate(phases) if phase[2] == missing)
+            phases = phases[start:]
+            cursor = (start_after,) if missing else tuple(row)
+
+        for phase_clauses, key_columns, _ in phases:
+            yield from self._pages(
+                table,
+                [*clauses, *phase_clauses],
+                parameters,
+                key_columns,
+                descending,
+                page_size,
+                cursor,
+                fields,
+            )
+            cursor = None
+
+    def _pages(
+        self,
+        table: str,
+        clauses: Sequence[str],
+        parameters: Sequence[Any],
+        key_columns: Sequence[str],
+        descending: bool,
+        page_size: int,
+        cursor: tuple[Any, ...] | None,
+        fields: Sequence[str] | None,
+    ) -> Iterator[Mapping[str, Any]]:
+        key = ", ".join(key_columns)
+        direction = "DESC" if descending else "ASC"
+        order = ", ".join(f"{column} {direction}" for column in key_columns)
+        comparison = "<" if descending else ">"
+        while True:
+            # Keyset pagination: each page seeks past the last key read.
+            page_clauses = list(clauses)
+            page_parameters = list(parameters)
+            if cursor is not None:
+                page_clauses.append(f"({key}) {comparison} ({', '.join('?' * len(cursor))})")
+                page_parameters.extend(cursor)
+            sql = f'SELECT {key}, doc FROM "{table}"' + _where(page_clauses)
+            sql += f" ORDER BY {order} LIMIT ?"
+            page_parameters.append(page_size)
+            with self._reading("erro ao listar documentos no sqlite") as connection:
+                rows = connection.execute(sql, page_parameters).fetchall()
+            for row in rows:
+                yield _project(json.loads(row[-1]), fields)
+            if len(rows) < page_size:
+                return
+            cursor = tuple(row[:-1])
+
+    def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        table = self._table(collection)
+        with self._transaction("erro ao excluir documento no sqlite") as connection:
+            cursor = connection.execute(f'DELETE FROM "{table}" WHERE id = ?', (document_id,))
+            if cursor.rowcount == 0 and must_exist:
+                raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection; nested calls on a thread share it."""
+
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            yield connection
+            return
+        self._available.acquire()
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                connection = self._connect()
+            self._local.connection = connection
+            try:
+                yield connection
+            finally:
+                self._local.connection = None
+                with self._lock:
+                    if connection in self._connections:
+                        self._idle.append(connection)
+        finally:
+            self._available.release()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self._target,
+            timeout=self._timeout,
+            uri=True,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._connections.append(connection)
+        return connection
+
+    def _table(self, collection: str) -> str:
+        if collection in self._tables:
+            return collection
+        if not _IDENTIFIER.match(collection):
+            raise ValueError(f"nome de colecao invalido: {collection}")
+        with self._transaction("erro ao criar tabela no sqlite") as connection:
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{collection}" ('
+                "id TEXT PRIMARY KEY, tipo TEXT, position_id TEXT, data TEXT, doc TEXT NOT NULL)"
+            )
+            # ``id`` closes each index so keyset pages resolve ties in order.
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "{collection}_tipo" ON "{collection}" (tipo, id)'
+            )
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "{collection}_position_data" '
+                f'ON "{collection}" (position_id, data, id)'
+            )
+            connection.execute(
+                f'CREATE INDEX IF NOT EXISTS "{collection}_data" ON "{collection}" (data, id)'
+            )
+        with self._lock:
+            self._tables.add(collection)
+        return collection
+
+    @contextmanager
+    def _transaction(self, message: str) -> Iterator[sqlite3.Connection]:
+        with self._connection() as connection:
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    yield connection
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+            except sqlite3.Error as exc:
+                raise PersistenceLayerError(message) from exc
+
+    @contextmanager
+    def _reading(self, message: str) -> Iterator[sqlite3.Connection]:
+        with self._connection() as connection:
+            try:
+                yield connection
+            except sqlite3.Error as exc:
+                raise PersistenceLayerError(message) from exc
+
+    def _fetch(
+        self,
+        connection: sqlite3.Connection,
+        table: str,
+        document_ids: list[str],
+    ) -> dict[str, dict[str, Any]]:
+        documents: dict[str, dict[str, Any]] = {}
+        for start in range(0, len(document_ids), _MAX_VARIABLES):
+            chunk = document_ids[start : start + _MAX_VARIABLES]
+            rows = connection.execute(
+                f'SELECT id, doc FROM "{table}" WHERE id IN ({", ".join("?" * len(chunk))})',
+                chunk,
+            )
+            documents.update((doc_id, json.loads(doc)) for doc_id, doc in rows)
+        return documents
+
+
+def _row(record: Mapping[str, Any]) -> tuple[Any, ...]:
+    indexed = (_indexable(record.get(field)) for field in INDEXED_FIELDS)
+    return (record["id"], *indexed, json.dumps(record))
+
+
+def _indexable(value: Any) -> Any:
+    return value if value is None or isinstance(value, (str, int, float)) else None
+
+
+def _column(field: str) -> str:
+    if field == "id" or field in INDEXED_FIELDS:
+        return field
+    if not _IDENTIFIER.match(field):
+        raise ValueError(f"campo invalido: {field}")
+    return f"json_extract(doc, '$.{field}')"
+
+
+def _order(column: str, descending: bool) -> str:
+    # Missing values sort last, like the TinyDB gateway.
+    if descending:
+        return f"({column} IS NULL) DESC, {column} DESC"
+    return f"({column} IS NULL), {column}"
+
+
+def _where(clauses: Sequence[str]) -> str:
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+def _conditions(filters: Sequence[QueryFilter]) -> tuple[list[str], list[Any]]:
+    clauses: list[str] = []
+    parameters: list[Any] = []
+    for field, operator_name, value in filters:
+        if operator_name not in QUERY_OPERATORS:
+            raise ValueError(f"operador de filtro invalido: {operator_name}")
+        column = _column(field)
+        if operator_name == "in":
+            values = [_convert(item) for item in value]
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            parameters.extend(values)
+        else:
+            clauses.append(f"{column} {operator_name} ?")
+            parameters.append(_convert(value))
+    return clauses, parameters
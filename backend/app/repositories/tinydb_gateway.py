@@ -1,15 +1,20 @@
 """TinyDB-backed gateway implementing Firestore-like semantics."""
 from __future__ import annotations
 
+import operator
 import os
 from datetime import datetime
-from typing import Any, Mapping, MutableMapping
+from enum import Enum
+from typing import Any, Callable, Iterator, Mapping, MutableMapping, Sequence
 from uuid import uuid4
 
 from tinydb import TinyDB, Query
+from tinydb.queries import QueryInstance
 from tinydb.storages import MemoryStorage
 
-from .interfaces import FirestoreGatewayProtocol
+from .errors import DocumentNotFoundError
+from .interfaces import QUERY_OPERATORS, FirestoreGatewayProtocol, QueryFilter
+from .journal_storage import JournalStorage
 
 
 class TinyDbGateway(FirestoreGatewayProtocol):
@@ -17,17 +22,31 @@ class TinyDbGateway(FirestoreGatewayProtocol):
 
     def __init__(self, database: TinyDB):
         self._database = database
+        # Per-table map of document id -> TinyDB doc_id, built on first use.
+        self._indexes: dict[str, dict[str, int]] = {}
+        # A journal storage takes writes directly, without TinyDB rebuilding
+        # the whole table for each of them.
+        storage = database.storage
+        self._journal = storage if isinstance(storage, JournalStorage) else None
+        self._next_ids: dict[str, int] = {}
 
     @classmethod
-    def from_file(cls, path: str) -> "TinyDbGateway":
-        """Build a gateway backed by a JSON file or in-memory storage."""
+    def from_file(cls, path: str, storage: str = "json") -> "TinyDbGateway":
+        """Build a gateway backed by a JSON file or in-memory storage.
+
+        ``storage="journal"`` keeps the file as a compacted snapshot plus an
+        append-only journal of changed documents (see ``JournalStorage``).
+        """
         if path == ":memory:":
             db = TinyDB(storage=MemoryStorage)
             return cls(db)
 
         normalized = os.path.abspath(path)
         os.makedirs(os.path.dirname(normalized), exist_ok=True)
-        db = TinyDB(normalized, indent=2)
+        if storage == "journal":
+            db = TinyDB(normalized, storage=JournalStorage)
+        else:
+            db = TinyDB(normalized, indent=2)
         return cls(db)
 
     def close(self) -> None:
@@ -41,55 +60,300 @@ class TinyDbGateway(FirestoreGatewayProtocol):
         document_id: str | None = None,
         merge: bool = False,
     ) -> str:
-        table = self._database.table(collection)
         doc_id = document_id or uuid4().hex
         record = self._prepare_payload(payload)
+        record["id"] = doc_id
 
-        condition = Query().id == doc_id
-        existing = table.get(condition)
-        if existing:
-            if merge:
-                updated: MutableMapping[str, Any] = dict(existing)
-                updated.update(record)
-                updated["id"] = doc_id
-                table.update(updated, condition)
-            else:
-                table.remove(condition)
-                record["id"] = doc_id
-                table.insert(record)
+        if doc_id in self._index(collection):
+            self._update(collection, {doc_id: record}, merge)
         else:
-            record["id"] = doc_id
-            table.insert(record)
+            self._insert(collection, [record])
 
         return doc_id
 
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        index = self._index(collection)
+        records: dict[str, dict[str, Any]] = {}
+        document_ids: list[str] = []
+        for document_id, payload in documents:
+            doc_id = document_id or uuid4().hex
+            record = self._prepare_payload(payload)
+            record["id"] = doc_id
+            if merge and doc_id in records:
+                records[doc_id].update(record)
+            else:
+                records[doc_id] = record
+            document_ids.append(doc_id)
+
+        existing = {doc_id: record for doc_id, record in records.items() if doc_id in index}
+        if existing:
+            self._update(collection, existing, merge)
+        new_records = [record for doc_id, record in records.items() if doc_id not in existing]
+        if new_records:
+            self._insert(collection, new_records)
+
+        return document_ids
+
+    def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        if document_id not in self._index(collection):
+            raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+        record = self._prepare_payload(payload)
+        record["id"] = document_id
+        # Fields not in the payload keep their stored values, as on Firestore.
+        self._update(collection, {document_id: record}, True)
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        index = self._index(collection)
+        records: dict[str, dict[str, Any]] = {}
+        for document_id, payload in documents:
+            records.setdefault(document_id, {"id": document_id}).update(
+                self._prepare_payload(payload)
+            )
+        existing = {doc_id: record for doc_id, record in records.items() if doc_id in index}
+        if existing:
+            self._update(collection, existing, True)
+        return [doc_id for doc_id in records if doc_id not in index]
+
+    def transform_document(
+        self,
+        collection: str,
+        document_id: str,
+        transform: Callable[[Mapping[str, Any] | None], Mapping[str, Any]],
+    ) -> Mapping[str, Any]:
+        # TinyDB is used from one thread, so nothing runs between the
+        # read and the write below.
+        current = self.get_document(collection, document_id)
+        record = self._prepare_payload(transform(current))
+        record["id"] = document_id
+        self.add_document(collection, record, document_id)
+        return record
+
     def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
-        table = self._database.table(collection)
-        document = table.get(Query().id == document_id)
-        if document is None:
+        storage_id = self._index(collection).get(document_id)
+        if storage_id is None:
+            return None
+        document = self._database.table(collection).get(doc_id=storage_id)
+        if document is None:  # pragma: no cover - index out of sync with storage
+            self._indexes.pop(collection, None)
             return None
         return dict(document)
 
-    def list_documents(self, collection: str) -> list[Mapping[str, Any]]:
+    def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        index = self._index(collection)
+        storage_ids = {index[doc_id] for doc_id in document_ids if doc_id in index}
+        if not storage_ids:
+            return {}
+        # One storage read for the whole batch: JSONStorage re-parses the
+        # file on every read.
+        found = {
+            document["id"]: dict(document)
+            for document in self._database.table(collection).get(doc_ids=list(storage_ids))
+        }
+        return {doc_id: found[doc_id] for doc_id in document_ids if doc_id in found}
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
         table = self._database.table(collection)
-        return [dict(item) for item in table.all()]
+        return [_project(item, fields) for item in table.all()]
 
-    def delete_document(self, collection: str, document_id: str) -> None:
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
         table = self._database.table(collection)
-        table.remove(Query().id == document_id)
+        condition = _build_condition(filters)
+        documents = table.search(condition) if condition is not None else table.all()
+        items = [dict(item) for item in documents]
+        if order_by:
+            items.sort(key=_sort_key(order_by), reverse=descending)
+        if limit is not None:
+            items = items[:limit]
+        if fields is not None:
+            items = [_project(item, fields) for item in items]
+        return items
+
+    def iter_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[Mapping[str, Any]]:
+        items = self.query_documents(collection, filters)
+        value_key = _sort_key(order_by) if order_by else None
+        items.sort(
+            key=lambda item: (value_key(item) if value_key else (), item["id"]),
+            reverse=descending,
+        )
+        start = 0
+        if start_after is not None:
+            ids = [item["id"] for item in items]
+            if start_after not in ids:
+                return
+            start = ids.index(start_after) + 1
+        for item in items[start:]:
+            yield _project(item, fields)
+
+    def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        storage_id = self._index(collection).pop(document_id, None)
+        if storage_id is not None:
+            if self._journal is not None:
+                self._journal.delete_documents(collection, [str(storage_id)])
+                self._database.table(collection).clear_cache()
+            else:
+                self._database.table(collection).remove(doc_ids=[storage_id])
+        elif must_exist:
+            raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+
+    def _update(
+        self, collection: str, records: Mapping[str, Mapping[str, Any]], merge: bool
+    ) -> None:
+        """Write ``records`` (keyed by document id) over indexed documents."""
+
+        index = self._index(collection)
+        if self._journal is not None:
+            stored = self._journal.table(collection)
+            documents = {}
+            for doc_id, record in records.items():
+                storage_id = str(index[doc_id])
+                documents[storage_id] = {**stored[storage_id], **record} if merge else dict(record)
+            self._journal.set_documents(collection, documents)
+            self._database.table(collection).clear_cache()
+            return
+
+        def apply(document: MutableMapping[str, Any]) -> None:
+            _writer(records[document["id"]], merge)(document)
+
+        # Updating by doc_id touches only the affected rows in one write.
+        self._database.table(collection).update(
+            apply, doc_ids=[index[doc_id] for doc_id in records]
+        )
+
+    def _insert(self, collection: str, records: Sequence[dict[str, Any]]) -> None:
+        index = self._index(collection)
+        if self._journal is not None:
+            next_id = self._next_ids.get(collection)
+            if next_id is None:
+                next_id = max(map(int, self._journal.table(collection)), default=0) + 1
+            storage_ids = list(range(next_id, next_id + len(records)))
+            self._next_ids[collection] = next_id + len(records)
+            self._journal.set_documents(
+                collection,
+                {str(storage_id): record for storage_id, record in zip(storage_ids, records)},
+            )
+            self._database.table(collection).clear_cache()
+        else:
+            storage_ids = self._database.table(collection).insert_multiple(records)
+        for record, storage_id in zip(records, storage_ids):
+            index[record["id"]] = storage_id
+
+    def _index(self, collection: str) -> dict[str, int]:
+        index = self._indexes.get(collection)
+        if index is None:
+            table = self._database.table(collection)
+            index = {item["id"]: item.doc_id for item in table.all() if "id" in item}
+            self._indexes[collection] = index
+        return index
 
     def _prepare_payload(self, payload: Mapping[str, Any]) -> dict[str, Any]:
-        def convert(value: Any) -> Any:
-            if isinstance(value, Mapping):
-                return {key: convert(val) for key, val in value.items()}
-            if isinstance(value, (list, tuple)):
-                return [convert(item) for item in value]
-            if hasattr(value, "isoformat") and isinstance(value, datetime):
-                return value.isoformat()
-            from enum import Enum
-
-            if isinstance(value, Enum):
-                return value.value
-            return value
-
-        return {key: convert(val) for key, val in payload.items()}
+        return {key: _convert(val) for key, val in payload.items()}
+
+
+def _project(document: Mapping[str, Any], fields: Sequence[str] | None) -> dict[str, Any]:
+    if fields is None:
+        return dict(document)
+    projected = {field: document[field] for field in fields if field in document}
+    projected["id"] = document.get("id")
+    return projected
+
+
+def _writer(record: Mapping[str, Any], merge: bool) -> Callable[[MutableMapping[str, Any]], None]:
+    def write(document: MutableMapping[str, Any]) -> None:
+        if not merge:
+            document.clear()
+        document.update(record)
+
+    return write
+
+
+def _convert(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {key: _convert(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_convert(item) for item in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+_COMPARATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda stored, expected: stored in expected,
+}
+
+
+def _build_condition(filters: Sequence[QueryFilter]) -> QueryInstance | None:
+    condition: QueryInstance | None = None
+    for field, operator_name, value in filters:
+        if operator_name not in QUERY_OPERATORS:
+            raise ValueError(f"operador de filtro invalido: {operator_name}")
+        compare = _COMPARATORS[operator_name]
+        expected = _convert(value)
+
+        def test(stored: Any, compare=compare, expected=expected) -> bool:
+            try:
+                return compare(stored, expected)
+            except TypeError:
+                return False
+
+        clause = Query()[field].test(test)
+        condition = clause if condition is None else condition & clause
+    return condition
+
+
+def _sort_key(field: str) -> Callable[[Mapping[str, Any]], tuple[bool, Any]]:
+    def key(document: Mapping[str, Any]) -> tuple[bool, Any]:
+        value = document.get(field)
+        return (value is None, value if value is not None else "")
+
+    return key
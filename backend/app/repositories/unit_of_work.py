@@ -0,0 +1,463 @@
+"""Unit of work with an identity map, layered over a gateway."""
+from __future__ import annotations
+
+from typing import Any, Callable, Hashable, Iterator, Mapping, Sequence
+from uuid import uuid4
+
+from .caching_gateway import _freeze
+from .errors import DocumentNotFoundError
+from .interfaces import QUERY_OPERATORS, FirestoreGatewayProtocol, QueryFilter
+from .tinydb_gateway import _COMPARATORS, _convert, _sort_key
+
+_Key = tuple[str, str]
+_Transform = Callable[[Mapping[str, Any] | None], Mapping[str, Any]]
+
+
+class UnitOfWork(FirestoreGatewayProtocol):
+    """Gateway decorator scoped to a single unit of work (e.g. one request).
+
+    Documents read through it are kept in an identity map, so repeated
+    ``get_document`` calls and repeated full-document queries are answered
+    from memory. Writes to documents it already knows are staged and sent
+    by ``commit`` in one batch per collection and kind of write; reads
+    made before the commit see the staged state. Full sets go out through
+    ``add_documents``. ``update_document`` and merging ``add_document``
+    calls stay field patches, sent through ``update_documents`` and a
+    merging ``add_documents``, so fields written by others since the read
+    are kept and an update never recreates a document deleted meanwhile
+    (commit raises ``DocumentNotFoundError`` instead). Writes to documents
+    it has not loaded, and ``update_documents`` batches, are sent
+    immediately, so missing documents still surface at the call site.
+    ``transform_document`` results are staged too, but commit sends the
+    transforms themselves, so the read-modify-write stays atomic against
+    writers outside the unit of work. Not thread-safe: use one instance
+    per request.
+    """
+
+    def __init__(self, gateway: FirestoreGatewayProtocol) -> None:
+        self._gateway = gateway
+        # Datastore state as read during the unit of work; None = missing.
+        self._loaded: dict[_Key, dict[str, Any] | None] = {}
+        # Staged state, in write order; None = deleted.
+        self._pending: dict[_Key, dict[str, Any] | None] = {}
+        self._queries: dict[tuple[Hashable, ...], list[str]] = {}
+        # Transforms behind staged documents, replayed on the datastore by commit.
+        self._transforms: dict[_Key, list[_Transform]] = {}
+        # Field patches behind staged documents and whether they need the
+        # document to exist (update) or may create it (merge).
+        self._patches: dict[_Key, tuple[dict[str, Any], bool]] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._gateway, name)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether writes are waiting for ``commit``."""
+
+        return bool(self._pending)
+
+    def commit(self) -> None:
+        """Send every staged write to the wrapped gateway."""
+
+        self._flush(None)
+
+    def rollback(self) -> None:
+        """Discard every staged write."""
+
+        collections = {collection for collection, _ in self._pending}
+        self._pending.clear()
+        self._transforms.clear()
+        self._patches.clear()
+        self._forget_queries(collections)
+
+    def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        doc_id = document_id or uuid4().hex
+        key = (collection, doc_id)
+        if merge:
+            if not self._known(key):
+                self._write_through(collection, doc_id)
+                return self._gateway.add_document(collection, payload, doc_id, merge=True)
+            self._patch(key, payload, must_exist=False)
+            return doc_id
+        self._stage(key, payload)
+        return doc_id
+
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        return [
+            self.add_document(collection, payload, document_id, merge=merge)
+            for document_id, payload in documents
+        ]
+
+    def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        key = (collection, document_id)
+        if not self._known(key):
+            self._write_through(collection, document_id)
+            self._gateway.update_document(collection, document_id, payload)
+            return
+        if self._view(key) is None:
+            raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+        self._patch(key, payload, must_exist=True)
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        if any((collection, document_id) in self._pending for document_id, _ in documents):
+            self._flush(collection)
+        # Documents already known to be missing are not sent.
+        gone = {
+            document_id
+            for document_id, _ in documents
+            if (collection, document_id) in self._loaded
+            and self._loaded[(collection, document_id)] is None
+        }
+        sent = [(doc_id, payload) for doc_id, payload in documents if doc_id not in gone]
+        missing = set(self._gateway.update_documents(collection, sent)) if sent else set()
+        for document_id, payload in sent:
+            key = (collection, document_id)
+            if document_id in missing:
+                self._loaded[key] = None
+            elif self._loaded.get(key) is not None:
+                self._loaded[key] = {**self._loaded[key], **payload}
+        self._forget_queries({collection})
+        missing |= gone
+        requested = dict.fromkeys(document_id for document_id, _ in documents)
+        return [document_id for document_id in requested if document_id in missing]
+
+    def transform_document(
+        self,
+        collection: str,
+        document_id: str,
+        transform: _Transform,
+    ) -> Mapping[str, Any]:
+        key = (collection, document_id)
+        # A plain write staged first would be lost by replaying only the
+        # transforms; stage the result as a plain write then.
+        plain = key in self._pending and key not in self._transforms and key not in self._patches
+        transforms = self._transforms.pop(key, [])
+        if key in self._patches:
+            transforms = [_patch_transform(*self._patches[key])]
+        document = dict(transform(self.get_document(collection, document_id)))
+        self._stage(key, document)
+        if not plain:
+            self._transforms[key] = [*transforms, transform]
+        return self._view(key) or {}
+
+    def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        key = (collection, document_id)
+        if not self._known(key):
+            data = self._gateway.get_document(collection, document_id)
+            self._loaded[key] = None if data is None else dict(data)
+        return self._view(key)
+
+    def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        unique_ids = list(dict.fromkeys(document_ids))
+        missing = [doc_id for doc_id in unique_ids if not self._known((collection, doc_id))]
+        if missing:
+            fetched = self._gateway.get_documents(collection, missing)
+            for doc_id in missing:
+                data = fetched.get(doc_id)
+                self._loaded[(collection, doc_id)] = None if data is None else dict(data)
+
+        documents: dict[str, Mapping[str, Any]] = {}
+        for doc_id in unique_ids:
+            data = self._view((collection, doc_id))
+            if data is not None:
+                documents[doc_id] = data
+        return documents
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        if fields is not None:
+            if self._is_dirty(collection):
+                self._flush(collection)
+            return self._gateway.list_documents(collection, fields=fields)
+        ids = self._load(
+            (collection, "list"),
+            lambda: self._gateway.list_documents(collection),
+        )
+        return self._overlay(collection, ids, (), None, False)
+
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        if (limit is not None or fields is not None) and self._is_dirty(collection):
+            # Staged writes can move documents across the limit boundary,
+            # and projections lack the fields needed to re-check them.
+            self._flush(collection)
+        if fields is not None:
+            return self._gateway.query_documents(
+                collection,
+                filters,
+                order_by=order_by,
+                descending=descending,
+                limit=limit,
+                fields=fields,
+            )
+
+        ids = self._load(
+            (collection, "query", _freeze(filters), order_by, descending, limit),
+            lambda: self._gateway.query_documents(
+                collection,
+                filters,
+                order_by=order_by,
+                descending=descending,
+                limit=limit,
+            ),
+        )
+        return self._overlay(collection, ids, filters, order_by, descending)
+
+    def iter_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[Mapping[str, Any]]:
+        # Streams are not kept in the identity map; staged writes go first.
+        if self._is_dirty(collection):
+            self._flush(collection)
+        return self._gateway.iter_documents(
+            collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            page_size=page_size,
+            start_after=start_after,
+            fields=fields,
+        )
+
+    def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        key = (collection, document_id)
+        if not self._known(key):
+            self._write_through(collection, document_id)
+            self._gateway.delete_document(collection, document_id, must_exist=must_exist)
+            self._loaded[key] = None
+            return
+        if self._view(key) is None:
+            if must_exist:
+                raise DocumentNotFoundError(f"documento {document_id} nao encontrado")
+            return
+        self._transforms.pop(key, None)
+        self._patches.pop(key, None)
+        self._pending[key] = None
+
+    def _load(
+        self,
+        query_key: tuple[Hashable, ...],
+        fetch: Callable[[], Sequence[Mapping[str, Any]]],
+    ) -> list[str]:
+        ids = self._queries.get(query_key)
+        if ids is None:
+            ids = []
+            for item in fetch():
+                self._loaded[(str(query_key[0]), item["id"])] = dict(item)
+                ids.append(item["id"])
+            self._queries[query_key] = ids
+        return ids
+
+    def _known(self, key: _Key) -> bool:
+        return key in self._pending or key in self._loaded
+
+    def _view(self, key: _Key) -> dict[str, Any] | None:
+        data = self._pending[key] if key in self._pending else self._loaded.get(key)
+        if data is None:
+            return None
+        return {**data, "id": key[1]}
+
+    def _patch(self, key: _Key, payload: Mapping[str, Any], must_exist: bool) -> None:
+        fields = dict(payload)
+        fields.pop("id", None)
+        data = {**(self._view(key) or {}), **fields}
+        if key in self._transforms:
+            transforms = self._transforms[key]
+            self._stage(key, data)
+            self._transforms[key] = [*transforms, _patch_transform(fields, must_exist)]
+        elif key in self._pending and key not in self._patches:
+            # Over a full set staged earlier, which already carries every field.
+            self._stage(key, data)
+        else:
+            previous, previous_must_exist = self._patches.get(key, ({}, False))
+            self._stage(key, data)
+            self._patches[key] = ({**previous, **fields}, must_exist or previous_must_exist)
+
+    def _stage(self, key: _Key, payload: Mapping[str, Any]) -> None:
+        data = dict(payload)
+        data.pop("id", None)
+        self._transforms.pop(key, None)
+        self._patches.pop(key, None)
+        # Re-staging moves the document to the end of the write order.
+        self._pending.pop(key, None)
+        self._pending[key] = data
+
+    def _is_dirty(self, collection: str) -> bool:
+        return any(key[0] == collection for key in self._pending)
+
+    def _write_through(self, collection: str, document_id: str) -> None:
+        self._loaded.pop((collection, document_id), None)
+        self._forget_queries({collection})
+
+    def _forget_queries(self, collections: set[str]) -> None:
+        for query_key in [key for key in self._queries if key[0] in collections]:
+            del self._queries[query_key]
+
+    def _flush(self, collection: str | None) -> None:
+        staged = [
+            (key, data)
+            for key, data in self._pending.items()
+            if collection is None or key[0] == collection
+        ]
+        if not staged:
+            return
+
+        batches: dict[str, list[tuple[str | None, Mapping[str, Any]]]] = {}
+        updates: dict[str, list[tuple[str, Mapping[str, Any]]]] = {}
+        merges: dict[str, list[tuple[str | None, Mapping[str, Any]]]] = {}
+        deletes: list[_Key] = []
+        transformed: list[_Key] = []
+        for key, data in staged:
+            if key in self._transforms:
+                transformed.append(key)
+            elif key in self._patches:
+                fields, must_exist = self._patches[key]
+                (updates if must_exist else merges).setdefault(key[0], []).append((key[1], fields))
+            elif data is None:
+                deletes.append(key)
+            else:
+                batches.setdefault(key[0], []).append((key[1], data))
+
+        # Updates go first: one whose document was deleted since the read
+        # stops the flush before the writes derived from it are sent.
+        missing = [
+            (name, document_id)
+            for name, patches in updates.items()
+            for document_id in self._gateway.update_documents(name, patches)
+        ]
+        if missing:
+            for key, data in staged:
+                if key in self._patches and self._patches[key][1]:
+                    del self._pending[key]
+                    del self._patches[key]
+                    self._loaded[key] = data
+            for key in missing:
+                self._loaded[key] = None
+            self._forget_queries(set(updates))
+            raise DocumentNotFoundError(f"documento {missing[0][1]} nao encontrado")
+
+        for name, documents in batches.items():
+            self._gateway.add_documents(name, documents, merge=False)
+        for name, documents in merges.items():
+            self._gateway.add_documents(name, documents, merge=True)
+        for name, document_id in deletes:
+            self._gateway.delete_document(name, document_id)
+        stored = {
+            key: self._gateway.transform_document(*key, _chain(self._transforms.pop(key)))
+            for key in transformed
+        }
+
+        for key, data in staged:
+            del self._pending[key]
+            self._patches.pop(key, None)
+            self._loaded[key] = dict(stored[key]) if key in stored else data
+        # Cached query results predate documents created by the flush.
+        self._forget_queries({key[0] for key, _ in staged})
+
+    def _overlay(
+        self,
+        collection: str,
+        ids: Sequence[str],
+        filters: Sequence[QueryFilter],
+        order_by: str | None,
+        descending: bool,
+    ) -> list[Mapping[str, Any]]:
+        results: list[Mapping[str, Any]] = []
+        for doc_id in ids:
+            key = (collection, doc_id)
+            document = self._view(key)
+            if document is None:
+                continue
+            if key in self._pending and not _matches(document, filters):
+                continue
+            results.append(document)
+
+        if self._is_dirty(collection):
+            # Staged documents the datastore has not seen yet.
+            listed = set(ids)
+            for key, data in self._pending.items():
+                if key[0] != collection or key[1] in listed or data is None:
+                    continue
+                document = self._view(key)
+                if document is not None and _matches(document, filters):
+                    results.append(document)
+            if order_by:
+                value_key = _sort_key(order_by)
+                results.sort(key=lambda item: value_key(_convert(item)), reverse=descending)
+        return results
+
+
+def _chain(transforms: Sequence[_Transform]) -> _Transform:
+    def transform(current: Mapping[str, Any] | None) -> Mapping[str, Any]:
+        for step in transforms:
+            current = step(current)
+        return current  # type: ignore[return-value]
+
+    return transform
+
+
+def _patch_transform(fields: Mapping[str, Any], must_exist: bool) -> _Transform:
+    def transform(current: Mapping[str, Any] | None) -> Mapping[str, Any]:
+        if current is None and must_exist:
+            raise DocumentNotFoundError("documento nao encontrado")
+        return {**(current or {}), **fields}
+
+    return transform
+
+
+def _matches(document: Mapping[str, Any], filters: Sequence[QueryFilter]) -> bool:
+    for field, operator_name, expected in filters:
+        if operator_name not in QUERY_OPERATORS:
+            raise ValueError(f"operador de filtro invalido: {operator_name}")
+        try:
+            if not _COMPARATORS[operator_name](_convert(document.get(field)), _convert(expected)):
+                return False
+        except TypeError:
+            return False
+    return True
@@ -0,0 +1,190 @@
+"""Per-collection version counters bumped by gateway writes."""
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator, Mapping, Sequence
+from uuid import uuid4
+
+from .interfaces import FirestoreGatewayProtocol, QueryFilter
+
+
+class CollectionVersions:
+    """Version counter per collection, kept in the datastore.
+
+    Each collection has a document in ``COLLECTION`` with its ``versao``
+    and an ``epoca`` drawn when the document is created. Bumps go through
+    ``transform_document``, so every process sharing the datastore (web
+    workers, other instances, the CLI) advances the same counter and sees
+    the others' writes. Writers that bypass the app's gateway are not
+    seen.
+    """
+
+    COLLECTION = "versoes"
+
+    def __init__(self, gateway: FirestoreGatewayProtocol) -> None:
+        self._gateway = gateway
+
+    def get(self, collection: str) -> int:
+        """Return the current version of ``collection``."""
+
+        stored = self._gateway.get_document(self.COLLECTION, collection)
+        return 0 if stored is None else int(stored["versao"])
+
+    def bump(self, collection: str) -> int:
+        """Advance ``collection`` to its next version and return it."""
+
+        stored = self._gateway.transform_document(self.COLLECTION, collection, _next_version)
+        return int(stored["versao"])
+
+    def tag(self, *collections: str) -> str:
+        """Return an opaque tag that changes whenever one of ``collections`` does."""
+
+        stored = self._gateway.get_documents(self.COLLECTION, list(collections))
+        return "-".join(
+            f"{stored[collection]['epoca']}.{stored[collection]['versao']}"
+            if collection in stored
+            else "0"
+            for collection in collections
+        )
+
+
+def _next_version(current: Mapping[str, Any] | None) -> Mapping[str, Any]:
+    if current is None:
+        return {"versao": 1, "epoca": uuid4().hex[:12]}
+    return {"versao": int(current["versao"]) + 1, "epoca": current["epoca"]}
+
+
+class VersionedGateway(FirestoreGatewayProtocol):
+    """Bump the version of a collection after every write sent to it.
+
+    The bump happens once the wrapped call returns (or raises, since a failed
+    batch may be partially applied), so a version read before a list is
+    never newer than the documents that list returns.
+    """
+
+    def __init__(self, gateway: FirestoreGatewayProtocol, versions: CollectionVersions) -> None:
+        self._gateway = gateway
+        self.versions = versions
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._gateway, name)
+
+    def add_document(
+        self,
+        collection: str,
+        payload: Mapping[str, Any],
+        document_id: str | None = None,
+        merge: bool = False,
+    ) -> str:
+        try:
+            return self._gateway.add_document(collection, payload, document_id, merge=merge)
+        finally:
+            self.versions.bump(collection)
+
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        try:
+            return self._gateway.add_documents(collection, documents, merge=merge)
+        finally:
+            self.versions.bump(collection)
+
+    def update_document(
+        self,
+        collection: str,
+        document_id: str,
+        payload: Mapping[str, Any],
+    ) -> None:
+        try:
+            self._gateway.update_document(collection, document_id, payload)
+        finally:
+            self.versions.bump(collection)
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        try:
+            return self._gateway.update_documents(collection, documents)
+        finally:
+            self.versions.bump(collection)
+
+    def transform_document(
+        self,
+        collection: str,
+        document_id: str,
+        transform: Callable[[Mapping[str, Any] | None], Mapping[str, Any]],
+    ) -> Mapping[str, Any]:
+        try:
+            return self._gateway.transform_document(collection, document_id, transform)
+        finally:
+            self.versions.bump(collection)
+
+    def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+        return self._gateway.get_document(collection, document_id)
+
+    def get_documents(
+        self,
+        collection: str,
+        document_ids: Sequence[str],
+    ) -> dict[str, Mapping[str, Any]]:
+        return self._gateway.get_documents(collection, document_ids)
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        return self._gateway.list_documents(collection, fields=fields)
+
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        return self._gateway.query_documents(
+            collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            limit=limit,
+            fields=fields,
+        )
+
+    def iter_documents(
+        self,
+        collection: str,
+        filters: Sequence[QueryFilter] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        page_size: int = 500,
+        start_after: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> Iterator[Mapping[str, Any]]:
+        return self._gateway.iter_documents(
+            collection,
+            filters,
+            order_by=order_by,
+            descending=descending,
+            page_size=page_size,
+            start_after=start_after,
+            fields=fields,
+        )
+
+    def delete_document(
+        self,
+        collection: str,
+        document_id: str,
+        must_exist: bool = False,
+    ) -> None:
+        try:
+            self._gateway.delete_document(collection, document_id, must_exist=must_exist)
+        finally:
+            self.versions.bump(collection)
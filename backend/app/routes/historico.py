@@ -0,0 +1,79 @@
+"""Routes serving the daily snapshot history as time series."""
+from __future__ import annotations
+
+from datetime import date
+
+from flask import Blueprint, Flask, current_app, jsonify, request
+
+from ..services import RendaVariavelService
+from ..services.historico import SnapshotService
+from .responses import json_response
+
+blueprint = Blueprint("historico", __name__, url_prefix="/historico")
+
+
+class _InvalidRange(ValueError):
+    pass
+
+
+def build_snapshot_service() -> SnapshotService:
+    """Return the snapshot service of the current app; requires ``SNAPSHOTS_DIR``."""
+
+    from . import renda_variavel
+
+    store = current_app.extensions.get("snapshot_store")
+    if store is None:
+        raise RuntimeError("historico nao configurado")
+    return SnapshotService(store, RendaVariavelService(renda_variavel._get_repository()))
+
+
+def _parse_range() -> tuple[date | None, date | None]:
+    datas = []
+    for name in ("inicio", "fim"):
+        raw = request.args.get(name)
+        try:
+            datas.append(date.fromisoformat(raw) if raw else None)
+        except ValueError as exc:
+            raise _InvalidRange(f"{name} invalido") from exc
+    inicio, fim = datas
+    if inicio is not None and fim is not None and inicio > fim:
+        raise _InvalidRange("inicio deve ser anterior a fim")
+    return inicio, fim
+
+
+@blueprint.get("")
+def get_historico() -> tuple[dict[str, object], int]:
+    """Return patrimonio per moeda and total_mercado per tipo, one value per day."""
+
+    try:
+        inicio, fim = _parse_range()
+        service = build_snapshot_service()
+    except _InvalidRange as exc:
+        return jsonify({"error": str(exc)}), 400
+    except RuntimeError as exc:
+        return jsonify({"error": str(exc)}), 503
+
+    return json_response(service.serie(inicio, fim))
+
+
+@blueprint.get("/posicoes/<string:position_id>")
+def get_historico_posicao(position_id: str) -> tuple[dict[str, object], int]:
+    """Return the snapshotted quantidade, cotacao and total_mercado of a position."""
+
+    try:
+        inicio, fim = _parse_range()
+        service = build_snapshot_service()
+    except _InvalidRange as exc:
+        return jsonify({"error": str(exc)}), 400
+    except RuntimeError as exc:
+        return jsonify({"error": str(exc)}), 503
+
+    serie = service.serie_posicao(position_id, inicio, fim)
+    if serie["ticker"] is None:
+        return jsonify({"error": "posicao sem historico"}), 404
+    return json_response(serie)
+
+
+def register(app: Flask) -> None:
+    """Register the blueprint on the Flask app."""
+    app.register_blueprint(blueprint)
@@ -1,7 +1,7 @@
 """Homepage and health-check endpoints."""
 from __future__ import annotations
 
-from flask import Blueprint, Flask, jsonify
+from flask import Blueprint, Flask, Response, current_app, jsonify
 
 blueprint = Blueprint("home", __name__)
 
@@ -12,6 +12,16 @@ def index() -> tuple[dict[str, str], int]:
     return jsonify({"status": "ok"}), 200
 
 
+@blueprint.get("/metrics")
+def metrics() -> Response | tuple[Response, int]:
+    """Expose gateway metrics in the Prometheus text format."""
+
+    registry = current_app.extensions.get("gateway_metrics")
+    if registry is None:
+        return jsonify({"error": "metricas desabilitadas"}), 404
+    return Response(registry.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 def register(app: Flask) -> None:
     """Register the blueprint on the Flask app."""
     app.register_blueprint(blueprint)
@@ -0,0 +1,32 @@
+"""Helpers for cursor-based pagination query parameters."""
+from __future__ import annotations
+
+from flask import request
+
+MAX_PAGE_SIZE = 500
+
+
+class InvalidPageRequest(ValueError):
+    """Raised when the limit/cursor query parameters are malformed."""
+
+
+def parse_page_args() -> tuple[int | None, str | None]:
+    """Return ``(limit, cursor)`` from the query string.
+
+    ``limit`` is ``None`` when the client did not ask for pagination.
+    """
+
+    raw_limit = request.args.get("limit")
+    cursor = request.args.get("cursor") or None
+    if raw_limit is None:
+        if cursor is not None:
+            raise InvalidPageRequest("parametro cursor exige limit")
+        return None, None
+
+    try:
+        limit = int(raw_limit)
+    except ValueError as exc:
+        raise InvalidPageRequest("parametro limit invalido") from exc
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise InvalidPageRequest(f"parametro limit deve estar entre 1 e {MAX_PAGE_SIZE}")
+    return limit, cursor
@@ -10,6 +10,12 @@ from ..repositories import (
     PersistenceLayerError,
     DocumentNotFoundError,
 )
+from ..services import ResumoService
+from ..services.resumo import PASSIVOS
+from .pagination import InvalidPageRequest, parse_page_args
+from .projection import InvalidFieldsRequest, parse_fields_arg
+from .responses import conditional, json_response
+from .resumo import get_resumos_repository
 
 blueprint = Blueprint("passivos", __name__, url_prefix="/passivos")
 
@@ -31,17 +37,33 @@ def _get_repository() -> PassivosRepository:
     return PassivosRepository(gateway)
 
 
+def _build_resumos(repository: PassivosRepository) -> ResumoService:
+    return ResumoService(get_resumos_repository(), {PASSIVOS: repository.list})
+
+
 @blueprint.get("")
+@conditional(PassivosRepository.COLLECTION)
 def list_passivos() -> tuple[dict[str, object], int]:
-    """Return passivos stored in Firestore."""
+    """Return passivos stored in Firestore, optionally one page at a time."""
+
+    try:
+        limit, cursor = parse_page_args()
+        fields = parse_fields_arg(Passivo)
+    except (InvalidPageRequest, InvalidFieldsRequest) as exc:
+        return jsonify({"error": str(exc)}), 400
 
     try:
         repository = _get_repository()
-        items = [item.model_dump(mode="json") for item in repository.list()]
+        if limit is None:
+            items = repository.list(fields=fields)
+        else:
+            items, next_cursor = repository.list_page(limit, cursor, fields=fields)
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    return jsonify({"items": items}), 200
+    if limit is None:
+        return json_response({"items": items})
+    return json_response({"items": items, "next_cursor": next_cursor})
 
 
 @blueprint.post("")
@@ -58,12 +80,15 @@ def create_passivo() -> tuple[dict[str, object], int]:
     repository = _get_repository()
     serialised_payload = passivo.model_dump(mode="json", exclude_none=True)
 
+    resumos = _build_resumos(repository)
     try:
+        resumo = resumos.with_delta(PASSIVOS, None, passivo)
         created = repository.create(serialised_payload)
+        resumos.save(resumo)
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    return jsonify({"item": created.model_dump(mode="json")}), 201
+    return json_response({"item": created}, 201)
 
 
 @blueprint.put("/<passivo_id>")
@@ -80,14 +105,18 @@ def update_passivo(passivo_id: str) -> tuple[dict[str, object], int]:
     repository = _get_repository()
     serialised_payload = passivo.model_dump(mode="json", exclude_none=True, exclude={"id"})
 
+    resumos = _build_resumos(repository)
     try:
+        previous = repository.get(passivo_id)
+        resumo = resumos.with_delta(PASSIVOS, previous, passivo)
         updated = repository.update(passivo_id, serialised_payload)
+        resumos.save(resumo)
     except DocumentNotFoundError:
         return jsonify({"error": "passivo nao encontrado"}), 404
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    return jsonify({"item": updated.model_dump(mode="json")}), 200
+    return json_response({"item": updated})
 
 
 @blueprint.delete("/<passivo_id>")
@@ -95,8 +124,12 @@ def delete_passivo(passivo_id: str) -> tuple[dict[str, object], int]:
     """Remove a passivo document."""
 
     repository = _get_repository()
+    resumos = _build_resumos(repository)
     try:
+        previous = repository.get(passivo_id)
+        resumo = resumos.with_delta(PASSIVOS, previous, None)
         repository.delete(passivo_id)
+        resumos.save(resumo)
     except DocumentNotFoundError:
         return jsonify({"error": "passivo nao encontrado"}), 404
     except PersistenceLayerError as exc:
@@ -0,0 +1,24 @@
+"""Helpers for the ``fields=`` sparse response query parameter."""
+from __future__ import annotations
+
+from flask import request
+from pydantic import BaseModel
+
+
+class InvalidFieldsRequest(ValueError):
+    """Raised when ``fields`` names attributes the model does not have."""
+
+
+def parse_fields_arg(model_type: type[BaseModel]) -> list[str] | None:
+    """Return the requested fields, or ``None`` when the client wants all of them."""
+
+    raw = request.args.get("fields")
+    if not raw:
+        return None
+
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in fields if name not in model_type.model_fields]
+    if unknown:
+        raise InvalidFieldsRequest(f"campos invalidos: {', '.join(unknown)}")
+    return fields
+
@@ -12,6 +12,12 @@ from ..repositories import (
     PersistenceLayerError,
     RendaFixaRepository,
 )
+from ..services import ResumoService
+from ..services.resumo import RENDA_FIXA
+from .pagination import InvalidPageRequest, parse_page_args
+from .projection import InvalidFieldsRequest, parse_fields_arg
+from .responses import conditional, json_response
+from .resumo import get_resumos_repository
 
 blueprint = Blueprint("renda_fixa", __name__, url_prefix="/renda-fixa")
 
@@ -40,17 +46,33 @@ def _normalise_payload(payload: dict[str, object]) -> dict[str, object]:
     return payload
 
 
+def _build_resumos(repository: RendaFixaRepository) -> ResumoService:
+    return ResumoService(get_resumos_repository(), {RENDA_FIXA: repository.list})
+
+
 @blueprint.get("")
+@conditional(RendaFixaRepository.COLLECTION)
 def list_renda_fixa() -> tuple[dict[str, object], int]:
     """Return renda fixa positions stored in the persistence layer."""
 
+    try:
+        limit, cursor = parse_page_args()
+        fields = parse_fields_arg(RendaFixaPosition)
+    except (InvalidPageRequest, InvalidFieldsRequest) as exc:
+        return jsonify({"error": str(exc)}), 400
+
     repository = _get_repository()
     try:
-        items = [item.model_dump(mode="json") for item in repository.list()]
+        if limit is None:
+            items = repository.list(fields=fields)
+        else:
+            items, next_cursor = repository.list_page(limit, cursor, fields=fields)
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    return jsonify({"items": items}), 200
+    if limit is None:
+        return json_response({"items": items})
+    return json_response({"items": items, "next_cursor": next_cursor})
 
 
 @blueprint.post("")
@@ -67,12 +89,15 @@ def create_renda_fixa() -> tuple[dict[str, object], int]:
     repository = _get_repository()
     serialised = position.model_dump(mode="json", exclude_none=True)
 
+    resumos = _build_resumos(repository)
     try:
+        resumo = resumos.with_delta(RENDA_FIXA, None, position)
         created = repository.create(serialised)
+        resumos.save(resumo)
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    return jsonify({"item": created.model_dump(mode="json")}), 201
+    return json_response({"item": created}, 201)
 
 
 @blueprint.put("/<string:position_id>")
@@ -89,14 +114,18 @@ def update_renda_fixa(position_id: str) -> tuple[dict[str, object], int]:
     repository = _get_repository()
     serialised = position.model_dump(mode="json", exclude_none=True, exclude={"id"})
 
+    resumos = _build_resumos(repository)
     try:
+        previous = repository.get(position_id)
+        resumo = resumos.with_delta(RENDA_FIXA, previous, position)
         updated = repository.update(position_id, serialised)
+        resumos.save(resumo)
     except DocumentNotFoundError:
         return jsonify({"error": "position nao encontrada"}), 404
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    return jsonify({"item": updated.model_dump(mode="json")}), 200
+    return json_response({"item": updated})
 
 
 @blueprint.delete("/<string:position_id>")
@@ -104,9 +133,12 @@ def delete_renda_fixa(position_id: str) -> tuple[str, int]:
     """Remove a renda fixa position document."""
 
     repository = _get_repository()
-
+    resumos = _build_resumos(repository)
     try:
+        previous = repository.get(position_id)
+        resumo = resumos.with_delta(RENDA_FIXA, previous, None)
         repository.delete(position_id)
+        resumos.save(resumo)
     except DocumentNotFoundError:
         return jsonify({"error": "position nao encontrada"}), 404
     except PersistenceLayerError as exc:
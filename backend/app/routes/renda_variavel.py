@@ -1,24 +1,46 @@
 """Routes for renda variavel insights and listings."""
 from __future__ import annotations
 
+import asyncio
+import csv
+import io
+import json
 from datetime import datetime, timezone
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
+from itertools import islice
 
-from flask import Blueprint, Flask, current_app, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
 from pydantic import ValidationError
 
 from ..models import (
+    RendaVariavelCotacoes,
     RendaVariavelPosition,
     RendaVariavelTipo,
+    RendaVariavelTrade,
     RendaVariavelTradeInput,
 )
 from ..repositories import (
     DocumentNotFoundError,
     PersistenceLayerError,
+    RendaVariavelCheckpointsRepository,
     RendaVariavelPositionsRepository,
     RendaVariavelTradesRepository,
 )
-from ..services import RendaVariavelService, TradeNotAllowedError
+from ..repositories.interfaces import AsyncFirestoreGatewayProtocol
+from ..services import (
+    ImportacaoError,
+    LedgerService,
+    RendaVariavelService,
+    TradeImportService,
+    TradeNotAllowedError,
+)
+from ..services.cotacoes import QuoteRefresher
+from ..services.importacao import ler_csv
+from ..services.analytics import metricas
+from .pagination import InvalidPageRequest, parse_page_args
+from .projection import InvalidFieldsRequest, parse_fields_arg
+from .responses import conditional, json_response
+from .resumo import get_resumos_repository
 
 blueprint = Blueprint("renda_variavel", __name__, url_prefix="/renda-variavel")
 
@@ -32,6 +54,9 @@ _CATEGORY_ALIASES: dict[str, RendaVariavelTipo] = {
 }
 
 
+_EXPORT_FIELDS = ("ticker", *RendaVariavelTrade.model_fields)
+
+
 def _ordered_tipos() -> Iterable[RendaVariavelTipo]:
     return _CATEGORY_ALIASES.values()
 
@@ -51,7 +76,7 @@ def _get_repository() -> RendaVariavelPositionsRepository:
             project_id=current_app.config.get("FIRESTORE_PROJECT_ID"),
         )
 
-    return RendaVariavelPositionsRepository(gateway)
+    return RendaVariavelPositionsRepository(gateway, _get_async_gateway())
 
 
 def _get_trades_repository() -> RendaVariavelTradesRepository:
@@ -69,11 +94,61 @@ def _get_trades_repository() -> RendaVariavelTradesRepository:
             project_id=current_app.config.get("FIRESTORE_PROJECT_ID"),
         )
 
-    return RendaVariavelTradesRepository(gateway)
+    return RendaVariavelTradesRepository(gateway, _get_async_gateway())
+
+
+def _get_checkpoints_repository() -> RendaVariavelCheckpointsRepository:
+    factory = current_app.config.get("RENDA_VARIAVEL_CHECKPOINTS_REPOSITORY_FACTORY")
+    if callable(factory):
+        return factory()  # type: ignore[return-value]
+
+    gateway_factory = current_app.config.get("DATA_GATEWAY_FACTORY")
+    if callable(gateway_factory):
+        gateway = gateway_factory()
+    else:  # pragma: no cover - defensive fallback for misconfiguration
+        from ..repositories import FirestoreGateway
+
+        gateway = FirestoreGateway.from_settings(
+            project_id=current_app.config.get("FIRESTORE_PROJECT_ID"),
+        )
+
+    return RendaVariavelCheckpointsRepository(gateway, _get_async_gateway())
+
+
+def _get_async_gateway() -> AsyncFirestoreGatewayProtocol | None:
+    factory = current_app.config.get("ASYNC_DATA_GATEWAY_FACTORY")
+    if callable(factory):
+        return factory()  # type: ignore[return-value]
+    return None
 
 
 def _build_service() -> RendaVariavelService:
-    return RendaVariavelService(_get_repository())
+    return RendaVariavelService(_get_repository(), resumos_repository=get_resumos_repository())
+
+
+def _build_ledger(repository: RendaVariavelPositionsRepository) -> LedgerService:
+    trades_repository = _get_trades_repository()
+    service = RendaVariavelService(repository, trades_repository, get_resumos_repository())
+    return LedgerService(service, repository, trades_repository, _get_checkpoints_repository())
+
+
+def build_import_service() -> TradeImportService:
+    """Return the trade importer wired to the current app's repositories."""
+
+    repository = _get_repository()
+    trades_repository = _get_trades_repository()
+    service = RendaVariavelService(repository, trades_repository, get_resumos_repository())
+    ledger = LedgerService(service, repository, trades_repository, _get_checkpoints_repository())
+    return TradeImportService(service, ledger, repository, trades_repository)
+
+
+def build_quote_refresher() -> QuoteRefresher:
+    """Return the quote refresher of the current app; requires a quote provider."""
+
+    fetcher = current_app.extensions.get("quote_fetcher")
+    if fetcher is None:
+        raise RuntimeError("nenhum provedor de cotacoes configurado")
+    return QuoteRefresher(fetcher, _build_service())
 
 
 def _resolve_tipo(categoria: str) -> RendaVariavelTipo | None:
@@ -96,50 +171,140 @@ def _compute_totals(payload: dict[str, object]) -> dict[str, object]:
     preco_medio = float(payload.get("preco_medio", 0) or 0)
     cotacao_atual = float(payload.get("cotacao_atual", 0) or 0)
 
-    total_compra = quantidade * preco_medio
-    total_mercado = quantidade * cotacao_atual
-    resultado_monetario = total_mercado - total_compra
-    performance_percentual = 0.0
-    if preco_medio:
-        performance_percentual = (cotacao_atual / preco_medio - 1) * 100
-
-    payload.update(
-        {
-            "total_compra": total_compra,
-            "total_mercado": total_mercado,
-            "resultado_monetario": resultado_monetario,
-            "performance_percentual": performance_percentual,
-        }
-    )
+    derived = metricas(quantidade, preco_medio, cotacao_atual)
+    payload.update({name: float(value) for name, value in derived.items()})
 
     return payload
 
 
+def _parse_datetime_arg(name: str) -> datetime | None:
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    return datetime.fromisoformat(raw)
+
+
+def _csv_lines(rows: Iterable[dict[str, object]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=_EXPORT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Emit the header even when there are no rows.
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+
+def _rows_with_tickers(
+    trades: Iterable[RendaVariavelTrade],
+    repository: RendaVariavelPositionsRepository,
+    tickers: dict[str, str],
+    chunk_size: int = 500,
+) -> Iterator[dict[str, object]]:
+    """Serialise trades with their ticker, resolving unknown positions per chunk."""
+
+    iterator = iter(trades)
+    while chunk := list(islice(iterator, chunk_size)):
+        missing = {trade.position_id for trade in chunk} - tickers.keys()
+        if missing:
+            found = repository.get_many(sorted(missing))
+            tickers.update({position_id: item.ticker for position_id, item in found.items()})
+        for trade in chunk:
+            yield {"ticker": tickers.get(trade.position_id), **trade.model_dump(mode="json")}
+
+
 def _inject_tipo(payload: dict[str, object], tipo: RendaVariavelTipo) -> dict[str, object]:
     payload["tipo"] = tipo.value
     return payload
 
 
 @blueprint.get("")
-def list_renda_variavel() -> tuple[dict[str, object], int]:
-    """Return renda variavel positions grouped by curated categories."""
+@conditional(RendaVariavelPositionsRepository.COLLECTION)
+async def list_renda_variavel() -> tuple[dict[str, object], int]:
+    """Return renda variavel positions grouped by curated categories.
+
+    Each categoria is queried concurrently.
+    """
+
+    try:
+        fields = parse_fields_arg(RendaVariavelPosition)
+    except InvalidFieldsRequest as exc:
+        return jsonify({"error": str(exc)}), 400
 
     service = _build_service()
     try:
-        grouped = service.list_positions_grouped(_ordered_tipos())
+        grouped = await service.alist_positions_grouped(_ordered_tipos(), fields=fields)
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
     payload = {
-        "items": {
-            alias: [item.model_dump(mode="json") for item in grouped.get(tipo, [])]
-            for alias, tipo in _CATEGORY_ALIASES.items()
-        }
+        "items": {alias: grouped.get(tipo, []) for alias, tipo in _CATEGORY_ALIASES.items()}
     }
-    return jsonify(payload), 200
+    return json_response(payload)
+
+
+@blueprint.get("/transacoes/export")
+def export_renda_variavel_trades() -> Response | tuple[Response, int]:
+    """Stream the trade ledger as NDJSON (default) or CSV.
+
+    Accepts ``inicio``/``fim`` ISO dates (``fim`` exclusive) and a ``tipo``
+    categoria slug. Trades are read page by page, so memory use does not
+    depend on the size of the ledger.
+    """
+
+    formato = (request.args.get("format") or "ndjson").lower()
+    if formato not in {"ndjson", "csv"}:
+        return jsonify({"error": "formato invalido"}), 400
+
+    try:
+        inicio = _parse_datetime_arg("inicio")
+        fim = _parse_datetime_arg("fim")
+    except ValueError:
+        return jsonify({"error": "data invalida"}), 400
+
+    tipo: RendaVariavelTipo | None = None
+    categoria = request.args.get("tipo")
+    if categoria:
+        tipo = _resolve_tipo(categoria)
+        if tipo is None:
+            return jsonify({"error": "categoria nao encontrada"}), 404
+
+    repository = _get_repository()
+    service = RendaVariavelService(repository, _get_trades_repository())
+    tickers: dict[str, str] = {}
+    if tipo is not None:
+        try:
+            positions = service.list_positions_by_tipo(tipo)
+        except PersistenceLayerError as exc:
+            return jsonify({"error": str(exc)}), 503
+        tickers = {position.id: position.ticker for position in positions if position.id}
+
+    trades = service.iter_trades(
+        inicio=inicio,
+        fim=fim,
+        position_ids=set(tickers) if tipo else None,
+    )
+    rows = _rows_with_tickers(trades, repository, tickers)
+
+    if formato == "csv":
+        body = _csv_lines(rows)
+        mimetype = "text/csv"
+    else:
+        body = (json.dumps(row) + "\n" for row in rows)
+        mimetype = "application/x-ndjson"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=transacoes.{formato}"},
+    )
 
 
 @blueprint.get("/<string:categoria>")
+@conditional(RendaVariavelPositionsRepository.COLLECTION)
 def list_renda_variavel_por_categoria(categoria: str) -> tuple[dict[str, object], int]:
     """Return renda variavel positions for a specific categoria slug."""
 
@@ -147,14 +312,31 @@ def list_renda_variavel_por_categoria(categoria: str) -> tuple[dict[str, object]
     if tipo is None:
         return jsonify({"error": "categoria nao encontrada"}), 404
 
+    try:
+        limit, cursor = parse_page_args()
+        fields = parse_fields_arg(RendaVariavelPosition)
+    except (InvalidPageRequest, InvalidFieldsRequest) as exc:
+        return jsonify({"error": str(exc)}), 400
+
     service = _build_service()
     try:
-        items = [item.model_dump(mode="json") for item in service.list_positions_by_tipo(tipo)]
+        if limit is None:
+            positions = service.list_positions_by_tipo(tipo, fields=fields)
+        else:
+            positions, next_cursor = service.list_positions_page(
+                tipo, limit, cursor, fields=fields
+            )
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    payload = {"items": items, "categoria": categoria.lower(), "tipo": tipo.value}
-    return jsonify(payload), 200
+    payload = {
+        "items": positions,
+        "categoria": categoria.lower(),
+        "tipo": tipo.value,
+    }
+    if limit is not None:
+        payload["next_cursor"] = next_cursor
+    return json_response(payload)
 
 
 @blueprint.post("/<string:categoria>")
@@ -176,22 +358,13 @@ def create_renda_variavel_position(categoria: str) -> tuple[dict[str, object], i
     except ValidationError as exc:
         return jsonify({"errors": exc.errors()}), 400
 
-    repository = _get_repository()
-    serialised = position.model_dump(mode="json", exclude_none=True)
-
+    service = _build_service()
     try:
-        created = repository.create(serialised)
+        created = service.create_position(position)
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    service = RendaVariavelService(repository)
-    service.recalculate_pesos(tipo)
-
-    refreshed = created
-    if created.id is not None:
-        refreshed = repository.get(created.id)
-
-    return jsonify({"item": refreshed.model_dump(mode="json")}), 201
+    return json_response({"item": created}, 201)
 
 
 @blueprint.put("/<string:categoria>/<string:position_id>")
@@ -215,22 +388,15 @@ def update_renda_variavel_position(
     except ValidationError as exc:
         return jsonify({"errors": exc.errors()}), 400
 
-    repository = _get_repository()
-    serialised = position.model_dump(mode="json", exclude_none=True, exclude={"id"})
-
+    service = _build_service()
     try:
-        updated = repository.update(position_id, serialised)
+        updated = service.update_position(position_id, position)
     except DocumentNotFoundError:
         return jsonify({"error": "position nao encontrada"}), 404
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    service = RendaVariavelService(repository)
-    service.recalculate_pesos(tipo)
-
-    refreshed = repository.get(position_id)
-
-    return jsonify({"item": refreshed.model_dump(mode="json")}), 200
+    return json_response({"item": updated})
 
 
 @blueprint.delete("/<string:categoria>/<string:position_id>")
@@ -241,53 +407,73 @@ def delete_renda_variavel_position(categoria: str, position_id: str) -> tuple[st
     if tipo is None:
         return jsonify({"error": "categoria nao encontrada"}), 404
 
-    repository = _get_repository()
-    service = RendaVariavelService(repository)
-
+    service = _build_service()
     try:
-        repository.delete(position_id)
+        service.delete_position(position_id)
     except DocumentNotFoundError:
         return jsonify({"error": "position nao encontrada"}), 404
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    service.recalculate_pesos(tipo)
-
     return "", 204
 
 
 @blueprint.get("/<string:categoria>/<string:position_id>/transacoes")
-def list_renda_variavel_trades(
+@conditional(
+    RendaVariavelPositionsRepository.COLLECTION, RendaVariavelTradesRepository.COLLECTION
+)
+async def list_renda_variavel_trades(
     categoria: str, position_id: str
 ) -> tuple[dict[str, object], int]:
-    """Return trades recorded for a specific position."""
+    """Return trades recorded for a specific position.
+
+    Without pagination the position and its trades are read concurrently.
+    """
 
     tipo = _resolve_tipo(categoria)
     if tipo is None:
         return jsonify({"error": "categoria nao encontrada"}), 404
 
+    try:
+        limit, cursor = parse_page_args()
+    except InvalidPageRequest as exc:
+        return jsonify({"error": str(exc)}), 400
+
     repository = _get_repository()
+    service = RendaVariavelService(repository, _get_trades_repository())
 
-    try:
-        position = repository.get(position_id)
-    except DocumentNotFoundError:
+    reads = [repository.aget(position_id)]
+    if limit is None:
+        reads.append(service.alist_trades(position_id))
+    results = await asyncio.gather(*reads, return_exceptions=True)
+
+    position = results[0]
+    if isinstance(position, DocumentNotFoundError):
         return jsonify({"error": "position nao encontrada"}), 404
+    for result in results:
+        if isinstance(result, PersistenceLayerError):
+            return jsonify({"error": str(result)}), 503
+        if isinstance(result, BaseException):
+            raise result
 
     if position.tipo is not tipo:
         return jsonify({"error": "categoria nao corresponde ao ativo"}), 400
 
-    service = RendaVariavelService(repository, _get_trades_repository())
-    trades = sorted(
-        service.list_trades(position_id),
-        key=lambda trade: trade.data,
-        reverse=True,
-    )
+    try:
+        if limit is None:
+            trades = sorted(results[1], key=lambda trade: trade.data, reverse=True)
+        else:
+            trades, next_cursor = service.list_trades_page(position_id, limit, cursor)
+    except PersistenceLayerError as exc:
+        return jsonify({"error": str(exc)}), 503
 
     payload = {
-        "items": [trade.model_dump(mode="json") for trade in trades],
+        "items": trades,
         "position_id": position_id,
     }
-    return jsonify(payload), 200
+    if limit is not None:
+        payload["next_cursor"] = next_cursor
+    return json_response(payload)
 
 
 @blueprint.post("/<string:categoria>/<string:position_id>/transacoes")
@@ -301,10 +487,13 @@ def create_renda_variavel_trade(
         return jsonify({"error": "categoria nao encontrada"}), 404
 
     repository = _get_repository()
+    ledger = _build_ledger(repository)
     try:
         position = repository.get(position_id)
     except DocumentNotFoundError:
         return jsonify({"error": "position nao encontrada"}), 404
+    except PersistenceLayerError as exc:
+        return jsonify({"error": str(exc)}), 503
 
     if position.tipo is not tipo:
         return jsonify({"error": "categoria nao corresponde ao ativo"}), 400
@@ -316,10 +505,8 @@ def create_renda_variavel_trade(
     except ValidationError as exc:
         return jsonify({"errors": exc.errors()}), 400
 
-    service = RendaVariavelService(repository, _get_trades_repository())
-
     try:
-        updated_position, recorded_trade = service.record_trade(
+        updated_position, recorded_trade = ledger.record_trade(
             position_id,
             tipo_operacao=trade_input.tipo_operacao,
             quantidade=trade_input.quantidade,
@@ -333,12 +520,90 @@ def create_renda_variavel_trade(
     except PersistenceLayerError as exc:
         return jsonify({"error": str(exc)}), 503
 
-    payload = {
-        "item": recorded_trade.model_dump(mode="json"),
-        "position": updated_position.model_dump(mode="json"),
-    }
+    return json_response({"item": recorded_trade, "position": updated_position}, 201)
+
+
+@blueprint.post("/<string:categoria>/<string:position_id>/recalcular")
+def rebuild_renda_variavel_position(
+    categoria: str, position_id: str
+) -> tuple[dict[str, object], int]:
+    """Replay a position's trades, from the ``desde`` query arg when given."""
+
+    tipo = _resolve_tipo(categoria)
+    if tipo is None:
+        return jsonify({"error": "categoria nao encontrada"}), 404
+
+    try:
+        desde = _parse_datetime_arg("desde")
+    except ValueError:
+        return jsonify({"error": "data invalida"}), 400
+
+    try:
+        position = _build_ledger(_get_repository()).rebuild_position(position_id, desde)
+    except TradeNotAllowedError as exc:
+        return jsonify({"error": str(exc)}), 409
+    except DocumentNotFoundError:
+        return jsonify({"error": "position nao encontrada"}), 404
+    except PersistenceLayerError as exc:
+        return jsonify({"error": str(exc)}), 503
+
+    return json_response({"item": position})
+
+
+@blueprint.patch("/cotacoes")
+def update_renda_variavel_quotes() -> tuple[dict[str, object], int]:
+    """Update ``cotacao_atual`` of many positions from a ``{ticker: cotacao}`` map."""
+
+    try:
+        cotacoes = RendaVariavelCotacoes.model_validate(request.get_json(silent=True))
+    except ValidationError as exc:
+        return jsonify({"errors": exc.errors()}), 400
+
+    try:
+        result = _build_service().update_quotes(cotacoes.root)
+    except PersistenceLayerError as exc:
+        return jsonify({"error": str(exc)}), 503
+
+    return json_response(result)
+
+
+@blueprint.post("/transacoes/importar")
+def import_renda_variavel_trades() -> tuple[dict[str, object], int]:
+    """Import trades from a CSV body (or an ``arquivo`` multipart field).
+
+    The file is parsed as a stream; see ``ler_csv`` for its columns. Any
+    invalid row rejects the whole import.
+    """
+
+    upload = request.files.get("arquivo")
+    raw = upload.stream if upload is not None else request.stream
+    arquivo = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")  # type: ignore[arg-type]
+
+    try:
+        result = build_import_service().importar(ler_csv(arquivo))
+    except ImportacaoError as exc:
+        return jsonify({"error": str(exc), "errors": exc.erros}), 400
+    except TradeNotAllowedError as exc:
+        return jsonify({"error": str(exc)}), 409
+    except UnicodeDecodeError:
+        return jsonify({"error": "arquivo deve estar em utf-8"}), 400
+    except PersistenceLayerError as exc:
+        return jsonify({"error": str(exc)}), 503
+
+    return json_response(result, 201)
+
+
+@blueprint.post("/recalcular")
+def recompute_renda_variavel_positions() -> tuple[dict[str, object], int]:
+    """Rebuild every position from its trades, spread over a process pool."""
+
+    ledger = _build_ledger(_get_repository())
+    try:
+        result = ledger.recompute_all(current_app.config.get("LEDGER_REPLAY_WORKERS") or None)
+    except PersistenceLayerError as exc:
+        return jsonify({"error": str(exc)}), 503
 
-    return jsonify(payload), 201
+    return json_response(result)
 
 
 def register(app: Flask) -> None:
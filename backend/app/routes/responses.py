@@ -0,0 +1,98 @@
+"""JSON responses serialised straight to bytes by pydantic-core."""
+from __future__ import annotations
+
+import inspect
+from functools import wraps
+from typing import Any, Callable, TypeVar
+
+from flask import Response, current_app, request
+from flask.json.provider import DefaultJSONProvider
+from pydantic_core import to_json
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class PydanticJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by pydantic-core's serializer.
+
+    Models (and lists or dicts of models) are encoded in a single pass by
+    their compiled serializers, so views no longer need ``model_dump``
+    before ``jsonify``. Keys keep their declaration order; values the Rust
+    serializer does not know fall back to ``DefaultJSONProvider.default``.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.dump_bytes(obj).decode()
+
+    def dump_bytes(self, obj: Any) -> bytes:
+        """Serialise ``obj`` to UTF-8 JSON bytes."""
+
+        return to_json(obj, fallback=self.default)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dump_bytes(obj), mimetype=self.mimetype)
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Return ``payload`` (which may hold pydantic models) as a JSON response."""
+
+    body = to_json(payload, fallback=DefaultJSONProvider.default)
+    return current_app.response_class(body, status=status, mimetype="application/json")
+
+
+def conditional(*collections: str) -> Callable[[F], F]:
+    """Serve a list view with a strong ETag derived from ``collections``.
+
+    The tag is read from the app's collection versions (one small read of
+    the counters kept in the datastore) before the view runs; when it
+    matches ``If-None-Match`` a bodiless 304 is returned without calling
+    the view, so the listed collections and the serializer are not
+    touched. Works for sync and async views.
+    """
+
+    def decorator(view: F) -> F:
+        if inspect.iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                etag = _current_etag(collections)
+                if etag is not None and etag in request.if_none_match:
+                    return _not_modified(etag)
+                return _tagged(await view(*args, **kwargs), etag)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @wraps(view)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            etag = _current_etag(collections)
+            if etag is not None and etag in request.if_none_match:
+                return _not_modified(etag)
+            return _tagged(view(*args, **kwargs), etag)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _current_etag(collections: tuple[str, ...]) -> str | None:
+    versions = current_app.extensions.get("collection_versions")
+    if versions is None:
+        return None
+    return versions.tag(*collections)
+
+
+def _not_modified(etag: str) -> Response:
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def _tagged(rv: Any, etag: str | None) -> Response:
+    response = current_app.make_response(rv)
+    if etag is not None and response.status_code == 200:
+        response.set_etag(etag)
+        # Let browsers keep the body but revalidate it on every use.
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,65 @@
+"""Routes serving the materialised portfolio summaries."""
+from __future__ import annotations
+
+from flask import Blueprint, Flask, current_app, jsonify
+
+from ..repositories import PersistenceLayerError, ResumosRepository
+from ..services import RendaVariavelService, ResumoService
+from ..services.resumo import PASSIVOS, RENDA_FIXA, RENDA_VARIAVEL
+from .responses import conditional, json_response
+
+blueprint = Blueprint("resumo", __name__, url_prefix="/resumo")
+
+
+def get_resumos_repository() -> ResumosRepository:
+    """Return the summaries repository for the current app."""
+
+    factory = current_app.config.get("RESUMOS_REPOSITORY_FACTORY")
+    if callable(factory):
+        return factory()  # type: ignore[return-value]
+
+    gateway_factory = current_app.config.get("DATA_GATEWAY_FACTORY")
+    if callable(gateway_factory):
+        gateway = gateway_factory()
+    else:  # pragma: no cover - defensive fallback for misconfiguration
+        from ..repositories import FirestoreGateway
+
+        gateway = FirestoreGateway.from_settings(
+            project_id=current_app.config.get("FIRESTORE_PROJECT_ID"),
+        )
+
+    return ResumosRepository(gateway)
+
+
+def _build_service() -> ResumoService:
+    # Imported here: the domain blueprints import this module.
+    from . import passivos, renda_fixa, renda_variavel
+
+    return ResumoService(
+        get_resumos_repository(),
+        {
+            RENDA_VARIAVEL: lambda: RendaVariavelService(
+                renda_variavel._get_repository()
+            ).list_positions(),
+            RENDA_FIXA: lambda: renda_fixa._get_repository().list(),
+            PASSIVOS: lambda: passivos._get_repository().list(),
+        },
+    )
+
+
+@blueprint.get("")
+@conditional(ResumosRepository.COLLECTION)
+def get_resumo() -> tuple[dict[str, object], int]:
+    """Return the summary of every dominio, read from its summary document."""
+
+    try:
+        resumos = _build_service().list()
+    except PersistenceLayerError as exc:
+        return jsonify({"error": str(exc)}), 503
+
+    return json_response({"items": {resumo.dominio: resumo for resumo in resumos}})
+
+
+def register(app: Flask) -> None:
+    """Register the blueprint on the Flask app."""
+    app.register_blueprint(blueprint)
@@ -0,0 +1,50 @@
+"""Request-scoped unit of work bound to ``flask.g``."""
+from __future__ import annotations
+
+from flask import Flask, Response, g, has_request_context, jsonify
+
+from ..repositories import DocumentNotFoundError, PersistenceLayerError, UnitOfWork
+from ..repositories.interfaces import FirestoreGatewayProtocol
+
+
+def request_gateway(gateway: FirestoreGatewayProtocol) -> FirestoreGatewayProtocol:
+    """Return the current request's unit of work over ``gateway``.
+
+    Outside a request the gateway itself is returned.
+    """
+
+    if not has_request_context():
+        return gateway
+    unit_of_work = g.get("unit_of_work")
+    if unit_of_work is None:
+        unit_of_work = g.unit_of_work = UnitOfWork(gateway)
+    return unit_of_work
+
+
+def _commit(response: Response) -> Response:
+    unit_of_work: UnitOfWork | None = g.pop("unit_of_work", None)
+    if unit_of_work is None or not unit_of_work.dirty:
+        return response
+    if response.status_code >= 400:
+        unit_of_work.rollback()
+        return response
+    try:
+        unit_of_work.commit()
+    except DocumentNotFoundError as exc:
+        # Deleted by another writer after this request read it.
+        unit_of_work.rollback()
+        failure = jsonify({"error": str(exc)})
+        failure.status_code = 409
+        return failure
+    except PersistenceLayerError as exc:
+        # ``after_request`` hooks must return a response object.
+        failure = jsonify({"error": str(exc)})
+        failure.status_code = 503
+        return failure
+    return response
+
+
+def register(app: Flask) -> None:
+    """Commit each request's staged writes once its response is ready."""
+
+    app.after_request(_commit)
@@ -1,5 +1,21 @@
 """Business services orchestrating domain logic."""
 
 from .renda_variavel import RendaVariavelService, TradeNotAllowedError
+from .ledger import LedgerService
+from .importacao import ImportacaoError, TradeImportService
+from .resumo import ResumoService
+from .cotacoes import LocalQuoteProvider, QuoteFetcher, QuoteRefresher
+from .historico import SnapshotService
 
-__all__ = ["RendaVariavelService", "TradeNotAllowedError"]
+__all__ = [
+    "ImportacaoError",
+    "LedgerService",
+    "LocalQuoteProvider",
+    "QuoteFetcher",
+    "QuoteRefresher",
+    "RendaVariavelService",
+    "ResumoService",
+    "SnapshotService",
+    "TradeImportService",
+    "TradeNotAllowedError",
+]
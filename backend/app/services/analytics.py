@@ -0,0 +1,135 @@
+"""Vectorised analytics over renda variavel positions.
+
+Positions are loaded once into column arrays (``PositionColumns``) and every
+derived metric is computed for the whole column in a single NumPy pass, so
+the cost of a bulk recompute grows with the number of positions only
+through array operations, not Python arithmetic per position. The helpers
+also accept scalars, which lets single-position writes share the formulas.
+"""
+from __future__ import annotations
+
+from itertools import repeat
+from typing import Iterable, Sequence
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+from ..models import RendaVariavelPosition, RendaVariavelTipo
+
+TIPOS: tuple[RendaVariavelTipo, ...] = tuple(RendaVariavelTipo)
+_TIPO_CODES = {tipo: code for code, tipo in enumerate(TIPOS)}
+#: Code of positions read without their tipo (projections); they form one group.
+SEM_TIPO = len(TIPOS)
+
+METRICAS = ("total_compra", "total_mercado", "resultado_monetario", "performance_percentual")
+
+Column = NDArray[np.float64]
+
+
+def tipo_codes(tipos: Iterable[RendaVariavelTipo | None], count: int = -1) -> NDArray[np.intp]:
+    """Encode tipos as small integers usable as ``bincount`` bins."""
+
+    return np.fromiter(
+        (_TIPO_CODES.get(tipo, SEM_TIPO) for tipo in tipos),  # type: ignore[arg-type]
+        dtype=np.intp,
+        count=count,
+    )
+
+
+def metricas(
+    quantidade: ArrayLike, preco_medio: ArrayLike, cotacao_atual: ArrayLike
+) -> dict[str, Column]:
+    """Return the derived totals of positions, keyed like their fields.
+
+    Performance is zero where ``preco_medio`` is zero.
+    """
+
+    quantidade = np.asarray(quantidade, dtype=np.float64)
+    preco_medio = np.asarray(preco_medio, dtype=np.float64)
+    cotacao_atual = np.asarray(cotacao_atual, dtype=np.float64)
+
+    total_compra = quantidade * preco_medio
+    total_mercado = quantidade * cotacao_atual
+    with np.errstate(divide="ignore", invalid="ignore"):
+        performance = np.where(preco_medio != 0, (cotacao_atual / preco_medio - 1) * 100, 0.0)
+    return {
+        "total_compra": total_compra,
+        "total_mercado": total_mercado,
+        "resultado_monetario": total_mercado - total_compra,
+        "performance_percentual": performance,
+    }
+
+
+def totais_por_tipo(total_mercado: ArrayLike, codes: NDArray[np.intp]) -> Column:
+    """Sum ``total_mercado`` per tipo code; index with ``tipo_codes``."""
+
+    return np.bincount(codes, weights=total_mercado, minlength=SEM_TIPO + 1)
+
+
+def pesos(
+    total_mercado: ArrayLike,
+    codes: NDArray[np.intp] | None = None,
+    total: ArrayLike | None = None,
+) -> Column:
+    """Return each position's share of its tipo's ``total_mercado``, in percent.
+
+    Without ``total`` the denominator is summed per tipo from the column
+    itself, which must then hold every position of those tipos; ``codes``
+    is required in that case. Tipos with no positive total weigh zero.
+    """
+
+    total_mercado = np.asarray(total_mercado, dtype=np.float64)
+    if total is None:
+        if codes is None:
+            raise ValueError("codes e obrigatorio quando total nao e informado")
+        total = totais_por_tipo(total_mercado, codes)[codes]
+    total = np.asarray(total, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, total_mercado / total * 100, 0.0)
+
+
+class PositionColumns:
+    """Column arrays of the price inputs of a list of positions."""
+
+    __slots__ = ("quantidade", "preco_medio", "cotacao_atual", "codes")
+
+    def __init__(
+        self,
+        quantidade: Column,
+        preco_medio: Column,
+        cotacao_atual: Column,
+        codes: NDArray[np.intp],
+    ) -> None:
+        self.quantidade = quantidade
+        self.preco_medio = preco_medio
+        self.cotacao_atual = cotacao_atual
+        self.codes = codes
+
+    @classmethod
+    def from_positions(cls, positions: Sequence[RendaVariavelPosition]) -> "PositionColumns":
+        count = len(positions)
+
+        def column(name: str) -> Column:
+            return np.fromiter(
+                (getattr(item, name) for item in positions), dtype=np.float64, count=count
+            )
+
+        return cls(
+            column("quantidade"),
+            column("preco_medio"),
+            column("cotacao_atual"),
+            tipo_codes((item.tipo for item in positions), count),
+        )
+
+    def metricas(self) -> dict[str, Column]:
+        """Derived totals of every position."""
+
+        return metricas(self.quantidade, self.preco_medio, self.cotacao_atual)
+
+
+def rows(columns: dict[str, Column]) -> list[dict[str, float]]:
+    """Transpose columns into one plain-float update payload per position."""
+
+    names = tuple(columns)
+    values = zip(*(columns[name].tolist() for name in names))
+    return list(map(dict, map(zip, repeat(names), values)))
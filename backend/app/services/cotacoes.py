@@ -0,0 +1,328 @@
+"""Quote providers and the machinery that refreshes ``cotacao_atual``.
+
+A provider answers one batch of tickers at a time. ``QuoteFetcher`` routes
+tickers to the provider of their tipo, serves fresh ones from a
+``QuoteCache`` and fetches the rest in batches, running up to each
+provider's ``max_concorrencia`` batches at once on an asyncio loop, so
+hundreds of tickers cost a few round trips of latency instead of one per
+ticker. ``QuoteRefresher`` pushes the fetched quotes into the positions
+and ``PeriodicRefresh`` runs it on a background thread.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Mapping, NamedTuple, Protocol, Sequence
+
+from ..models import RendaVariavelTipo
+from .renda_variavel import RendaVariavelService
+
+if TYPE_CHECKING:  # pragma: no cover
+    from flask import Flask
+
+#: Tickers sent to a provider per call and pushed to the positions per write.
+TAMANHO_LOTE = 100
+TIMEOUT_SECONDS = 10.0
+
+
+class Cotacao(NamedTuple):
+    """Last price of a ticker and when the provider quoted it."""
+
+    ticker: str
+    preco: float
+    cotado_em: datetime
+
+
+class QuoteProviderError(Exception):
+    """Raised by providers when a batch of tickers cannot be quoted."""
+
+
+class QuoteProvider(Protocol):
+    """Source of quotes for a list of tickers.
+
+    ``max_concorrencia`` caps the calls in flight against the provider and
+    ``tamanho_lote`` the tickers per call. Tickers the provider does not
+    know are simply left out of the result.
+    """
+
+    nome: str
+    max_concorrencia: int
+    tamanho_lote: int
+
+    async def cotacoes(self, tickers: Sequence[str]) -> Mapping[str, Cotacao]:
+        """Return the quotes of ``tickers`` keyed by upper-case ticker."""
+
+
+class LocalQuoteProvider:
+    """Provider answering from an in-memory table, for offline use and tests.
+
+    ``from_file`` loads a JSON object mapping tickers to a price or to
+    ``{"preco": ..., "cotado_em": ...}`` and reloads it when the file
+    changes. ``latencia`` delays every call, to simulate a remote source.
+    """
+
+    nome = "local"
+
+    def __init__(
+        self,
+        precos: Mapping[str, Any] | None = None,
+        *,
+        cotado_em: datetime | None = None,
+        max_concorrencia: int = 4,
+        tamanho_lote: int = TAMANHO_LOTE,
+        latencia: float = 0.0,
+    ) -> None:
+        self.max_concorrencia = max_concorrencia
+        self.tamanho_lote = tamanho_lote
+        self.latencia = latencia
+        self.chamadas = 0
+        self._path: Path | None = None
+        self._mtime: float | None = None
+        self._tabela = _tabela(precos or {}, cotado_em or datetime.now(timezone.utc))
+
+    @classmethod
+    def from_file(cls, path: str | os.PathLike[str], **kwargs: Any) -> "LocalQuoteProvider":
+        provider = cls(**kwargs)
+        provider._path = Path(path)
+        provider._recarregar()
+        return provider
+
+    async def cotacoes(self, tickers: Sequence[str]) -> Mapping[str, Cotacao]:
+        self.chamadas += 1
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        self._recarregar()
+        tabela = self._tabela
+        return {ticker: tabela[ticker] for ticker in map(str.upper, tickers) if ticker in tabela}
+
+    def _recarregar(self) -> None:
+        if self._path is None:
+            return
+        try:
+            mtime = self._path.stat().st_mtime
+            if mtime == self._mtime:
+                return
+            conteudo = json.loads(self._path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise QuoteProviderError(f"arquivo de cotacoes invalido: {self._path}") from exc
+        if not isinstance(conteudo, dict):
+            raise QuoteProviderError(f"arquivo de cotacoes invalido: {self._path}")
+        self._tabela = _tabela(conteudo, datetime.fromtimestamp(mtime, timezone.utc))
+        self._mtime = mtime
+
+
+def _tabela(precos: Mapping[str, Any], padrao: datetime) -> dict[str, Cotacao]:
+    tabela = {}
+    for ticker, valor in precos.items():
+        ticker = ticker.upper()
+        if isinstance(valor, Mapping):
+            cotado_em = valor.get("cotado_em")
+            tabela[ticker] = Cotacao(
+                ticker,
+                float(valor["preco"]),
+                datetime.fromisoformat(cotado_em) if cotado_em else padrao,
+            )
+        else:
+            tabela[ticker] = Cotacao(ticker, float(valor), padrao)
+    return tabela
+
+
+class QuoteCache:
+    """Thread-safe quote cache keyed by ticker; entries expire after ``ttl_seconds``."""
+
+    def __init__(
+        self, ttl_seconds: float = 60.0, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._entries: dict[str, tuple[float, Cotacao]] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, tickers: Iterable[str]) -> tuple[dict[str, Cotacao], list[str]]:
+        """Split ``tickers`` into fresh cached quotes and the ones to fetch."""
+
+        agora = self._clock()
+        encontradas: dict[str, Cotacao] = {}
+        faltantes: list[str] = []
+        with self._lock:
+            for ticker in tickers:
+                entry = self._entries.get(ticker)
+                if entry is None or entry[0] <= agora:
+                    self._entries.pop(ticker, None)
+                    faltantes.append(ticker)
+                else:
+                    encontradas[ticker] = entry[1]
+        return encontradas, faltantes
+
+    def put_many(self, cotacoes: Iterable[Cotacao]) -> None:
+        expira = self._clock() + self._ttl
+        with self._lock:
+            for cotacao in cotacoes:
+                self._entries[cotacao.ticker] = (expira, cotacao)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class Busca(NamedTuple):
+    """Outcome of a fetch: the quotes found and the tickers left without one."""
+
+    cotacoes: dict[str, Cotacao]
+    falhas: list[str]
+
+
+class QuoteFetcher:
+    """Fetch quotes concurrently from the provider of each ticker's tipo.
+
+    Tickers of tipos without a provider, unknown to their provider or in a
+    batch that failed or timed out are reported in ``Busca.falhas``; one
+    failing batch never affects the others. Concurrency limits apply per
+    provider within a ``fetch`` call.
+    """
+
+    def __init__(
+        self,
+        providers: Mapping[RendaVariavelTipo, QuoteProvider],
+        cache: QuoteCache | None = None,
+        timeout_seconds: float = TIMEOUT_SECONDS,
+    ) -> None:
+        self._providers = providers
+        self._cache = cache
+        self._timeout = timeout_seconds
+
+    async def fetch(self, ativos: Mapping[str, RendaVariavelTipo]) -> Busca:
+        """Return quotes for ``ativos``, a mapping of ticker to tipo."""
+
+        tickers = {ticker.upper(): tipo for ticker, tipo in ativos.items()}
+        cotacoes: dict[str, Cotacao] = {}
+        faltantes = list(tickers)
+        if self._cache is not None:
+            cotacoes, faltantes = self._cache.get_many(faltantes)
+
+        por_provider: dict[int, tuple[QuoteProvider, list[str]]] = {}
+        falhas: list[str] = []
+        for ticker in faltantes:
+            provider = self._providers.get(tickers[ticker])
+            if provider is None:
+                falhas.append(ticker)
+            else:
+                por_provider.setdefault(id(provider), (provider, []))[1].append(ticker)
+
+        lotes = []
+        for provider, pendentes in por_provider.values():
+            limite = asyncio.Semaphore(max(provider.max_concorrencia, 1))
+            tamanho = max(provider.tamanho_lote, 1)
+            lotes.extend(
+                self._lote(provider, limite, pendentes[inicio : inicio + tamanho])
+                for inicio in range(0, len(pendentes), tamanho)
+            )
+        buscadas: dict[str, Cotacao] = {}
+        for pedidos, resultado in await asyncio.gather(*lotes):
+            buscadas.update(resultado)
+            falhas.extend(ticker for ticker in pedidos if ticker not in resultado)
+
+        if self._cache is not None:
+            self._cache.put_many(buscadas.values())
+        cotacoes.update(buscadas)
+        return Busca(cotacoes, sorted(falhas))
+
+    async def _lote(
+        self, provider: QuoteProvider, limite: asyncio.Semaphore, tickers: list[str]
+    ) -> tuple[list[str], dict[str, Cotacao]]:
+        async with limite:
+            try:
+                resultado = await asyncio.wait_for(provider.cotacoes(tickers), self._timeout)
+            except (QuoteProviderError, asyncio.TimeoutError, OSError):
+                return tickers, {}
+        pedidos = set(tickers)
+        return tickers, {
+            ticker: cotacao
+            for ticker, cotacao in resultado.items()
+            if ticker in pedidos and cotacao.preco > 0
+        }
+
+
+class QuoteRefresher:
+    """Fetch quotes for every position and push them into the positions in batches.
+
+    Only the quote fields are written (see ``RendaVariavelService.update_quotes``).
+    """
+
+    def __init__(
+        self,
+        fetcher: QuoteFetcher,
+        service: RendaVariavelService,
+        tamanho_lote: int = TAMANHO_LOTE,
+    ) -> None:
+        self._fetcher = fetcher
+        self._service = service
+        self._tamanho_lote = max(tamanho_lote, 1)
+
+    def refresh(self) -> dict[str, object]:
+        """Update the quotes of all positions; return counts and failed tickers."""
+
+        ativos = self._service.list_positions(fields=("ticker", "tipo"))
+        busca = asyncio.run(
+            self._fetcher.fetch({position.ticker: position.tipo for position in ativos})
+        )
+        precos = [(ticker, cotacao.preco) for ticker, cotacao in busca.cotacoes.items()]
+        # Read the holdings only once the fetch is over: trades, edits and
+        # deletes made while it ran must not be written over.
+        positions = self._service.list_positions()
+
+        atualizadas = inalteradas = 0
+        for inicio in range(0, len(precos), self._tamanho_lote):
+            result = self._service.update_quotes(
+                dict(precos[inicio : inicio + self._tamanho_lote]), positions=positions
+            )
+            atualizadas += result["atualizadas"]
+            inalteradas += result["inalteradas"]
+        return {"atualizadas": atualizadas, "inalteradas": inalteradas, "falhas": busca.falhas}
+
+
+class PeriodicRefresh:
+    """Run ``job`` every ``intervalo`` seconds on a daemon thread, in an app context.
+
+    Errors are logged on ``app.logger`` and the next run happens as usual.
+    Also used for other periodic jobs, told apart by ``nome``.
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        intervalo: float,
+        job: Callable[[], object],
+        nome: str = "quote-refresh",
+    ) -> None:
+        self._app = app
+        self._intervalo = intervalo
+        self._job = job
+        self._nome = nome
+        self._parar = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self._nome, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._parar.wait(self._intervalo):
+            with self._app.app_context():
+                try:
+                    self._job()
+                except Exception:
+                    self._app.logger.exception("falha na tarefa %s", self._nome)
@@ -0,0 +1,90 @@
+"""Daily snapshots of renda variavel positions and their time series."""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from ..models import Moeda
+from ..repositories import DocumentConflictError, SnapshotStore
+from .analytics import TIPOS, tipo_codes, totais_por_tipo
+from .renda_variavel import RendaVariavelService
+
+#: Group columns of the store: one ``total_mercado`` per tipo, in ``TIPOS`` order.
+COLUNAS = tuple(tipo.value for tipo in TIPOS)
+
+_CAMPOS = ("ticker", "tipo", "quantidade", "cotacao_atual", "total_mercado")
+
+
+class SnapshotService:
+    """Record one snapshot per day and serve the history as series.
+
+    The patrimonio series is kept per moeda: positions are summed in the
+    currency they trade in, as no exchange rate is stored.
+    """
+
+    def __init__(self, store: SnapshotStore, positions: RendaVariavelService) -> None:
+        self._store = store
+        self._positions = positions
+
+    def registrar(self, dia: date | None = None) -> bool:
+        """Append today's (or ``dia``'s) snapshot; False when it already exists."""
+
+        dia = dia or datetime.now(timezone.utc).date()
+        ultimo = self._store.ultimo_dia()
+        if ultimo is not None and dia <= ultimo:
+            return False
+
+        positions = self._positions.list_positions(fields=_CAMPOS)
+        count = len(positions)
+
+        def column(name: str) -> np.ndarray:
+            return np.fromiter(
+                (getattr(position, name) for position in positions), dtype=np.float64, count=count
+            )
+
+        total_mercado = column("total_mercado")
+        codes = tipo_codes((position.tipo for position in positions), count)
+        try:
+            self._store.append(
+                dia,
+                [position.id for position in positions],
+                [position.ticker for position in positions],
+                totais_por_tipo(total_mercado, codes)[: len(TIPOS)],
+                {
+                    "quantidade": column("quantidade"),
+                    "cotacao": column("cotacao_atual"),
+                    "total_mercado": total_mercado,
+                },
+            )
+        except DocumentConflictError:
+            # Another process (the CLI or another worker) took it first.
+            return False
+        return True
+
+    def serie(self, inicio: date | None = None, fim: date | None = None) -> dict[str, object]:
+        """Return patrimonio per moeda and ``total_mercado`` per tipo over ``[inicio, fim]``."""
+
+        datas, valores = self._store.serie_grupos(inicio, fim)
+        moedas = {
+            moeda.value: valores[:, [tipo.moeda is moeda for tipo in TIPOS]].sum(axis=1).tolist()
+            for moeda in Moeda
+        }
+        return {
+            "datas": [dia.isoformat() for dia in datas],
+            "patrimonio": moedas,
+            "tipos": {coluna: valores[:, index].tolist() for index, coluna in enumerate(COLUNAS)},
+        }
+
+    def serie_posicao(
+        self, position_id: str, inicio: date | None = None, fim: date | None = None
+    ) -> dict[str, object]:
+        """Return the snapshotted values of one position over ``[inicio, fim]``."""
+
+        datas, valores = self._store.serie_posicao(position_id, inicio, fim)
+        return {
+            "id": position_id,
+            "ticker": self._store.ticker(position_id),
+            "datas": [dia.isoformat() for dia in datas],
+            **{nome: column.tolist() for nome, column in valores.items()},
+        }
@@ -0,0 +1,275 @@
+"""Bulk import of renda variavel trades from broker note CSV exports."""
+from __future__ import annotations
+
+import csv
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Mapping, TextIO
+
+from pydantic import ValidationError
+
+from ..models import RendaVariavelPosition, RendaVariavelTipo, RendaVariavelTradeInput
+from ..repositories import RendaVariavelPositionsRepository, RendaVariavelTradesRepository
+from .analytics import metricas
+from .ledger import LedgerService, Lancamento, Replay, replay, trade_payload
+from .renda_variavel import RendaVariavelService, Saldo, TradeNotAllowedError
+
+
+class ImportacaoError(Exception):
+    """Raised when an import is rejected; ``erros`` lists the offending rows."""
+
+    def __init__(self, erros: list[dict[str, object]]) -> None:
+        super().__init__("importacao rejeitada")
+        self.erros = erros
+
+
+def ler_csv(arquivo: TextIO) -> Iterator[tuple[int, dict[str, str]]]:
+    """Yield ``(linha, row)`` pairs from a CSV with a header, one row at a time.
+
+    Expected columns: ticker, tipo_operacao, quantidade, cotacao, data and,
+    for tickers without a position yet, tipo. Headers are matched
+    case-insensitively; a ``;`` delimiter (common in Brazilian exports) is
+    detected from the header line.
+    """
+
+    header = arquivo.readline()
+    delimiter = ";" if header.count(";") > header.count(",") else ","
+    campos = [campo.strip().lower() for campo in next(csv.reader([header], delimiter=delimiter))]
+    for linha, valores in enumerate(csv.reader(arquivo, delimiter=delimiter), start=2):
+        if not any(valor.strip() for valor in valores):
+            continue
+        yield linha, dict(zip(campos, (valor.strip() for valor in valores)))
+
+
+class _Grupo:
+    """Trades of one position collected during validation."""
+
+    __slots__ = ("position", "tipo", "ticker", "lancamentos")
+
+    def __init__(
+        self, position: RendaVariavelPosition | None, ticker: str, tipo: RendaVariavelTipo
+    ) -> None:
+        self.position = position
+        self.ticker = ticker
+        self.tipo = tipo
+        self.lancamentos: list[Lancamento] = []
+
+
+class TradeImportService:
+    """Import trades in bulk with a handful of batched writes.
+
+    Rows are validated as they are parsed and grouped by position; nothing
+    is written unless every row is valid and every position's trades can be
+    applied. Positions whose imported trades all follow their stored ones
+    are replayed in memory, then positions, new positions and trades are
+    each persisted with one batched write and the summary (from which pesos
+    are derived) is updated once. Positions that receive trades older than
+    a stored one are replayed from their ledger (``LedgerService.plan_backdated``)
+    before anything is written.
+    """
+
+    def __init__(
+        self,
+        positions: RendaVariavelService,
+        ledger: LedgerService,
+        positions_repository: RendaVariavelPositionsRepository,
+        trades_repository: RendaVariavelTradesRepository,
+    ) -> None:
+        self._positions = positions
+        self._ledger = ledger
+        self._repository = positions_repository
+        self._trades = trades_repository
+
+    def importar(self, linhas: Iterable[tuple[int, Mapping[str, str]]]) -> dict[str, object]:
+        """Validate and persist ``(linha, row)`` pairs (see ``ler_csv``)."""
+
+        grupos = self._agrupar(linhas)
+        if not grupos:
+            return {"transacoes": 0, "posicoes": 0, "criadas": 0, "reprocessadas": 0}
+
+        atrasadas = [
+            grupo
+            for grupo in grupos.values()
+            if grupo.position is not None
+            and self._tem_transacao_posterior(grupo.position.id, grupo.lancamentos[0].data)
+        ]
+        em_memoria = [grupo for grupo in grupos.values() if grupo not in atrasadas]
+        # Every position is replayed before the first write, so a rejected
+        # replay leaves the datastore untouched.
+        planos, erros = [], []
+        for grupo in atrasadas:
+            try:
+                planos.append(self._ledger.plan_backdated(grupo.position.id, grupo.lancamentos))
+            except TradeNotAllowedError as exc:
+                erros.append({"ticker": grupo.ticker, "error": str(exc)})
+        aplicados = _aplicar(em_memoria, erros)
+
+        for plano in planos:
+            self._ledger.apply(plano)
+
+        agora = datetime.now(timezone.utc)
+        saldos = [aplicados[id(grupo)].saldo for grupo in em_memoria]
+        payloads = dict(zip(map(id, em_memoria), _posicoes(em_memoria, saldos, agora)))
+        # New positions first, so created ids line up with their groups.
+        em_memoria.sort(key=lambda grupo: grupo.position is not None)
+        novas = [grupo for grupo in em_memoria if grupo.position is None]
+        existentes = em_memoria[len(novas) :]
+        changes = [
+            (grupo.position, RendaVariavelPosition.model_validate(payloads[id(grupo)]))
+            for grupo in em_memoria
+        ]
+
+        def write() -> list[str]:
+            criadas = self._repository.create_many([payloads[id(grupo)] for grupo in novas])
+            if existentes:
+                self._repository.update_many(
+                    {grupo.position.id: payloads[id(grupo)] for grupo in existentes}
+                )
+            return [position.id for position in criadas] + [grupo.position.id for grupo in existentes]
+
+        position_ids = self._positions.apply_changes(changes, write)
+        trades = [
+            trade_payload(position_id, lancamento, efeito)
+            for position_id, grupo in zip(position_ids, em_memoria)
+            for lancamento, efeito in zip(grupo.lancamentos, aplicados[id(grupo)].efeitos)
+        ]
+        if trades:
+            self._trades.create_many(trades)
+
+        return {
+            "transacoes": sum(len(grupo.lancamentos) for grupo in grupos.values()),
+            "posicoes": len(grupos),
+            "criadas": len(novas),
+            "reprocessadas": len(atrasadas),
+        }
+
+    def _agrupar(self, linhas: Iterable[tuple[int, Mapping[str, str]]]) -> dict[str, _Grupo]:
+        por_ticker = {position.ticker.upper(): position for position in self._repository.list()}
+        grupos: dict[str, _Grupo] = {}
+        erros: list[dict[str, object]] = []
+
+        for linha, row in linhas:
+            ticker = (row.get("ticker") or "").upper()
+            try:
+                trade = RendaVariavelTradeInput.model_validate(
+                    {
+                        "tipo_operacao": (row.get("tipo_operacao") or "").lower(),
+                        "quantidade": row.get("quantidade") or None,
+                        "cotacao": row.get("cotacao") or None,
+                        "data": row.get("data") or None,
+                    }
+                )
+            except ValidationError as exc:
+                erros.append(
+                    {"linha": linha, "errors": exc.errors(include_url=False, include_context=False)}
+                )
+                continue
+            if not ticker:
+                erros.append({"linha": linha, "error": "ticker obrigatorio"})
+                continue
+            if trade.data is None:
+                erros.append({"linha": linha, "error": "data obrigatoria"})
+                continue
+
+            grupo = grupos.get(ticker)
+            if grupo is None:
+                grupo = self._novo_grupo(ticker, row.get("tipo"), por_ticker.get(ticker))
+                if isinstance(grupo, str):
+                    erros.append({"linha": linha, "error": grupo})
+                    continue
+                grupos[ticker] = grupo
+            grupo.lancamentos.append(
+                Lancamento(None, trade.data, trade.tipo_operacao, trade.quantidade, trade.cotacao)
+            )
+
+        if erros:
+            raise ImportacaoError(erros)
+        for grupo in grupos.values():
+            grupo.lancamentos.sort(key=lambda item: item.data)
+        return grupos
+
+    @staticmethod
+    def _novo_grupo(
+        ticker: str, tipo_informado: str | None, position: RendaVariavelPosition | None
+    ) -> _Grupo | str:
+        tipo = None
+        if tipo_informado:
+            try:
+                tipo = RendaVariavelTipo(tipo_informado.lower())
+            except ValueError:
+                return f"tipo invalido: {tipo_informado}"
+        if position is not None:
+            if tipo is not None and tipo is not position.tipo:
+                return f"tipo nao corresponde ao ativo {ticker}"
+            return _Grupo(position, ticker, position.tipo)
+        if tipo is None:
+            return f"tipo obrigatorio para o novo ativo {ticker}"
+        return _Grupo(None, ticker, tipo)
+
+    def _tem_transacao_posterior(self, position_id: str, data: datetime) -> bool:
+        return bool(
+            self._trades.find([("position_id", "==", position_id), ("data", ">", data)], limit=1)
+        )
+
+
+def _aplicar(grupos: Iterable[_Grupo], erros: list[dict[str, object]]) -> dict[int, Replay]:
+    """Replay each group's trades on its position's holding, in memory.
+
+    Groups that cannot be applied are added to ``erros``, which raises
+    ``ImportacaoError`` once every group was tried.
+    """
+
+    aplicados: dict[int, Replay] = {}
+    for grupo in grupos:
+        position = grupo.position
+        inicio = Saldo() if position is None else Saldo(position.quantidade, position.total_compra)
+        try:
+            # No checkpoints: the ledger takes them on its next replay.
+            aplicados[id(grupo)] = replay(
+                grupo.lancamentos, inicio, intervalo=len(grupo.lancamentos) + 1
+            )
+        except TradeNotAllowedError as exc:
+            erros.append({"ticker": grupo.ticker, "error": str(exc)})
+    if erros:
+        raise ImportacaoError(erros)
+    return aplicados
+
+
+def _posicoes(
+    grupos: list[_Grupo], saldos: list[Saldo], agora: datetime
+) -> list[dict[str, object]]:
+    """Build the payload of every imported position with one vectorised pass."""
+
+    cotacoes = [
+        grupo.lancamentos[-1].cotacao if grupo.position is None else grupo.position.cotacao_atual
+        for grupo in grupos
+    ]
+    derived = metricas(
+        [saldo.quantidade for saldo in saldos],
+        [saldo.preco_medio for saldo in saldos],
+        cotacoes,
+    )
+    total_mercado = derived["total_mercado"].tolist()
+    performance = derived["performance_percentual"].tolist()
+
+    payloads = []
+    for index, (grupo, saldo) in enumerate(zip(grupos, saldos)):
+        base = (
+            {"ticker": grupo.ticker, "tipo": grupo.tipo.value, "peso_desejado_percentual": 0.0}
+            if grupo.position is None
+            else grupo.position.model_dump(mode="json", exclude={"id"})
+        )
+        payloads.append(
+            base
+            | {
+                "quantidade": saldo.quantidade,
+                "preco_medio": saldo.preco_medio,
+                "cotacao_atual": cotacoes[index],
+                "total_compra": saldo.total_compra,
+                "total_mercado": total_mercado[index],
+                "resultado_monetario": total_mercado[index] - saldo.total_compra,
+                "performance_percentual": performance[index],
+                "peso_percentual": 0.0,
+                "atualizado_em": agora,
+            }
+        )
+    return payloads
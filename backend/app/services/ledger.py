@@ -0,0 +1,465 @@
+"""Rebuild renda variavel positions by replaying their trade ledger."""
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterable, NamedTuple, Sequence
+
+import numpy as np
+
+from ..models import (
+    RendaVariavelCheckpoint,
+    RendaVariavelPosition,
+    RendaVariavelTrade,
+    as_utc,
+)
+from ..repositories import (
+    RendaVariavelCheckpointsRepository,
+    RendaVariavelPositionsRepository,
+    RendaVariavelTradesRepository,
+)
+from .analytics import PositionColumns, rows, tipo_codes
+from .renda_variavel import Efeito, RendaVariavelService, Saldo, TradeNotAllowedError, aplicar
+
+#: Trades replayed between two stored checkpoints of a position.
+CHECKPOINT_INTERVAL = 50
+#: Below this many positions a recompute runs inline: a pool costs more to start.
+MIN_POSITIONS_PER_POOL = 200
+
+
+class Lancamento(NamedTuple):
+    """The fields of a trade the replay reads; ``id`` is None for unsaved trades."""
+
+    id: str | None
+    data: datetime
+    tipo_operacao: str
+    quantidade: float
+    cotacao: float
+
+    @classmethod
+    def from_trade(cls, trade: RendaVariavelTrade) -> "Lancamento":
+        return cls(trade.id, trade.data, trade.tipo_operacao, trade.quantidade, trade.cotacao)
+
+
+def desfazer(saldo: Saldo, trade: RendaVariavelTrade) -> Saldo:
+    """Undo ``trade`` from the holding it produced."""
+
+    if trade.tipo_operacao == "compra":
+        quantidade = max(saldo.quantidade - trade.quantidade, 0.0)
+        total_compra = max(saldo.total_compra - trade.quantidade * trade.cotacao, 0.0)
+        return Saldo(quantidade, total_compra if quantidade > 0 else 0.0)
+
+    quantidade = saldo.quantidade + trade.quantidade
+    preco_medio = trade.preco_medio_no_ato
+    if preco_medio is None:
+        preco_medio = saldo.preco_medio
+    return Saldo(quantidade, preco_medio * quantidade)
+
+
+class Replay(NamedTuple):
+    saldo: Saldo
+    #: ``(trades aplicadas, data, saldo)`` at each checkpoint reached.
+    checkpoints: list[tuple[int, datetime, Saldo]]
+    efeitos: list[Efeito]
+
+
+def replay(
+    lancamentos: Sequence[Lancamento],
+    inicio: Saldo = Saldo(),
+    aplicadas: int = 0,
+    intervalo: int = CHECKPOINT_INTERVAL,
+) -> Replay:
+    """Apply ``lancamentos`` (sorted by date) to ``inicio``.
+
+    ``aplicadas`` is the number of trades already folded into ``inicio``.
+    A checkpoint is taken once ``intervalo`` trades have been applied since
+    the last one, but only between trades with different dates, so "every
+    trade after the checkpoint's date" is exactly the trades left to apply.
+    """
+
+    saldo = inicio
+    checkpoints: list[tuple[int, datetime, Saldo]] = []
+    efeitos: list[Efeito] = []
+    desde_ultimo = 0
+    for index, lancamento in enumerate(lancamentos):
+        saldo, efeito = aplicar(
+            saldo, lancamento.tipo_operacao, lancamento.quantidade, lancamento.cotacao
+        )
+        efeitos.append(efeito)
+        desde_ultimo += 1
+        proximo = lancamentos[index + 1] if index + 1 < len(lancamentos) else None
+        if desde_ultimo >= intervalo and (proximo is None or proximo.data > lancamento.data):
+            checkpoints.append((aplicadas + index + 1, lancamento.data, saldo))
+            desde_ultimo = 0
+    return Replay(saldo, checkpoints, efeitos)
+
+
+class Reconstrucao(NamedTuple):
+    """A position replayed in memory, ready for ``LedgerService.apply``."""
+
+    position: RendaVariavelPosition
+    stored: list[RendaVariavelTrade]
+    novos: list[Lancamento]
+    #: Every trade in replay order, stored and new.
+    lancamentos: list[Lancamento]
+    #: Effect of each trade keyed by ``id()`` of its ``Lancamento``.
+    efeitos: dict[int, Efeito]
+    saldo: Saldo
+    checkpoints: list[RendaVariavelCheckpoint]
+    aplicadas: int
+
+
+def _replay_job(job: tuple[Saldo, list[Lancamento], int]) -> Replay | str:
+    # Runs in worker processes: errors come back as messages so one broken
+    # ledger does not abort the whole pool.
+    inicio, lancamentos, intervalo = job
+    try:
+        return replay(lancamentos, inicio, 0, intervalo)
+    except TradeNotAllowedError as exc:
+        return str(exc)
+
+
+class LedgerService:
+    """Rebuild positions from ``renda_variavel_trades`` in date order.
+
+    The holding before the first recorded trade is kept as the opening
+    checkpoint of the position. It is derived once, by undoing the stored
+    trades from the stored position, which assumes the position reflects
+    every trade recorded so far. Later checkpoints are taken every
+    ``intervalo`` trades, so a back-dated trade only replays the trades
+    after the newest checkpoint older than it.
+    """
+
+    def __init__(
+        self,
+        positions: RendaVariavelService,
+        positions_repository: RendaVariavelPositionsRepository,
+        trades_repository: RendaVariavelTradesRepository,
+        checkpoints_repository: RendaVariavelCheckpointsRepository,
+        intervalo: int = CHECKPOINT_INTERVAL,
+    ) -> None:
+        self._positions = positions
+        self._repository = positions_repository
+        self._trades = trades_repository
+        self._checkpoints = checkpoints_repository
+        self._intervalo = intervalo
+
+    def record_trade(
+        self,
+        position_id: str,
+        *,
+        tipo_operacao: str,
+        quantidade: float,
+        cotacao: float,
+        data: datetime | None = None,
+    ) -> tuple[RendaVariavelPosition, RendaVariavelTrade]:
+        """Record a trade, replaying the ledger when it predates recorded trades.
+
+        Trades dated after every recorded trade of the position take the
+        in-place path of ``RendaVariavelService.record_trade``.
+        """
+
+        data = as_utc(data)
+        if data is None or not self._trades.find(
+            [("position_id", "==", position_id), ("data", ">", data)], limit=1
+        ):
+            return self._positions.record_trade(
+                position_id,
+                tipo_operacao=tipo_operacao,
+                quantidade=quantidade,
+                cotacao=cotacao,
+                data=data,
+            )
+
+        novo = Lancamento(None, data, tipo_operacao.lower(), float(quantidade), float(cotacao))
+        position, (created,) = self._rebuild(position_id, data, [novo])
+        return position, created
+
+    def record_backdated(
+        self, position_id: str, novos: Sequence[Lancamento]
+    ) -> tuple[RendaVariavelPosition, list[RendaVariavelTrade]]:
+        """Store unsaved trades ``novos`` and replay the position from the oldest."""
+
+        return self.apply(self.plan_backdated(position_id, novos))
+
+    def rebuild_position(
+        self, position_id: str, desde: datetime | None = None
+    ) -> RendaVariavelPosition:
+        """Replay the trades of a position dated from ``desde`` (all when None)."""
+
+        position, _ = self._rebuild(position_id, as_utc(desde))
+        return position
+
+    def recompute_all(self, workers: int | None = None) -> dict[str, object]:
+        """Rebuild every position that has trades from its opening checkpoint.
+
+        Ledgers are replayed in a process pool of ``workers`` processes
+        (default: one per CPU) once there are enough positions to pay for
+        it. Positions whose ledger cannot be replayed are left unchanged
+        and reported under ``erros``.
+        """
+
+        por_position: dict[str, list[RendaVariavelTrade]] = {}
+        for trade in self._trades.iter(order_by="data"):
+            por_position.setdefault(trade.position_id, []).append(trade)
+        positions = self._repository.get_many(list(por_position))
+        ids = [position_id for position_id in por_position if position_id in positions]
+
+        stored = self._checkpoints.get_many(
+            [RendaVariavelCheckpointsRepository.document_id(position_id, 0) for position_id in ids]
+        )
+        aberturas = {
+            position_id: _abertura(
+                positions[position_id],
+                por_position[position_id],
+                stored.get(RendaVariavelCheckpointsRepository.document_id(position_id, 0)),
+            )
+            for position_id in ids
+        }
+        jobs = [
+            (aberturas[position_id], _lancamentos(por_position[position_id]), self._intervalo)
+            for position_id in ids
+        ]
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(jobs) >= MIN_POSITIONS_PER_POOL:
+            # Forking the multi-threaded server process can deadlock the
+            # children; spawned workers only need the picklable jobs.
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                chunksize = max(len(jobs) // (workers * 4), 1)
+                results = list(pool.map(_replay_job, jobs, chunksize=chunksize))
+        else:
+            results = [_replay_job(job) for job in jobs]
+
+        erros: dict[str, str] = {}
+        rebuilt: dict[str, Saldo] = {}
+        checkpoints: list[RendaVariavelCheckpoint] = []
+        trades: dict[str, dict[str, object]] = {}
+        for position_id, result in zip(ids, results):
+            if isinstance(result, str):
+                erros[position_id] = result
+                continue
+            rebuilt[position_id] = result.saldo
+            checkpoints.append(_checkpoint(position_id, 0, None, aberturas[position_id]))
+            checkpoints.extend(_checkpoints(position_id, result.checkpoints))
+            trades.update(_changed_trades(por_position[position_id], result.efeitos))
+
+        if rebuilt:
+            payloads = _position_payloads(
+                [positions[position_id] for position_id in rebuilt], list(rebuilt.values())
+            )
+            self._repository.update_many(dict(zip(rebuilt, payloads)))
+        if trades:
+            self._trades.update_many(trades)
+        self._replace_checkpoints(
+            checkpoints,
+            [item for item in self._checkpoints.list() if item.position_id in rebuilt],
+        )
+        self._positions.rebuild_resumo()
+        return {"atualizadas": len(rebuilt), "erros": erros}
+
+    def _rebuild(
+        self,
+        position_id: str,
+        desde: datetime | None,
+        novos: Sequence[Lancamento] = (),
+    ) -> tuple[RendaVariavelPosition, list[RendaVariavelTrade]]:
+        return self.apply(self._plan(position_id, desde, novos))
+
+    def plan_backdated(self, position_id: str, novos: Sequence[Lancamento]) -> Reconstrucao:
+        """Replay the position with the unsaved trades ``novos`` without writing.
+
+        Raises ``TradeNotAllowedError`` when the ledger cannot be replayed;
+        ``apply`` stores the result.
+        """
+
+        novos = [item._replace(data=as_utc(item.data)) for item in novos]
+        return self._plan(position_id, min(item.data for item in novos), novos)
+
+    def apply(self, plano: Reconstrucao) -> tuple[RendaVariavelPosition, list[RendaVariavelTrade]]:
+        """Store a replay planned by ``plan_backdated``; return the position and new trades."""
+
+        position_id = plano.position.id
+        changed = _changed_trades(
+            plano.stored,
+            [plano.efeitos[id(item)] for item in plano.lancamentos if item.id is not None],
+        )
+        if changed:
+            self._trades.update_many(changed)
+        created = []
+        if plano.novos:
+            created = self._trades.create_many(
+                [trade_payload(position_id, item, plano.efeitos[id(item)]) for item in plano.novos]
+            )
+
+        self._replace_checkpoints(
+            plano.checkpoints,
+            self._checkpoints.list_by_position(position_id),
+            acima_de=plano.aplicadas,
+        )
+
+        [payload] = _position_payloads([plano.position], [plano.saldo])
+        atualizada = RendaVariavelPosition.model_validate(payload | {"id": position_id})
+        return self._positions.update_position(position_id, atualizada), created
+
+    def _plan(
+        self,
+        position_id: str,
+        desde: datetime | None,
+        novos: Sequence[Lancamento],
+    ) -> Reconstrucao:
+        position = self._repository.get(position_id)
+        checkpoint = None
+        if desde is not None:
+            checkpoint = self._checkpoints.latest_before(position_id, desde)
+
+        filters: list[tuple[str, str, object]] = [("position_id", "==", position_id)]
+        if checkpoint is not None:
+            filters.append(("data", ">", checkpoint.data))
+        stored = sorted(self._trades.find(filters), key=lambda trade: trade.data)
+        if checkpoint is None:
+            aplicadas = 0
+            inicio = _abertura(position, stored, self._checkpoints.abertura(position_id))
+        else:
+            aplicadas = checkpoint.trades
+            inicio = Saldo(checkpoint.quantidade, checkpoint.total_compra)
+
+        # Sorting is stable: new trades go after the stored trades of their date.
+        lancamentos = sorted([*_lancamentos(stored), *novos], key=lambda item: item.data)
+        result = replay(lancamentos, inicio, aplicadas, self._intervalo)
+
+        checkpoints = _checkpoints(position_id, result.checkpoints)
+        if checkpoint is None:
+            checkpoints.insert(0, _checkpoint(position_id, 0, None, inicio))
+        return Reconstrucao(
+            position=position,
+            stored=stored,
+            novos=list(novos),
+            lancamentos=lancamentos,
+            efeitos={id(item): efeito for item, efeito in zip(lancamentos, result.efeitos)},
+            saldo=result.saldo,
+            checkpoints=checkpoints,
+            aplicadas=aplicadas,
+        )
+
+    def _replace_checkpoints(
+        self,
+        checkpoints: list[RendaVariavelCheckpoint],
+        existing: Iterable[RendaVariavelCheckpoint],
+        acima_de: int = -1,
+    ) -> None:
+        """Store ``checkpoints`` and delete the ``existing`` ones past ``acima_de``
+        trades that were not overwritten."""
+
+        self._checkpoints.save_many(checkpoints)
+        kept = {item.id for item in checkpoints}
+        for stale in existing:
+            if stale.trades > acima_de and stale.id not in kept:
+                self._checkpoints.delete(stale.id)
+
+
+def _abertura(
+    position: RendaVariavelPosition,
+    trades: Sequence[RendaVariavelTrade],
+    stored: RendaVariavelCheckpoint | None,
+) -> Saldo:
+    """Return the holding before ``trades``, undoing them from ``position`` when not stored."""
+
+    if stored is not None:
+        return Saldo(stored.quantidade, stored.total_compra)
+    saldo = Saldo(position.quantidade, position.total_compra)
+    for trade in reversed(trades):
+        saldo = desfazer(saldo, trade)
+    return saldo
+
+
+def _lancamentos(trades: Iterable[RendaVariavelTrade]) -> list[Lancamento]:
+    return [Lancamento.from_trade(trade) for trade in trades]
+
+
+def _checkpoint(
+    position_id: str, trades: int, data: datetime | None, saldo: Saldo
+) -> RendaVariavelCheckpoint:
+    return RendaVariavelCheckpoint(
+        id=RendaVariavelCheckpointsRepository.document_id(position_id, trades),
+        position_id=position_id,
+        trades=trades,
+        data=data,
+        quantidade=saldo.quantidade,
+        preco_medio=saldo.preco_medio,
+        total_compra=saldo.total_compra,
+    )
+
+
+def _checkpoints(
+    position_id: str, reached: Iterable[tuple[int, datetime, Saldo]]
+) -> list[RendaVariavelCheckpoint]:
+    return [_checkpoint(position_id, trades, data, saldo) for trades, data, saldo in reached]
+
+
+def _changed_trades(
+    trades: Sequence[RendaVariavelTrade], efeitos: Sequence[Efeito]
+) -> dict[str, dict[str, object]]:
+    changed: dict[str, dict[str, object]] = {}
+    for trade, efeito in zip(trades, efeitos):
+        stored = (trade.preco_medio_no_ato, trade.resultado_monetario, trade.performance_percentual)
+        if not all(map(_mesmo, stored, efeito)):
+            changed[trade.id] = trade.model_dump(mode="json", exclude={"id"}) | efeito._asdict()
+    return changed
+
+
+def _mesmo(stored: float | None, replayed: float | None) -> bool:
+    # Replayed values may differ from stored ones in the last bits only.
+    if stored is None or replayed is None:
+        return stored is replayed
+    return math.isclose(stored, replayed, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def trade_payload(position_id: str, lancamento: Lancamento, efeito: Efeito) -> dict[str, object]:
+    """Return the document of an unsaved trade replayed with ``efeito``."""
+
+    return {
+        "position_id": position_id,
+        "tipo_operacao": lancamento.tipo_operacao,
+        "data": lancamento.data,
+        "quantidade": lancamento.quantidade,
+        "cotacao": lancamento.cotacao,
+        "total": lancamento.quantidade * lancamento.cotacao,
+        **efeito._asdict(),
+    }
+
+
+def _position_payloads(
+    positions: Sequence[RendaVariavelPosition], saldos: Sequence[Saldo]
+) -> list[dict[str, object]]:
+    """Build the payload of every rebuilt position with one vectorised pass."""
+
+    count = len(positions)
+    columns = PositionColumns(
+        np.fromiter((saldo.quantidade for saldo in saldos), dtype=np.float64, count=count),
+        np.fromiter((saldo.preco_medio for saldo in saldos), dtype=np.float64, count=count),
+        np.fromiter((item.cotacao_atual for item in positions), dtype=np.float64, count=count),
+        tipo_codes((item.tipo for item in positions), count),
+    )
+    derived = columns.metricas()
+    # The replayed cost basis is exact; quantidade * preco_medio may round.
+    total_compra = np.fromiter(
+        (saldo.total_compra for saldo in saldos), dtype=np.float64, count=count
+    )
+    derived["total_compra"] = total_compra
+    derived["resultado_monetario"] = derived["total_mercado"] - total_compra
+
+    agora = datetime.now(timezone.utc).isoformat()
+    return [
+        position.model_dump(mode="json", exclude={"id"})
+        | values
+        | {
+            "quantidade": saldo.quantidade,
+            "preco_medio": saldo.preco_medio,
+            "atualizado_em": agora,
+        }
+        for position, saldo, values in zip(positions, saldos, rows(derived))
+    ]
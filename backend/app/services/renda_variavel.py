@@ -1,17 +1,39 @@
 """Service layer for renda variavel domain operations."""
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime, timezone
-from typing import Iterable
+from typing import Callable, Iterable, Iterator, Mapping, NamedTuple, Sequence, TypeVar
+
+import numpy as np
+from pydantic import ValidationError
 
 from ..models import (
     RendaVariavelPosition,
     RendaVariavelTipo,
     RendaVariavelTrade,
+    Resumo,
 )
 from ..repositories import (
     RendaVariavelPositionsRepository,
     RendaVariavelTradesRepository,
+    ResumosRepository,
+)
+from ..repositories.base import projection_model
+from .analytics import PositionColumns, metricas, pesos, rows, tipo_codes
+from .resumo import RENDA_VARIAVEL, ResumoService
+
+T = TypeVar("T")
+
+#: Fields a quote update writes; the holding itself is left untouched.
+QUOTE_FIELDS = frozenset(
+    {
+        "cotacao_atual",
+        "total_mercado",
+        "resultado_monetario",
+        "performance_percentual",
+        "atualizado_em",
+    }
 )
 
 
@@ -19,60 +41,269 @@ class TradeNotAllowedError(Exception):
     """Raised when a trade cannot be executed with the provided payload."""
 
 
+class Saldo(NamedTuple):
+    """Holding of a position under average-cost rules."""
+
+    quantidade: float = 0.0
+    total_compra: float = 0.0
+
+    @property
+    def preco_medio(self) -> float:
+        return self.total_compra / self.quantidade if self.quantidade > 0 else 0.0
+
+
+class Efeito(NamedTuple):
+    """Fields a trade stores about the holding it was applied to."""
+
+    preco_medio_no_ato: float
+    resultado_monetario: float | None
+    performance_percentual: float | None
+
+
+def aplicar(saldo: Saldo, tipo_operacao: str, quantidade: float, cotacao: float) -> tuple[Saldo, Efeito]:
+    """Apply one trade to ``saldo`` and return the new holding and the trade's fields.
+
+    Buys add to the cost basis; sells keep the average price and realise
+    the difference to it.
+    """
+
+    if quantidade <= 0 or cotacao <= 0:
+        raise TradeNotAllowedError("quantidade e cotacao devem ser maiores que zero")
+
+    if tipo_operacao == "compra":
+        novo = Saldo(saldo.quantidade + quantidade, saldo.total_compra + quantidade * cotacao)
+        return novo, Efeito(novo.preco_medio, None, None)
+    if tipo_operacao != "venda":
+        raise TradeNotAllowedError("tipo de transacao invalido")
+
+    if quantidade > saldo.quantidade:
+        raise TradeNotAllowedError("quantidade vendida excede a quantidade em carteira")
+    preco_medio = saldo.preco_medio
+    restante = saldo.quantidade - quantidade
+    performance = (cotacao / preco_medio - 1) * 100 if preco_medio > 0 else None
+    return (
+        Saldo(restante, preco_medio * restante),
+        Efeito(preco_medio, (cotacao - preco_medio) * quantidade, performance),
+    )
+
+
 class RendaVariavelService:
-    """Expose read helpers around renda variavel positions."""
+    """Expose read helpers around renda variavel positions.
+
+    ``peso_percentual`` is derived when positions are read, from their
+    ``total_mercado`` and the total of their tipo. Listings of a whole tipo
+    sum the positions they return; single positions and pages use the
+    per-tipo totals of the renda variavel summary (see ``ResumoService``),
+    which every write adjusts by its delta. A write therefore touches its
+    own position and one summary document instead of every position of
+    the tipo. Without ``resumos_repository`` the total is summed from the
+    tipo's positions.
+    """
 
     def __init__(
         self,
         repository: RendaVariavelPositionsRepository,
         trades_repository: RendaVariavelTradesRepository | None = None,
+        resumos_repository: ResumosRepository | None = None,
     ) -> None:
         self._repository = repository
         self._trades_repository = trades_repository
+        self._resumos = (
+            ResumoService(resumos_repository, {RENDA_VARIAVEL: self.list_positions})
+            if resumos_repository is not None
+            else None
+        )
+
+    def list_positions(self, fields: Sequence[str] | None = None) -> list[RendaVariavelPosition]:
+        """Return every stored renda variavel position, skipping corrupt docs.
 
-    def list_positions(self) -> list[RendaVariavelPosition]:
-        """Return every stored renda variavel position, skipping corrupt docs."""
+        ``fields`` reads only those attributes; corrupt-document recovery
+        still returns full positions.
+        """
 
         try:
-            return self._repository.list()
-        except Exception:
-            positions: list[RendaVariavelPosition] = []
+            positions = self._repository.list(fields=_read_fields(fields, "tipo"))
+        except ValidationError:
             raw_documents: list[dict[str, object]] = []
             if hasattr(self._repository, "list_raw_documents"):
                 raw_documents = self._repository.list_raw_documents()
-            for raw in raw_documents:
-                try:
-                    positions.append(RendaVariavelPosition.model_validate(raw))
-                except Exception:  # pragma: no cover - skip corrupt entries
-                    continue
-            return positions
-
-    def list_positions_by_tipo(self, tipo: RendaVariavelTipo) -> list[RendaVariavelPosition]:
+            return _with_pesos(_valid_positions(raw_documents), None)
+        return _with_pesos(positions, fields)
+
+    def list_positions_by_tipo(
+        self,
+        tipo: RendaVariavelTipo,
+        fields: Sequence[str] | None = None,
+    ) -> list[RendaVariavelPosition]:
         """Return only positions belonging to the provided tipo."""
-        return [item for item in self.list_positions() if item.tipo is tipo]
+
+        try:
+            positions = self._repository.list_by_tipo(tipo, fields=_read_fields(fields))
+        except ValidationError:
+            return [item for item in self.list_positions() if item.tipo is tipo]
+        return _with_pesos(positions, fields)
+
+    async def alist_positions_by_tipo(
+        self,
+        tipo: RendaVariavelTipo,
+        fields: Sequence[str] | None = None,
+    ) -> list[RendaVariavelPosition]:
+        """Async variant of ``list_positions_by_tipo``."""
+
+        try:
+            positions = await self._repository.alist_by_tipo(tipo, fields=_read_fields(fields))
+        except ValidationError:
+            raw_documents: list[dict[str, object]] = []
+            if hasattr(self._repository, "alist_raw_documents"):
+                raw_documents = await self._repository.alist_raw_documents()
+            positions = _valid_positions(raw_documents)
+            return _with_pesos([item for item in positions if item.tipo is tipo], None)
+        return _with_pesos(positions, fields)
+
+    def list_positions_page(
+        self,
+        tipo: RendaVariavelTipo,
+        limit: int,
+        cursor: str | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> tuple[list[RendaVariavelPosition], str | None]:
+        """Return one page of positions of the tipo and the cursor for the next.
+
+        Corrupt documents are skipped, so such a page may hold fewer than
+        ``limit`` positions; recovered pages return full positions.
+        """
+
+        try:
+            positions, next_cursor = self._repository.list_page(
+                limit, cursor, [("tipo", "==", tipo.value)], fields=_read_fields(fields)
+            )
+        except ValidationError:
+            raw_documents: list[dict[str, object]] = []
+            next_cursor = None
+            if hasattr(self._repository, "list_raw_page"):
+                raw_documents, next_cursor = self._repository.list_raw_page(tipo, limit, cursor)
+            positions = _valid_positions(raw_documents)
+            return _with_pesos(positions, None, self._total_mercado(tipo)), next_cursor
+        if fields is None or "peso_percentual" in fields:
+            positions = _with_pesos(positions, fields, self._total_mercado(tipo))
+        return positions, next_cursor
 
     def list_positions_grouped(
-        self, tipos: Iterable[RendaVariavelTipo]
+        self,
+        tipos: Iterable[RendaVariavelTipo],
+        fields: Sequence[str] | None = None,
     ) -> dict[RendaVariavelTipo, list[RendaVariavelPosition]]:
-        """Group positions by the provided tipos preserving the iteration order."""
+        """Group positions by the provided tipos preserving the iteration order.
+
+        ``tipo`` is always read, even when ``fields`` leaves it out.
+        """
         tipos_tuple = tuple(tipos)
         filtered: dict[RendaVariavelTipo, list[RendaVariavelPosition]] = {
             tipo: [] for tipo in tipos_tuple
         }
 
-        all_positions = self.list_positions()
+        if fields is not None and "tipo" not in fields:
+            fields = [*fields, "tipo"]
+        all_positions = self.list_positions(fields)
         for position in all_positions:
             if position.tipo in filtered:
                 filtered[position.tipo].append(position)
 
         return filtered
 
+    async def alist_positions_grouped(
+        self,
+        tipos: Iterable[RendaVariavelTipo],
+        fields: Sequence[str] | None = None,
+    ) -> dict[RendaVariavelTipo, list[RendaVariavelPosition]]:
+        """Group positions by tipo, querying every tipo concurrently."""
+
+        tipos_tuple = tuple(dict.fromkeys(tipos))
+        results = await asyncio.gather(
+            *(self.alist_positions_by_tipo(tipo, fields=fields) for tipo in tipos_tuple)
+        )
+        return dict(zip(tipos_tuple, results))
+
     def list_trades(self, position_id: str) -> list[RendaVariavelTrade]:
         """Return trades recorded for a given position."""
 
         trades_repo = self._ensure_trades_repository()
         return trades_repo.list_by_position(position_id)
 
+    async def alist_trades(self, position_id: str) -> list[RendaVariavelTrade]:
+        """Async variant of ``list_trades``."""
+
+        trades_repo = self._ensure_trades_repository()
+        return await trades_repo.alist_by_position(position_id)
+
+    def iter_trades(
+        self,
+        *,
+        inicio: datetime | None = None,
+        fim: datetime | None = None,
+        position_ids: set[str] | None = None,
+    ) -> Iterator[RendaVariavelTrade]:
+        """Stream trades ordered by date, optionally bounded to ``[inicio, fim)``.
+
+        ``position_ids`` restricts the stream to trades of those positions.
+        """
+
+        trades_repo = self._ensure_trades_repository()
+        filters: list[tuple[str, str, object]] = []
+        if inicio is not None:
+            filters.append(("data", ">=", inicio))
+        if fim is not None:
+            filters.append(("data", "<", fim))
+
+        for trade in trades_repo.iter(filters, order_by="data"):
+            if position_ids is None or trade.position_id in position_ids:
+                yield trade
+
+    def list_trades_page(
+        self, position_id: str, limit: int, cursor: str | None = None
+    ) -> tuple[list[RendaVariavelTrade], str | None]:
+        """Return one page of a position's trades, newest first."""
+
+        trades_repo = self._ensure_trades_repository()
+        return trades_repo.list_page(
+            limit,
+            cursor,
+            [("position_id", "==", position_id)],
+            order_by="data",
+            descending=True,
+        )
+
+    def create_position(self, position: RendaVariavelPosition) -> RendaVariavelPosition:
+        """Persist a new position and add it to the summary."""
+
+        resumo, totals = self._apply_change(None, position)
+        payload = position.model_dump(mode="json", exclude_none=True)
+        payload["peso_percentual"] = _peso(position.total_mercado, totals[position.tipo])
+        created = self._repository.create(payload)
+        self._save(resumo)
+        return created
+
+    def update_position(
+        self, position_id: str, position: RendaVariavelPosition
+    ) -> RendaVariavelPosition:
+        """Replace a position and apply the difference to the summary."""
+
+        previous = self._repository.get(position_id)
+        resumo, totals = self._apply_change(previous, position)
+        payload = position.model_dump(mode="json", exclude_none=True, exclude={"id"})
+        payload["peso_percentual"] = _peso(position.total_mercado, totals[position.tipo])
+        updated = self._repository.update(position_id, payload)
+        self._save(resumo)
+        return updated
+
+    def delete_position(self, position_id: str) -> None:
+        """Remove a position and subtract it from the summary."""
+
+        previous = self._repository.get(position_id)
+        resumo, _ = self._apply_change(previous, None)
+        self._repository.delete(position_id)
+        self._save(resumo)
+
     def record_trade(
         self,
         position_id: str,
@@ -89,58 +320,43 @@ class RendaVariavelService:
 
         quantidade = float(quantidade)
         cotacao = float(cotacao)
-        if quantidade <= 0 or cotacao <= 0:
-            raise TradeNotAllowedError("quantidade e cotacao devem ser maiores que zero")
-
-        previous_quantidade = float(position.quantidade)
-        previous_preco_medio = float(position.preco_medio)
-        previous_total_compra = float(position.total_compra)
-
         tipo_operacao = tipo_operacao.lower()
-        if tipo_operacao not in {"compra", "venda"}:
-            raise TradeNotAllowedError("tipo de transacao invalido")
-
-        if tipo_operacao == "compra":
-            nova_quantidade = previous_quantidade + quantidade
-            novo_total_compra = previous_total_compra + quantidade * cotacao
-        else:
-            if quantidade > previous_quantidade:
-                raise TradeNotAllowedError("quantidade vendida excede a quantidade em carteira")
-            nova_quantidade = previous_quantidade - quantidade
-            novo_total_compra = previous_preco_medio * nova_quantidade
-
-        if nova_quantidade > 0:
-            novo_preco_medio = novo_total_compra / nova_quantidade
-        else:
-            novo_preco_medio = 0.0
-
-        novo_total_mercado = nova_quantidade * cotacao
-        novo_resultado = novo_total_mercado - novo_total_compra
-        if novo_preco_medio > 0:
-            nova_performance = (cotacao / novo_preco_medio - 1) * 100
-        else:
-            nova_performance = 0.0
-
+        saldo, efeito = aplicar(
+            Saldo(float(position.quantidade), float(position.total_compra)),
+            tipo_operacao,
+            quantidade,
+            cotacao,
+        )
+
+        derived = metricas(saldo.quantidade, saldo.preco_medio, cotacao)
+        novo_total_mercado = float(derived["total_mercado"])
+
+        resumo, totals = self._apply_change(
+            position,
+            position.model_copy(
+                update={"total_mercado": novo_total_mercado, "total_compra": saldo.total_compra}
+            ),
+        )
         agora = datetime.now(timezone.utc)
 
         update_payload = {
             "ticker": position.ticker,
             "tipo": position.tipo,
-            "quantidade": nova_quantidade,
-            "preco_medio": novo_preco_medio,
+            "quantidade": saldo.quantidade,
+            "preco_medio": saldo.preco_medio,
             "cotacao_atual": cotacao,
-            "total_compra": novo_total_compra,
+            "total_compra": saldo.total_compra,
             "total_mercado": novo_total_mercado,
-            "resultado_monetario": novo_resultado,
-            "performance_percentual": nova_performance,
+            "resultado_monetario": novo_total_mercado - saldo.total_compra,
+            "performance_percentual": float(derived["performance_percentual"]),
             "peso_desejado_percentual": position.peso_desejado_percentual,
-            "peso_percentual": position.peso_percentual,
+            "peso_percentual": _peso(novo_total_mercado, totals[position.tipo]),
             "atualizado_em": agora,
         }
 
         updated_position = self._repository.update(position_id, update_payload)
+        self._save(resumo)
 
-        # Persist trade metadata
         trade_payload: dict[str, object] = {
             "position_id": position_id,
             "tipo_operacao": tipo_operacao,
@@ -148,27 +364,12 @@ class RendaVariavelService:
             "quantidade": quantidade,
             "cotacao": cotacao,
             "total": quantidade * cotacao,
-            "preco_medio_no_ato": (
-                previous_preco_medio if tipo_operacao == "venda" else novo_preco_medio
-            ),
+            **efeito._asdict(),
         }
 
-        if tipo_operacao == "venda":
-            resultado = (cotacao - previous_preco_medio) * quantidade
-            trade_payload["resultado_monetario"] = resultado
-            if previous_preco_medio > 0:
-                trade_payload["performance_percentual"] = (cotacao / previous_preco_medio - 1) * 100
-        else:
-            trade_payload["resultado_monetario"] = None
-            trade_payload["performance_percentual"] = None
-
         recorded_trade = trades_repo.create(trade_payload)
 
-        # Recalculate weights using the fresh repository state
-        self.recalculate_pesos(updated_position.tipo)
-        refreshed_position = self._repository.get(position_id)
-
-        return refreshed_position, recorded_trade
+        return updated_position, recorded_trade
 
     def _ensure_trades_repository(self) -> RendaVariavelTradesRepository:
         if self._trades_repository is None:
@@ -176,39 +377,200 @@ class RendaVariavelService:
         return self._trades_repository
 
     def recalculate_pesos(self, tipo: RendaVariavelTipo) -> list[RendaVariavelPosition]:
-        """Recalculate peso_percentual for all positions of the given tipo."""
+        """Rebuild the renda variavel summary from the stored positions.
+
+        Repairs drift left by concurrent writes; returns the positions of
+        ``tipo`` with their derived peso_percentual.
+        """
+
+        self.rebuild_resumo()
+        return self.list_positions_by_tipo(tipo)
+
+    def apply_changes(
+        self,
+        changes: Sequence[tuple[RendaVariavelPosition | None, RendaVariavelPosition]],
+        write: Callable[[], T],
+    ) -> T:
+        """Run ``write``, which persists ``changes`` in bulk, and apply them to
+        the summary with one read and one write."""
+
+        resumo = None
+        if self._resumos is not None and changes:
+            resumo = self._resumos.with_deltas(RENDA_VARIAVEL, changes)
+        result = write()
+        self._save(resumo)
+        return result
+
+    def update_quotes(
+        self,
+        cotacoes: Mapping[str, float],
+        positions: Sequence[RendaVariavelPosition] | None = None,
+    ) -> dict[str, object]:
+        """Set ``cotacao_atual`` of every position whose ticker is in ``cotacoes``.
+
+        Tickers match case-insensitively. Derived totals are recomputed for
+        all matching positions in one vectorised pass and only positions
+        whose quote changed are written, in one batch of partial updates of
+        the quote fields (``QUOTE_FIELDS``), so a trade recorded since the
+        positions were read is kept and a position deleted meanwhile is not
+        recreated. The summary the pesos derive from is
+        updated once. Callers pushing quotes in several batches may pass
+        the ``positions`` they just loaded to skip the read.
+        """
+
+        por_ticker = {ticker.upper(): float(cotacao) for ticker, cotacao in cotacoes.items()}
+        if positions is None:
+            positions = self._repository.list()
+        matched = [position for position in positions if position.ticker.upper() in por_ticker]
+        encontrados = {position.ticker.upper() for position in matched}
+        nao_encontrados = sorted(ticker for ticker in por_ticker if ticker not in encontrados)
+
+        columns = PositionColumns.from_positions(matched)
+        novas = np.fromiter(
+            (por_ticker[position.ticker.upper()] for position in matched),
+            dtype=np.float64,
+            count=len(matched),
+        )
+        changed = np.flatnonzero(novas != columns.cotacao_atual)
+        columns.cotacao_atual = novas
+        derived = {name: column[changed] for name, column in columns.metricas().items()}
+        derived["cotacao_atual"] = novas[changed]
+
+        agora = datetime.now(timezone.utc)
+        changes = [
+            (
+                matched[index],
+                matched[index].model_copy(update={**values, "atualizado_em": agora}),
+            )
+            for index, values in zip(changed.tolist(), rows(derived))
+        ]
+
+        def write() -> list[str]:
+            return self._repository.update_fields_many(
+                {
+                    after.id: after.model_dump(mode="json", include=QUOTE_FIELDS)
+                    for _, after in changes
+                }
+            )
+
+        removidas = self.apply_changes(changes, write) if changes else []
+        if removidas:
+            # Deleted after being read: the delta counted them, so recount.
+            self.rebuild_resumo()
+
+        return {
+            "atualizadas": len(changes) - len(removidas),
+            "inalteradas": len(matched) - len(changes),
+            "nao_encontradas": nao_encontrados,
+        }
+
+    def rebuild_resumo(self) -> None:
+        """Recompute the renda variavel summary after bulk writes."""
+
+        if self._resumos is not None:
+            self._resumos.save(self._resumos.rebuild(RENDA_VARIAVEL))
+
+    def _total_mercado(self, tipo: RendaVariavelTipo) -> float:
+        if self._resumos is not None:
+            return _total_do_tipo(self._resumos.get(RENDA_VARIAVEL), tipo)
+        positions = self.list_positions_by_tipo(tipo, fields=["total_mercado"])
+        return sum(item.total_mercado for item in positions)
+
+    def _apply_change(
+        self,
+        before: RendaVariavelPosition | None,
+        after: RendaVariavelPosition | None,
+    ) -> tuple[Resumo | None, dict[RendaVariavelTipo, float]]:
+        """Return the summary with ``before`` replaced by ``after`` and the
+        resulting total_mercado of the tipos involved.
+
+        Must run before the change is persisted.
+        """
+
+        tipos = {item.tipo for item in (before, after) if item is not None}
+        if self._resumos is not None:
+            resumo = self._resumos.with_delta(RENDA_VARIAVEL, before, after)
+            return resumo, {tipo: _total_do_tipo(resumo, tipo) for tipo in tipos}
+
+        totals = {tipo: self._total_mercado(tipo) for tipo in tipos}
+        if before is not None:
+            totals[before.tipo] -= before.total_mercado
+        if after is not None:
+            totals[after.tipo] += after.total_mercado
+        return None, totals
+
+    def _save(self, resumo: Resumo | None) -> None:
+        if self._resumos is not None and resumo is not None:
+            self._resumos.save(resumo)
 
+
+def _total_do_tipo(resumo: Resumo, tipo: RendaVariavelTipo) -> float:
+    grupo = resumo.grupos.get("tipo", {}).get(tipo.value)
+    if grupo is None:
+        return 0.0
+    # Clamp rounding drift so the total stays a valid denominator.
+    return max(grupo.totais.get("total_mercado", 0.0), 0.0)
+
+
+def _peso(total_mercado: float, total: float) -> float:
+    return float(pesos(total_mercado, total=total))
+
+
+def _read_fields(fields: Sequence[str] | None, *extra: str) -> list[str] | None:
+    """Add the fields ``_with_pesos`` needs when ``peso_percentual`` is requested."""
+
+    if fields is None or "peso_percentual" not in fields:
+        return None if fields is None else list(fields)
+    return list(dict.fromkeys([*fields, "total_mercado", *extra]))
+
+
+def _valid_positions(raw_documents: Iterable[Mapping[str, object]]) -> list[RendaVariavelPosition]:
+    # One corrupt document fails a trusted bulk read as a whole; validating
+    # documents one at a time keeps the healthy ones.
+    positions = []
+    for raw in raw_documents:
         try:
-            positions = [item for item in self.list_positions() if item.tipo is tipo]
-        except Exception:
-            positions = []
-            raw_documents = []
-            if hasattr(self._repository, "list_raw_documents"):
-                raw_documents = self._repository.list_raw_documents()
-            for raw in raw_documents:
-                try:
-                    position = RendaVariavelPosition.model_validate(raw)
-                except Exception:  # pragma: no cover - defensive for corrupt docs
-                    continue
-                if position.tipo is tipo:
-                    positions.append(position)
-        if not positions:
-            return []
-
-        total_mercado = sum(max(item.total_mercado or 0.0, 0.0) for item in positions)
-        recalculated: list[RendaVariavelPosition] = []
-
-        for position in positions:
-            if position.id is None:
-                continue
-
-            novo_peso = 0.0
-            if total_mercado > 0:
-                novo_peso = (position.total_mercado or 0.0) / total_mercado * 100
-
-            payload = position.model_dump(mode="json", exclude_none=True, exclude={"id"})
-            payload["peso_percentual"] = novo_peso
-            updated = self._repository.update(position.id, payload)
-            recalculated.append(updated)
-
-        return recalculated
+            positions.append(RendaVariavelPosition.model_validate(raw))
+        except ValidationError:  # pragma: no cover - skip corrupt entries
+            continue
+    return positions
+
+
+def _with_pesos(
+    positions: list[RendaVariavelPosition],
+    fields: Sequence[str] | None,
+    total: float | None = None,
+) -> list[RendaVariavelPosition]:
+    """Derive ``peso_percentual`` and drop fields read only to compute it.
+
+    Without ``total`` each tipo's total is summed from ``positions``, which
+    must then hold every position of their tipos.
+    """
+
+    if fields is not None and "peso_percentual" not in fields:
+        return positions
+
+    total_mercado = np.fromiter(
+        (item.total_mercado for item in positions), dtype=np.float64, count=len(positions)
+    )
+    if total is None:
+        codes = tipo_codes((getattr(item, "tipo", None) for item in positions), len(positions))
+        derived_pesos = pesos(total_mercado, codes)
+    else:
+        derived_pesos = pesos(total_mercado, total=total)
+
+    derived = [
+        item.model_copy(update={"peso_percentual": peso})
+        for item, peso in zip(positions, derived_pesos.tolist())
+    ]
+    if fields is None:
+        return derived
+
+    output = projection_model(RendaVariavelPosition, tuple(sorted(fields)))
+    keep = {*fields, "id"}
+    return [
+        item
+        if type(item) is output
+        else output.model_construct(**item.model_dump(include=keep))
+        for item in derived
+    ]
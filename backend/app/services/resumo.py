@@ -0,0 +1,167 @@
+"""Service keeping materialised per-dominio summaries up to date."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Iterator, Mapping
+
+from ..models import Passivo, RendaFixaPosition, RendaVariavelPosition, Resumo, ResumoGrupo
+from ..repositories import DocumentNotFoundError, ResumosRepository
+
+PASSIVOS = "passivos"
+RENDA_FIXA = "renda_fixa"
+RENDA_VARIAVEL = "renda_variavel"
+
+_Contribuicao = tuple[str, str, dict[str, float]]
+
+
+def _contribuicoes_renda_variavel(position: RendaVariavelPosition) -> Iterator[_Contribuicao]:
+    totais = {"total_mercado": position.total_mercado, "total_compra": position.total_compra}
+    yield "tipo", position.tipo.value, totais
+    yield "moeda", position.tipo.moeda.value, totais
+
+
+def _contribuicoes_renda_fixa(position: RendaFixaPosition) -> Iterator[_Contribuicao]:
+    totais = {"valor": position.valor}
+    yield "tipo", position.tipo.value, totais
+    yield "indexador", position.indexador.value, totais
+    yield "moeda", position.moeda.lower(), totais
+
+
+def _contribuicoes_passivos(passivo: Passivo) -> Iterator[_Contribuicao]:
+    yield "categoria", passivo.categoria.value, {"saldo_atual": passivo.saldo_atual}
+
+
+_CONTRIBUICOES: dict[str, Callable[[Any], Iterable[_Contribuicao]]] = {
+    RENDA_VARIAVEL: _contribuicoes_renda_variavel,
+    RENDA_FIXA: _contribuicoes_renda_fixa,
+    PASSIVOS: _contribuicoes_passivos,
+}
+
+#: Dominios with a summary document, in the order the endpoint lists them.
+DOMINIOS = tuple(_CONTRIBUICOES)
+
+
+class ResumoService:
+    """Maintain one summary document per dominio with deltas.
+
+    Write paths call ``with_delta`` before persisting a change and ``save``
+    once it is persisted, so reading a summary costs a single document
+    read whatever the size of the portfolio. ``save`` re-applies the
+    changes to the stored summary in one atomic read-modify-write, so
+    concurrent writers never lose each other's deltas. A missing summary
+    is rebuilt from ``loaders[dominio]``, a callable returning every
+    document of the dominio, the first time it is needed.
+    """
+
+    def __init__(
+        self,
+        repository: ResumosRepository,
+        loaders: Mapping[str, Callable[[], Iterable[Any]]],
+    ) -> None:
+        self._repository = repository
+        self._loaders = loaders
+
+    def get(self, dominio: str) -> Resumo:
+        """Return the summary of ``dominio``, rebuilding it when missing."""
+
+        try:
+            return self._repository.get(dominio)
+        except DocumentNotFoundError:
+            return self.rebuild(dominio)
+
+    def list(self) -> list[Resumo]:
+        """Return every summary, storing the ones that had to be rebuilt."""
+
+        found = self._repository.get_many(DOMINIOS)
+        rebuilt = [self.rebuild(dominio) for dominio in DOMINIOS if dominio not in found]
+        if rebuilt:
+            self.save(*rebuilt)
+        by_dominio = {**found, **{resumo.dominio: resumo for resumo in rebuilt}}
+        return [by_dominio[dominio] for dominio in DOMINIOS]
+
+    def rebuild(self, dominio: str) -> Resumo:
+        """Compute the summary of ``dominio`` from all of its documents."""
+
+        resumo = Resumo(id=dominio, dominio=dominio)
+        for item in self._loaders[dominio]():
+            _apply(resumo, item, 1)
+        return resumo
+
+    def with_delta(self, dominio: str, before: Any | None, after: Any | None) -> Resumo:
+        """Return the summary with document ``before`` replaced by ``after``.
+
+        Pass ``before=None`` for a create and ``after=None`` for a delete.
+        Call it before persisting the change: a missing summary is rebuilt
+        from the stored documents, which must not include it yet.
+        """
+
+        return self.with_deltas(dominio, [(before, after)])
+
+    def with_deltas(
+        self, dominio: str, changes: Iterable[tuple[Any | None, Any | None]]
+    ) -> Resumo:
+        """Apply several ``(before, after)`` changes with one summary read."""
+
+        resumo = self.get(dominio)
+        changes = list(changes)
+        _apply_changes(resumo, changes)
+        resumo.mudancas.extend(changes)
+        return resumo
+
+    def save(self, *resumos: Resumo) -> None:
+        """Persist summaries.
+
+        Summaries returned by ``with_deltas`` have their changes applied to
+        the stored document atomically, one dominio at a time; rebuilt
+        summaries replace the stored ones with a single batched write.
+        """
+
+        agora = datetime.now(timezone.utc)
+        rebuilt = [resumo for resumo in resumos if not resumo.mudancas]
+        if rebuilt:
+            self._repository.save_many(
+                [resumo.model_copy(update={"atualizado_em": agora}) for resumo in rebuilt]
+            )
+        for resumo in resumos:
+            if resumo.mudancas:
+                self._repository.transform(resumo.dominio, _reapply(resumo, agora))
+                resumo.mudancas.clear()
+
+
+def _reapply(resumo: Resumo, agora: datetime) -> Callable[[Resumo | None], Resumo]:
+    # The transform may run after ``save`` returned (at the unit of work's commit).
+    rebuilt = resumo.model_copy(update={"atualizado_em": agora})
+    changes = list(resumo.mudancas)
+    # ``model_copy`` keeps the private state; the changes are already in ``rebuilt``.
+    rebuilt._mudancas = []
+
+    def transform(current: Resumo | None) -> Resumo:
+        if current is None:
+            # Still missing: ``resumo`` was rebuilt with the changes applied.
+            return rebuilt
+        _apply_changes(current, changes)
+        current.atualizado_em = agora
+        return current
+
+    return transform
+
+
+def _apply_changes(resumo: Resumo, changes: Iterable[tuple[Any | None, Any | None]]) -> None:
+    for before, after in changes:
+        if before is not None:
+            _apply(resumo, before, -1)
+        if after is not None:
+            _apply(resumo, after, 1)
+
+
+def _apply(resumo: Resumo, item: Any, sign: int) -> None:
+    for dimensao, chave, totais in _CONTRIBUICOES[resumo.dominio](item):
+        grupos = resumo.grupos.setdefault(dimensao, {})
+        grupo = grupos.setdefault(chave, ResumoGrupo())
+        grupo.quantidade += sign
+        if grupo.quantidade <= 0:
+            # Dropping empty groups also discards accumulated rounding drift.
+            del grupos[chave]
+            continue
+        for nome, valor in totais.items():
+            grupo.totais[nome] = grupo.totais.get(nome, 0.0) + sign * valor
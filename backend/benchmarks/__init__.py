@@ -0,0 +1 @@
+"""Micro-benchmarks for the backend, run as ``python -m benchmarks.<name>``."""
@@ -0,0 +1,66 @@
+"""Compare per-position Python arithmetic with the vectorised analytics.
+
+Run from ``backend/`` with ``python -m benchmarks.analytics [count]``.
+Both variants derive totals, performance and per-tipo pesos of already
+hydrated positions; "vectorised columns" stops before building one update
+payload per position, which is where the remaining time goes.
+"""
+from __future__ import annotations
+
+import statistics
+import sys
+
+from app.models import RendaVariavelPosition
+from app.services.analytics import recompute, rows
+
+from .trusted_reads import REPEAT, _documents, _timings
+
+
+def _scalar(positions: list[RendaVariavelPosition]) -> list[dict[str, float]]:
+    totals: dict[object, float] = {}
+    for item in positions:
+        totals[item.tipo] = totals.get(item.tipo, 0.0) + item.quantidade * item.cotacao_atual
+
+    updated = []
+    for item in positions:
+        total_compra = item.quantidade * item.preco_medio
+        total_mercado = item.quantidade * item.cotacao_atual
+        performance = 0.0
+        if item.preco_medio:
+            performance = (item.cotacao_atual / item.preco_medio - 1) * 100
+        total = totals[item.tipo]
+        updated.append(
+            {
+                "total_compra": total_compra,
+                "total_mercado": total_mercado,
+                "resultado_monetario": total_mercado - total_compra,
+                "performance_percentual": performance,
+                "peso_percentual": total_mercado / total * 100 if total > 0 else 0.0,
+            }
+        )
+    return updated
+
+
+def main(count: int = 10_000) -> None:
+    positions = [RendaVariavelPosition.model_validate(data) for data in _documents(count)]
+    assert _scalar(positions) == rows(recompute(positions))
+
+    timings = _timings(
+        {
+            "scalar loop": lambda: _scalar(positions),
+            "vectorised payloads": lambda: rows(recompute(positions)),
+            "vectorised columns": lambda: recompute(positions),
+        }
+    )
+    baseline = statistics.median(timings["scalar loop"])
+    print(f"{count} positions, median / best of {REPEAT} runs")
+    for name, runs in timings.items():
+        median = statistics.median(runs)
+        print(
+            f"  {name:28s} {median * 1000:7.1f} ms / {min(runs) * 1000:7.1f} ms"
+            f"  ({baseline / median:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
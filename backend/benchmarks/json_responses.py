@@ -0,0 +1,47 @@
+"""Compare ``model_dump`` + stdlib ``jsonify`` with direct-to-bytes responses.
+
+Run from ``backend/`` with ``python -m benchmarks.json_responses [count]``.
+Only serialisation of an already hydrated list is measured.
+"""
+from __future__ import annotations
+
+import statistics
+import sys
+
+from flask import Flask, jsonify
+
+from app.models import RendaVariavelPosition
+from app.routes.responses import PydanticJSONProvider, json_response
+
+from .trusted_reads import REPEAT, _documents, _timings
+
+
+def main(count: int = 10_000) -> None:
+    items = [RendaVariavelPosition.model_validate(data) for data in _documents(count)]
+    stdlib_app = Flask(__name__)
+    pydantic_app = Flask(__name__)
+    pydantic_app.json = PydanticJSONProvider(pydantic_app)
+
+    def stdlib() -> bytes:
+        with stdlib_app.app_context():
+            return jsonify({"items": [item.model_dump(mode="json") for item in items]}).get_data()
+
+    def direct() -> bytes:
+        with pydantic_app.app_context():
+            return json_response({"items": items}).get_data()
+
+    assert stdlib_app.json.loads(stdlib()) == pydantic_app.json.loads(direct())
+
+    timings = _timings({"model_dump + jsonify": stdlib, "json_response": direct})
+    baseline = statistics.median(timings["model_dump + jsonify"])
+    print(f"{count} positions, median / best of {REPEAT} runs")
+    for name, runs in timings.items():
+        median = statistics.median(runs)
+        print(
+            f"  {name:28s} {median * 1000:7.1f} ms / {min(runs) * 1000:7.1f} ms"
+            f"  ({baseline / median:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
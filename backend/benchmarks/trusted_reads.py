@@ -0,0 +1,96 @@
+"""Compare per-document validation with trusted bulk hydration.
+
+Run from ``backend/`` with ``python -m benchmarks.trusted_reads [count]``.
+The gateway serves pre-built documents so only hydration is measured.
+"""
+from __future__ import annotations
+
+import gc
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Mapping, Sequence
+
+from app.models import RendaVariavelPosition, RendaVariavelTipo
+from app.repositories import RendaVariavelPositionsRepository
+from app.repositories.interfaces import FirestoreGatewayProtocol
+
+
+class _StaticGateway(FirestoreGatewayProtocol):
+    def __init__(self, documents: list[dict[str, Any]]) -> None:
+        self._documents = documents
+
+    def list_documents(
+        self,
+        collection: str,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        return self._documents
+
+
+class _ValidatingRepository(RendaVariavelPositionsRepository):
+    TRUSTED_READS = False
+
+
+def _documents(count: int) -> list[dict[str, Any]]:
+    tipos = list(RendaVariavelTipo)
+    return [
+        RendaVariavelPosition(
+            id=f"position-{index}",
+            ticker=f"TICK{index}",
+            tipo=tipos[index % len(tipos)],
+            quantidade=10,
+            preco_medio=10.0,
+            cotacao_atual=12.0,
+            total_compra=100.0,
+            total_mercado=120.0,
+            resultado_monetario=20.0,
+            performance_percentual=20.0,
+            peso_percentual=1.0,
+            peso_desejado_percentual=1.0,
+            atualizado_em=datetime(2024, 1, 1, 12, 0, 0),
+        ).model_dump(mode="json")
+        for index in range(count)
+    ]
+
+
+REPEAT = 30
+
+
+def _timings(functions: dict[str, Callable[[], object]]) -> dict[str, list[float]]:
+    # Runs are interleaved so machine noise hits every variant alike.
+    timings: dict[str, list[float]] = {name: [] for name in functions}
+    for _ in range(REPEAT):
+        for name, function in functions.items():
+            gc.collect()
+            started = time.perf_counter()
+            function()
+            timings[name].append(time.perf_counter() - started)
+    return timings
+
+
+def main(count: int = 10_000) -> None:
+    gateway = _StaticGateway(_documents(count))
+    validating = _ValidatingRepository(gateway)
+    trusted = RendaVariavelPositionsRepository(gateway)
+    assert validating.list() == trusted.list()
+
+    timings = _timings(
+        {
+            "model_validate per document": validating.list,
+            "trusted bulk hydration": trusted.list,
+        }
+    )
+    baseline = statistics.median(timings["model_validate per document"])
+    print(f"{count} positions, median / best of {REPEAT} runs")
+    for name, runs in timings.items():
+        median = statistics.median(runs)
+        print(
+            f"  {name:28s} {median * 1000:7.1f} ms / {min(runs) * 1000:7.1f} ms"
+            f"  ({baseline / median:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -1,14 +1,20 @@
 """Tests for Firestore repositories and gateway abstractions."""
 from __future__ import annotations
 
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Mapping
+from typing import Any, Mapping, Sequence
 from uuid import uuid4
 from unittest import mock
 
 import pytest
 from google.api_core import exceptions as google_exceptions
+from pydantic import ValidationError
 
+from app import create_app
 from app.models import (
     Passivo,
     PassivoCategoria,
@@ -16,14 +22,27 @@ from app.models import (
     RendaVariavelTipo,
 )
 from app.repositories import (
+    AsyncFirestoreGateway,
+    AsyncGatewayAdapter,
+    CachingGateway,
+    CollectionVersions,
     DocumentNotFoundError,
+    GatewayMetrics,
+    InstrumentedGateway,
     PassivosRepository,
     PersistenceLayerError,
     RendaVariavelPositionsRepository,
+    RendaVariavelTradesRepository,
+    RepositoryError,
+    SqliteGateway,
+    UnitOfWork,
+    VersionedGateway,
 )
 from app.repositories.firestore_gateway import FirestoreGateway
 from app.repositories.tinydb_gateway import TinyDbGateway
 from app.repositories.interfaces import FirestoreGatewayProtocol
+from app.repositories.journal_storage import JournalStorage
+from app.services import RendaVariavelService
 
 
 class InMemoryGateway(FirestoreGatewayProtocol):
@@ -31,6 +50,7 @@ class InMemoryGateway(FirestoreGatewayProtocol):
 
     def __init__(self) -> None:
         self._store: dict[str, dict[str, dict[str, Any]]] = {}
+        self.batch_calls = 0
 
     def add_document(
         self,
@@ -47,6 +67,18 @@ class InMemoryGateway(FirestoreGatewayProtocol):
             coll[doc_id] = dict(payload)
         return doc_id
 
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        self.batch_calls += 1
+        return [
+            self.add_document(collection, payload, document_id, merge=merge)
+            for document_id, payload in documents
+        ]
+
     def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
         data = self._store.get(collection, {}).get(document_id)
         if data is None:
@@ -55,13 +87,61 @@ class InMemoryGateway(FirestoreGatewayProtocol):
         result.setdefault("id", document_id)
         return result
 
-    def list_documents(self, collection: str) -> list[Mapping[str, Any]]:
+    def get_documents(self, collection: str, document_ids: Sequence[str]) -> dict[str, Mapping[str, Any]]:
+        found = {document_id: self.get_document(collection, document_id) for document_id in document_ids}
+        return {document_id: data for document_id, data in found.items() if data is not None}
+
+    def list_documents(self, collection: str, fields: Sequence[str] | None = None) -> list[Mapping[str, Any]]:
         coll = self._store.get(collection, {})
-        return [dict(value, id=doc_id) for doc_id, value in coll.items()]
+        items = [dict(value, id=doc_id) for doc_id, value in coll.items()]
+        if fields is not None:
+            items = [{key: item[key] for key in (*fields, "id") if key in item} for item in items]
+        return items
 
-    def delete_document(self, collection: str, document_id: str) -> None:
+    def query_documents(
+        self,
+        collection: str,
+        filters: Sequence[tuple[str, str, Any]] = (),
+        order_by: str | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        fields: Sequence[str] | None = None,
+    ) -> list[Mapping[str, Any]]:
+        items = [
+            item
+            for item in self.list_documents(collection, fields)
+            if all(op == "==" and item.get(field) == value for field, op, value in filters)
+        ]
+        if order_by:
+            items.sort(key=lambda item: item[order_by], reverse=descending)
+        return items[:limit] if limit is not None else items
+
+    def update_document(self, collection: str, document_id: str, payload: Mapping[str, Any]) -> None:
         coll = self._store.get(collection, {})
-        coll.pop(document_id, None)
+        if document_id not in coll:
+            raise DocumentNotFoundError(document_id)
+        coll[document_id].update(dict(payload))
+
+    def delete_document(self, collection: str, document_id: str, must_exist: bool = False) -> None:
+        coll = self._store.get(collection, {})
+        if coll.pop(document_id, None) is None and must_exist:
+            raise DocumentNotFoundError(document_id)
+
+    def update_documents(
+        self, collection: str, documents: Sequence[tuple[str, Mapping[str, Any]]]
+    ) -> list[str]:
+        coll = self._store.get(collection, {})
+        missing = [document_id for document_id, _ in documents if document_id not in coll]
+        for document_id, payload in documents:
+            if document_id in coll:
+                coll[document_id].update(dict(payload))
+        return missing
+
+    def transform_document(self, collection: str, document_id: str, transform) -> Mapping[str, Any]:
+        document = dict(transform(self.get_document(collection, document_id)))
+        document.pop("id", None)
+        self._store.setdefault(collection, {})[document_id] = document
+        return dict(document, id=document_id)
 
 
 def _sample_passivo_payload() -> Mapping[str, Any]:
@@ -114,6 +194,26 @@ def test_passivos_repository_update_replaces_document() -> None:
     assert updated.saldo_atual == 100.0
 
 
+def test_passivos_repository_writes_do_not_read_back() -> None:
+    gateway = mock.Mock(wraps=InMemoryGateway())
+    repo = PassivosRepository(gateway)
+
+    created = repo.create(_sample_passivo_payload())
+    updated = repo.update(created.id, {"nome": "Atualizado", "categoria": "outros", "saldo_atual": 100.0})
+    repo.delete(created.id)
+
+    assert updated.nome == "Atualizado"
+    assert updated.taxa_juros_aa is None
+    gateway.get_document.assert_not_called()
+
+
+def test_passivos_repository_update_missing_raises() -> None:
+    repo = PassivosRepository(InMemoryGateway())
+
+    with pytest.raises(DocumentNotFoundError):
+        repo.update("missing", {"nome": "X", "categoria": "outros", "saldo_atual": 1.0})
+
+
 def test_passivos_repository_delete_missing_raises() -> None:
     repo = PassivosRepository(InMemoryGateway())
 
@@ -132,6 +232,64 @@ def test_renda_variavel_repository_list() -> None:
     assert all(item.ticker == "HSML11" for item in items)
 
 
+def test_renda_variavel_repository_update_many_uses_single_batch() -> None:
+    gateway = InMemoryGateway()
+    repo = RendaVariavelPositionsRepository(gateway)
+    first = repo.create(_sample_position_payload())
+    second = repo.create({**_sample_position_payload(), "total_mercado": 400.0})
+
+    updated = repo.update_many(
+        {
+            first.id: {**_sample_position_payload(), "peso_percentual": 80.0},
+            second.id: {**_sample_position_payload(), "peso_percentual": 20.0},
+        }
+    )
+
+    assert gateway.batch_calls == 1
+    assert [item.id for item in updated] == [first.id, second.id]
+    assert repo.get(second.id).peso_percentual == pytest.approx(20.0)
+
+
+def test_renda_variavel_positions_repository_list_by_tipo() -> None:
+    gateway = InMemoryGateway()
+    repo = RendaVariavelPositionsRepository(gateway)
+    repo.create(_sample_position_payload())
+    repo.create({**_sample_position_payload(), "ticker": "ITUB4", "tipo": "acao_br"})
+
+    items = repo.list_by_tipo(RendaVariavelTipo.ACAO_BR)
+
+    assert [item.ticker for item in items] == ["ITUB4"]
+
+
+def test_trades_repository_list_by_position_queries_gateway() -> None:
+    gateway = mock.Mock()
+    gateway.query_documents.return_value = [
+        {
+            "id": "trade-1",
+            "position_id": "position-1",
+            "tipo_operacao": "compra",
+            "data": "2024-01-05T12:00:00",
+            "quantidade": 1,
+            "cotacao": 10.0,
+            "total": 10.0,
+        }
+    ]
+    repo = RendaVariavelTradesRepository(gateway)
+
+    trades = repo.list_by_position("position-1")
+
+    assert [trade.id for trade in trades] == ["trade-1"]
+    gateway.query_documents.assert_called_once_with(
+        "renda_variavel_trades",
+        [("position_id", "==", "position-1")],
+        order_by=None,
+        descending=False,
+        limit=None,
+        fields=None,
+    )
+    gateway.list_documents.assert_not_called()
+
+
 def test_firestore_gateway_propagates_google_errors_on_add() -> None:
     client = mock.Mock()
     client.collection.side_effect = google_exceptions.GoogleAPICallError("boom")
@@ -164,6 +322,46 @@ def test_firestore_gateway_add_and_get_successful() -> None:
     assert fetched == {"nome": "Financiamento", "id": "generated-id"}
 
 
+def test_firestore_gateway_update_maps_not_found() -> None:
+    client = mock.Mock()
+    client.collection.return_value.document.return_value.update.side_effect = (
+        google_exceptions.NotFound("missing")
+    )
+    gateway = FirestoreGateway(client)
+
+    with pytest.raises(DocumentNotFoundError):
+        gateway.update_document("passivos", "missing", {"nome": "X"})
+
+
+def test_firestore_gateway_delete_with_precondition() -> None:
+    client = mock.Mock()
+    document = client.collection.return_value.document.return_value
+    gateway = FirestoreGateway(client)
+
+    gateway.delete_document("passivos", "doc-1", must_exist=True)
+
+    client.write_option.assert_called_once_with(exists=True)
+    document.delete.assert_called_once_with(option=client.write_option.return_value)
+
+
+def test_tinydb_gateway_update_and_delete_require_existing_document(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    doc_id = gateway.add_document("passivos", {"nome": "Cartao", "saldo": 1.0})
+
+    gateway.update_document("passivos", doc_id, {"nome": "Atualizado"})
+
+    # Like Firestore's update(), fields left out of the payload are kept.
+    assert gateway.get_document("passivos", doc_id) == {
+        "nome": "Atualizado",
+        "saldo": 1.0,
+        "id": doc_id,
+    }
+    with pytest.raises(DocumentNotFoundError):
+        gateway.update_document("passivos", "missing", {"nome": "X"})
+    with pytest.raises(DocumentNotFoundError):
+        gateway.delete_document("passivos", "missing", must_exist=True)
+
+
 def test_tinydb_gateway_roundtrip(tmp_path) -> None:
     gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
 
@@ -201,3 +399,903 @@ def test_tinydb_gateway_replace_overwrites_missing_fields(tmp_path) -> None:
 
     fetched = gateway.get_document("passivos", doc_id)
     assert fetched == {"nome": "Atualizado", "id": doc_id}
+
+
+def test_firestore_gateway_add_documents_commits_in_chunks() -> None:
+    client = mock.Mock()
+    collection = client.collection.return_value
+    collection.document.side_effect = lambda document_id=None: mock.Mock(id=document_id or "auto")
+    batch = client.batch.return_value
+    gateway = FirestoreGateway(client)
+    documents = [(f"doc-{index}", {"valor": index}) for index in range(FirestoreGateway.MAX_BATCH_SIZE + 1)]
+
+    ids = gateway.add_documents("passivos", documents)
+
+    assert ids == [document_id for document_id, _ in documents]
+    assert batch.set.call_count == len(documents)
+    assert batch.commit.call_count == 2
+
+
+def test_tinydb_gateway_add_documents_inserts_and_replaces(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    existing = gateway.add_document("passivos", {"nome": "Cartao", "saldo": 100.0})
+
+    ids = gateway.add_documents(
+        "passivos",
+        [(existing, {"nome": "Atualizado"}), (None, {"nome": "Novo"})],
+    )
+
+    assert ids[0] == existing
+    assert gateway.get_document("passivos", existing) == {"nome": "Atualizado", "id": existing}
+    assert gateway.get_document("passivos", ids[1]) == {"nome": "Novo", "id": ids[1]}
+    assert len(gateway.list_documents("passivos")) == 2
+
+
+def test_tinydb_gateway_add_documents_merge_keeps_fields(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    doc_id = gateway.add_document("passivos", {"nome": "Cartao", "saldo": 100.0})
+
+    gateway.add_documents("passivos", [(doc_id, {"saldo": 50.0})], merge=True)
+
+    assert gateway.get_document("passivos", doc_id) == {"nome": "Cartao", "saldo": 50.0, "id": doc_id}
+
+
+def test_firestore_gateway_query_documents_builds_native_query() -> None:
+    client = mock.Mock()
+    query = client.collection.return_value
+    query.where.return_value = query
+    query.order_by.return_value = query
+    query.limit.return_value = query
+    snapshot = mock.Mock(id="trade-1")
+    snapshot.to_dict.return_value = {"position_id": "p-1"}
+    query.stream.return_value = [snapshot]
+    gateway = FirestoreGateway(client)
+
+    items = gateway.query_documents(
+        "renda_variavel_trades",
+        [("position_id", "==", "p-1"), ("data", ">=", "2024-01-01")],
+        order_by="data",
+        descending=True,
+        limit=10,
+    )
+
+    assert items == [{"position_id": "p-1", "id": "trade-1"}]
+    assert query.where.call_count == 2
+    query.order_by.assert_called_once_with("data", direction="DESCENDING")
+    query.limit.assert_called_once_with(10)
+
+
+def test_tinydb_gateway_query_documents_filters_orders_and_limits(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    for position_id, day in [("p-1", 3), ("p-2", 4), ("p-1", 1), ("p-1", 2)]:
+        gateway.add_document(
+            "renda_variavel_trades",
+            {"position_id": position_id, "data": datetime(2024, 1, day)},
+        )
+
+    items = gateway.query_documents(
+        "renda_variavel_trades",
+        [("position_id", "==", "p-1"), ("data", ">", datetime(2024, 1, 1))],
+        order_by="data",
+        descending=True,
+        limit=1,
+    )
+
+    assert [item["data"] for item in items] == ["2024-01-03T00:00:00"]
+
+
+def test_tinydb_gateway_query_documents_rejects_unknown_operator(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+
+    with pytest.raises(ValueError):
+        gateway.query_documents("passivos", [("nome", "!=", "x")])
+
+
+def test_tinydb_gateway_replace_updates_document_in_place(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    doc_id = gateway.add_document("passivos", {"nome": "Cartao", "saldo": 100.0})
+    table = gateway._database.table("passivos")
+    storage_id = table.all()[0].doc_id
+
+    gateway.add_document("passivos", {"nome": "Atualizado"}, document_id=doc_id)
+
+    assert [item.doc_id for item in table.all()] == [storage_id]
+    assert gateway.get_document("passivos", doc_id) == {"nome": "Atualizado", "id": doc_id}
+
+
+def test_tinydb_gateway_index_is_rebuilt_from_existing_file(tmp_path) -> None:
+    path = str(tmp_path / "tiny.json")
+    first = TinyDbGateway.from_file(path)
+    doc_id = first.add_document("passivos", {"nome": "Cartao"})
+    first.close()
+
+    reopened = TinyDbGateway.from_file(path)
+    reopened.add_document("passivos", {"nome": "Atualizado"}, document_id=doc_id)
+
+    assert reopened.list_documents("passivos") == [{"nome": "Atualizado", "id": doc_id}]
+    reopened.delete_document("passivos", doc_id)
+    assert reopened.get_document("passivos", doc_id) is None
+
+
+def test_tinydb_journal_storage_replays_on_open(tmp_path) -> None:
+    path = str(tmp_path / "tiny.json")
+    gateway = TinyDbGateway.from_file(path, storage="journal")
+    kept = gateway.add_document("passivos", {"nome": "Cartao"})
+    removed = gateway.add_document("passivos", {"nome": "Removido"})
+    gateway.add_document("passivos", {"nome": "Atualizado"}, document_id=kept)
+    gateway.delete_document("passivos", removed)
+    gateway.close()
+
+    reopened = TinyDbGateway.from_file(path, storage="journal")
+
+    assert reopened.list_documents("passivos") == [{"nome": "Atualizado", "id": kept}]
+
+
+def test_tinydb_journal_storage_appends_only_changed_documents(tmp_path) -> None:
+    path = tmp_path / "tiny.json"
+    gateway = TinyDbGateway.from_file(str(path), storage="journal")
+    gateway.add_documents("passivos", [(None, {"nome": f"Passivo {i}"}) for i in range(200)])
+    journal = tmp_path / "tiny.json.journal"
+    size_before = journal.stat().st_size
+
+    gateway.add_document("passivos", {"nome": "Novo"})
+
+    appended = journal.read_text().splitlines()[-1]
+    assert journal.stat().st_size - size_before == len(appended) + 1
+    assert '"Novo"' in appended
+
+
+def test_tinydb_journal_storage_compacts_past_threshold(tmp_path) -> None:
+    path = tmp_path / "tiny.json"
+    storage = JournalStorage(str(path), min_compact_bytes=256)
+    storage.write({"passivos": {str(i): {"nome": "x" * 50} for i in range(10)}})
+
+    assert (tmp_path / "tiny.json.journal").stat().st_size == 0
+    assert json.loads(path.read_text())["passivos"]["9"] == {"nome": "x" * 50}
+    storage.close()
+
+
+def test_tinydb_journal_storage_ignores_torn_last_entry(tmp_path) -> None:
+    path = tmp_path / "tiny.json"
+    storage = JournalStorage(str(path))
+    storage.write({"passivos": {"1": {"nome": "Cartao"}}})
+    storage.close()
+    with open(tmp_path / "tiny.json.journal", "a", encoding="utf-8") as handle:
+        handle.write('{"op": "set", "table": "passivos", "id": "2", "doc"')
+
+    reopened = JournalStorage(str(path))
+    reopened.write({"passivos": {"1": {"nome": "Cartao"}, "3": {"nome": "Novo"}}})
+    reopened.close()
+
+    assert JournalStorage(str(path)).read() == {
+        "passivos": {"1": {"nome": "Cartao"}, "3": {"nome": "Novo"}}
+    }
+
+
+def test_tinydb_journal_gateway_writes_only_the_changed_documents(tmp_path) -> None:
+    path = str(tmp_path / "tiny.json")
+    gateway = TinyDbGateway.from_file(path, storage="journal")
+    ids = gateway.add_documents("passivos", [(None, {"nome": f"Passivo {i}"}) for i in range(200)])
+
+    # Neither TinyDB's whole-table write nor a copy of the database per call.
+    with mock.patch.object(JournalStorage, "write") as whole_table_write:
+        gateway.add_document("passivos", {"nome": "Novo"}, document_id="novo")
+        gateway.update_document("passivos", ids[0], {"nome": "Editado"})
+        gateway.update_documents("passivos", [(ids[1], {"saldo": 1.0})])
+        gateway.delete_document("passivos", ids[2])
+    whole_table_write.assert_not_called()
+    journal = (tmp_path / "tiny.json.journal").read_text().splitlines()
+    assert [json.loads(line)["op"] for line in journal[-4:]] == ["set", "set", "set", "delete"]
+    gateway.close()
+
+    reopened = TinyDbGateway.from_file(path, storage="journal")
+    assert reopened.get_document("passivos", ids[0])["nome"] == "Editado"
+    assert reopened.get_document("passivos", ids[1]) == {
+        "nome": "Passivo 1",
+        "saldo": 1.0,
+        "id": ids[1],
+    }
+    assert reopened.get_document("passivos", ids[2]) is None
+    assert reopened.get_document("passivos", "novo") == {"nome": "Novo", "id": "novo"}
+    assert len(reopened.list_documents("passivos")) == 200
+
+
+def test_tinydb_journal_storage_journals_tables_rebuilt_by_tinydb(tmp_path) -> None:
+    path = str(tmp_path / "tiny.json")
+    storage = JournalStorage(path)
+    storage.set_documents("passivos", {"1": {"nome": "Cartao"}})
+    tables = storage.read()
+    tables["passivos"] = {**tables["passivos"], "2": {"nome": "Novo"}}
+    storage.write(tables)
+    storage.close()
+
+    assert JournalStorage(path).read() == {
+        "passivos": {"1": {"nome": "Cartao"}, "2": {"nome": "Novo"}}
+    }
+
+
+def test_tinydb_journal_storage_refuses_a_second_process(tmp_path) -> None:
+    path = str(tmp_path / "tiny.json")
+    storage = JournalStorage(path)
+
+    with pytest.raises(RepositoryError):
+        JournalStorage(path)
+    storage.close()
+    JournalStorage(path).close()
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_caching_gateway_serves_repeated_reads_from_cache() -> None:
+    inner = mock.Mock(wraps=InMemoryGateway())
+    gateway = CachingGateway(inner, ttl_seconds=30)
+    doc_id = gateway.add_document("passivos", {"nome": "Cartao"})
+
+    assert gateway.get_document("passivos", doc_id) == {"nome": "Cartao", "id": doc_id}
+    assert gateway.get_document("passivos", doc_id) == {"nome": "Cartao", "id": doc_id}
+    assert gateway.list_documents("passivos") == gateway.list_documents("passivos")
+
+    assert inner.get_document.call_count == 1
+    assert inner.list_documents.call_count == 1
+    assert gateway.stats() == {"hits": 2, "misses": 2, "entries": 2}
+
+
+def test_caching_gateway_invalidates_on_writes() -> None:
+    gateway = CachingGateway(InMemoryGateway(), ttl_seconds=30)
+    doc_id = gateway.add_document("passivos", {"nome": "Cartao"})
+    gateway.get_document("passivos", doc_id)
+    gateway.list_documents("passivos")
+
+    gateway.add_document("passivos", {"nome": "Atualizado"}, document_id=doc_id)
+    assert gateway.get_document("passivos", doc_id)["nome"] == "Atualizado"
+    assert [item["nome"] for item in gateway.list_documents("passivos")] == ["Atualizado"]
+
+    gateway.delete_document("passivos", doc_id)
+    assert gateway.get_document("passivos", doc_id) is None
+    assert gateway.list_documents("passivos") == []
+
+
+def test_caching_gateway_expires_and_evicts_entries() -> None:
+    clock = FakeClock()
+    inner = mock.Mock(wraps=InMemoryGateway())
+    gateway = CachingGateway(inner, ttl_seconds=10, max_entries=2, clock=clock)
+
+    gateway.list_documents("passivos")
+    clock.now = 11
+    gateway.list_documents("passivos")
+    assert inner.list_documents.call_count == 2
+
+    gateway.get_document("passivos", "a")
+    gateway.get_document("passivos", "b")
+    assert gateway.stats()["entries"] == 2
+    gateway.list_documents("passivos")
+    assert inner.list_documents.call_count == 3
+
+
+def test_create_app_wraps_gateway_when_cache_ttl_configured(monkeypatch) -> None:
+    monkeypatch.setenv("GATEWAY_CACHE_TTL_SECONDS", "15")
+
+    app = create_app("testing")
+
+    gateway = app.extensions["data_gateway"]
+    assert isinstance(gateway, VersionedGateway)
+    # Cache statistics are reached through the versioning layer.
+    assert gateway.stats()["entries"] == 0
+    assert app.config["DATA_GATEWAY_FACTORY"]() is gateway
+
+
+def test_firestore_gateway_iter_documents_fetches_pages_lazily() -> None:
+    client = mock.Mock()
+    query = client.collection.return_value
+    query.order_by.return_value = query
+    query.limit.return_value = query
+    query.start_after.return_value = query
+
+    def snapshot(doc_id: str) -> mock.Mock:
+        item = mock.Mock(id=doc_id)
+        item.to_dict.return_value = {"nome": doc_id}
+        return item
+
+    pages = [[snapshot("a"), snapshot("b")], [snapshot("c")]]
+    query.stream.side_effect = lambda: iter(pages.pop(0))
+    gateway = FirestoreGateway(client)
+
+    iterator = gateway.iter_documents("passivos", page_size=2, start_after="0")
+    assert query.stream.call_count == 0
+    ids = [item["id"] for item in iterator]
+
+    assert ids == ["a", "b", "c"]
+    assert query.stream.call_count == 2
+    first_cursor, second_cursor = (call.args[0] for call in query.start_after.call_args_list)
+    assert first_cursor == {"__name__": "0"}
+    assert second_cursor.id == "b"
+
+
+def test_tinydb_gateway_iter_documents_resumes_after_cursor(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    for doc_id, saldo in [("a", 3), ("b", 1), ("c", 2)]:
+        gateway.add_document("passivos", {"saldo": saldo}, document_id=doc_id)
+
+    ordered = [item["id"] for item in gateway.iter_documents("passivos", order_by="saldo")]
+    resumed = [item["id"] for item in gateway.iter_documents("passivos", order_by="saldo", start_after="c")]
+
+    assert ordered == ["b", "c", "a"]
+    assert resumed == ["a"]
+
+
+def test_firestore_gateway_get_documents_uses_single_get_all() -> None:
+    client = mock.Mock()
+    collection = client.collection.return_value
+    collection.document.side_effect = lambda document_id: mock.Mock(id=document_id)
+    found = mock.Mock(id="a", exists=True)
+    found.to_dict.return_value = {"nome": "A"}
+    client.get_all.return_value = [found, mock.Mock(id="b", exists=False)]
+    gateway = FirestoreGateway(client)
+
+    documents = gateway.get_documents("passivos", ["a", "b", "a"])
+
+    assert documents == {"a": {"nome": "A", "id": "a"}}
+    client.get_all.assert_called_once()
+    assert [ref.id for ref in client.get_all.call_args.args[0]] == ["a", "b"]
+
+
+def test_repository_get_many_returns_existing_documents(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    repo = PassivosRepository(gateway)
+    first = repo.create(_sample_passivo_payload())
+    second = repo.create({**_sample_passivo_payload(), "nome": "Outro"})
+
+    found = repo.get_many([second.id, "missing", first.id])
+
+    assert set(found) == {first.id, second.id}
+    assert found[second.id].nome == "Outro"
+
+
+def test_tinydb_gateway_get_documents_reads_storage_once(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    ids = gateway.add_documents("passivos", [(None, {"nome": f"Passivo {i}"}) for i in range(5)])
+    gateway.list_documents("passivos")  # builds the id index
+    storage = gateway._database.storage
+
+    with mock.patch.object(storage, "read", wraps=storage.read) as read:
+        found = gateway.get_documents("passivos", [ids[3], "missing", ids[0], ids[3]])
+
+    assert read.call_count == 1
+    assert list(found) == [ids[3], ids[0]]
+    assert found[ids[0]] == {"nome": "Passivo 0", "id": ids[0]}
+
+
+def test_caching_gateway_get_documents_fetches_only_misses() -> None:
+    inner = mock.Mock(wraps=InMemoryGateway())
+    gateway = CachingGateway(inner, ttl_seconds=30)
+    inner.add_document("passivos", {"nome": "A"}, document_id="a")
+    inner.add_document("passivos", {"nome": "B"}, document_id="b")
+    gateway.get_document("passivos", "a")
+
+    documents = gateway.get_documents("passivos", ["a", "b", "c"])
+
+    assert set(documents) == {"a", "b"}
+    inner.get_documents.assert_called_once_with("passivos", ["b", "c"])
+
+
+def test_firestore_gateway_list_documents_applies_field_mask() -> None:
+    client = mock.Mock()
+    query = client.collection.return_value
+    projected = query.select.return_value
+    snapshot = mock.Mock(id="p-1")
+    snapshot.to_dict.return_value = {"ticker": "HGLG11"}
+    projected.stream.return_value = [snapshot]
+    gateway = FirestoreGateway(client)
+
+    items = gateway.list_documents("renda_variavel_positions", fields=["ticker"])
+
+    query.select.assert_called_once_with(["ticker"])
+    assert items == [{"ticker": "HGLG11", "id": "p-1"}]
+
+
+def test_repository_list_with_fields_returns_projection() -> None:
+    repo = RendaVariavelPositionsRepository(InMemoryGateway())
+    created = repo.create(_sample_position_payload())
+
+    items = repo.list(fields=["ticker", "peso_percentual"])
+
+    assert [item.model_dump() for item in items] == [
+        {"id": created.id, "ticker": "HSML11", "peso_percentual": 100.0}
+    ]
+
+
+async def _stream(items: list[Any]):
+    for item in items:
+        yield item
+
+
+def test_async_firestore_gateway_reads_with_async_client() -> None:
+    client = mock.Mock()
+    collection = client.collection.return_value
+    snapshot = mock.Mock(id="p-1", exists=True)
+    snapshot.to_dict.return_value = {"ticker": "HGLG11"}
+    collection.document.return_value.get = mock.AsyncMock(return_value=snapshot)
+    collection.where.return_value = collection
+    collection.stream = lambda: _stream([snapshot])
+    gateway = AsyncFirestoreGateway(lambda: client)
+
+    async def read() -> tuple[Any, Any]:
+        return await asyncio.gather(
+            gateway.get_document("renda_variavel_positions", "p-1"),
+            gateway.query_documents("renda_variavel_positions", [("tipo", "==", "fii")]),
+        )
+
+    document, items = asyncio.run(read())
+
+    assert document == {"ticker": "HGLG11", "id": "p-1"}
+    assert items == [{"ticker": "HGLG11", "id": "p-1"}]
+    collection.where.assert_called_once()
+
+
+def test_async_firestore_gateway_keeps_one_client_across_event_loops() -> None:
+    client = mock.Mock()
+    snapshot = mock.Mock(id="a", exists=True)
+    snapshot.to_dict.return_value = {"nome": "A"}
+    client.collection.return_value.document.return_value.get = mock.AsyncMock(
+        return_value=snapshot
+    )
+    factory = mock.Mock(return_value=client)
+    gateway = AsyncFirestoreGateway(factory)
+
+    # Flask runs every async view on a new event loop.
+    first = asyncio.run(gateway.get_document("passivos", "a"))
+    second = asyncio.run(gateway.get_document("passivos", "a"))
+
+    assert first == second == {"nome": "A", "id": "a"}
+    assert factory.call_count == 1
+
+
+def test_async_firestore_gateway_update_maps_not_found() -> None:
+    client = mock.Mock()
+    client.collection.return_value.document.return_value.update = mock.AsyncMock(
+        side_effect=google_exceptions.NotFound("missing")
+    )
+    gateway = AsyncFirestoreGateway(lambda: client)
+
+    with pytest.raises(DocumentNotFoundError):
+        asyncio.run(gateway.update_document("passivos", "missing", {"nome": "X"}))
+
+
+def test_async_gateway_adapter_offload_overlaps_blocking_reads() -> None:
+    class SlowGateway(InMemoryGateway):
+        def get_document(self, collection: str, document_id: str) -> Mapping[str, Any] | None:
+            time.sleep(0.05)
+            return super().get_document(collection, document_id)
+
+    gateway = SlowGateway()
+    gateway.add_document("passivos", {"nome": "A"}, document_id="a")
+    adapter = AsyncGatewayAdapter(gateway, offload=True)
+
+    async def read() -> list[Any]:
+        return await asyncio.gather(*(adapter.get_document("passivos", "a") for _ in range(4)))
+
+    started = time.perf_counter()
+    documents = asyncio.run(read())
+    elapsed = time.perf_counter() - started
+
+    assert [item["nome"] for item in documents] == ["A"] * 4
+    assert elapsed < 0.15
+
+
+def test_repository_async_reads_match_sync_reads(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "tiny.json"))
+    repo = RendaVariavelPositionsRepository(gateway)
+    created = repo.create(_sample_position_payload())
+
+    async def read() -> tuple[Any, Any]:
+        return await asyncio.gather(
+            repo.aget(created.id),
+            repo.alist_by_tipo(RendaVariavelTipo.FII, fields=["ticker"]),
+        )
+
+    position, projected = asyncio.run(read())
+
+    assert position == repo.get(created.id)
+    assert [item.ticker for item in projected] == ["HSML11"]
+    with pytest.raises(DocumentNotFoundError):
+        asyncio.run(repo.aget("missing"))
+
+
+def test_sqlite_gateway_roundtrip_and_replace(tmp_path) -> None:
+    gateway = SqliteGateway.from_file(str(tmp_path / "app.sqlite3"))
+
+    doc_id = gateway.add_document("passivos", {"nome": "A", "saldo": 1})
+    gateway.add_document("passivos", {"saldo": 2}, document_id=doc_id, merge=True)
+    merged = gateway.get_document("passivos", doc_id)
+    gateway.update_document("passivos", doc_id, {"nome": "B"})
+
+    assert merged == {"nome": "A", "saldo": 2, "id": doc_id}
+    assert gateway.get_document("passivos", doc_id) == {"nome": "B", "saldo": 2, "id": doc_id}
+    with pytest.raises(DocumentNotFoundError):
+        gateway.update_document("passivos", "missing", {"nome": "X"})
+    with pytest.raises(DocumentNotFoundError):
+        gateway.delete_document("passivos", "missing", must_exist=True)
+    gateway.delete_document("passivos", doc_id, must_exist=True)
+    assert gateway.get_document("passivos", doc_id) is None
+
+
+def test_sqlite_gateway_uses_wal_and_indexes(tmp_path) -> None:
+    gateway = SqliteGateway.from_file(str(tmp_path / "app.sqlite3"))
+    gateway.add_document("renda_variavel_trades", {"position_id": "p-1", "data": "2024-01-01"})
+    with gateway._connection() as connection:
+        [(journal_mode,)] = connection.execute("PRAGMA journal_mode").fetchall()
+        plan = " ".join(
+            str(row)
+            for row in connection.execute(
+                "EXPLAIN QUERY PLAN SELECT doc FROM renda_variavel_trades "
+                "WHERE position_id = ? ORDER BY data",
+                ("p-1",),
+            )
+        )
+
+    assert journal_mode == "wal"
+    assert "renda_variavel_trades_position_data" in plan
+
+
+def test_sqlite_gateway_query_documents_filters_orders_and_limits() -> None:
+    gateway = SqliteGateway.from_file(":memory:")
+    gateway.add_documents(
+        "renda_variavel_positions",
+        [
+            ("a", {"tipo": "fii", "total_mercado": 10.0}),
+            ("b", {"tipo": "fii", "total_mercado": 30.0}),
+            ("c", {"tipo": "fii"}),
+            ("d", {"tipo": "etf", "total_mercado": 20.0}),
+        ],
+    )
+
+    ordered = gateway.query_documents(
+        "renda_variavel_positions", [("tipo", "==", "fii")], order_by="total_mercado"
+    )
+    top = gateway.query_documents(
+        "renda_variavel_positions",
+        [("total_mercado", ">=", 20.0)],
+        order_by="total_mercado",
+        descending=True,
+        limit=1,
+        fields=["tipo"],
+    )
+
+    assert [item["id"] for item in ordered] == ["a", "b", "c"]
+    assert top == [{"tipo": "fii", "id": "b"}]
+    with pytest.raises(ValueError):
+        gateway.query_documents("renda_variavel_positions", [("tipo", "like", "f%")])
+
+
+def test_sqlite_gateway_iter_documents_pages_with_keyset_cursor() -> None:
+    gateway = SqliteGateway.from_file(":memory:")
+    for doc_id, data in [("a", "2024-01-03"), ("b", "2024-01-01"), ("c", None), ("d", "2024-01-02")]:
+        gateway.add_document("renda_variavel_trades", {"data": data}, document_id=doc_id)
+
+    ordered = [
+        item["id"]
+        for item in gateway.iter_documents("renda_variavel_trades", order_by="data", page_size=1)
+    ]
+    resumed = [
+        item["id"]
+        for item in gateway.iter_documents(
+            "renda_variavel_trades", order_by="data", descending=True, start_after="a", page_size=2
+        )
+    ]
+
+    after_missing = [
+        item["id"]
+        for item in gateway.iter_documents(
+            "renda_variavel_trades", order_by="data", descending=True, start_after="c"
+        )
+    ]
+
+    assert ordered == ["b", "d", "a", "c"]
+    assert resumed == ["d", "b"]
+    assert after_missing == ["a", "d", "b"]
+
+
+def test_sqlite_gateway_shares_memory_database_across_threads() -> None:
+    gateway = SqliteGateway.from_file(":memory:")
+    gateway.add_document("passivos", {"nome": "A"}, document_id="a")
+    adapter = AsyncGatewayAdapter(gateway, offload=True)
+
+    document = asyncio.run(adapter.get_document("passivos", "a"))
+
+    assert document == {"nome": "A", "id": "a"}
+
+
+def test_sqlite_gateway_keeps_connections_bounded_across_event_loops(tmp_path) -> None:
+    gateway = SqliteGateway(str(tmp_path / "app.sqlite3"), max_connections=4)
+    gateway.add_document("passivos", {"nome": "A"}, document_id="a")
+    adapter = AsyncGatewayAdapter(gateway, offload=True, max_workers=4)
+
+    async def request() -> None:
+        await asyncio.gather(*(adapter.get_document("passivos", "a") for _ in range(8)))
+
+    # One event loop per request, as Flask runs async views.
+    for _ in range(50):
+        asyncio.run(request())
+
+    assert len(gateway._connections) <= 4
+
+
+def test_sqlite_gateway_transform_document_keeps_concurrent_increments(tmp_path) -> None:
+    gateway = SqliteGateway(str(tmp_path / "app.sqlite3"), max_connections=4)
+
+    def increment(current: Mapping[str, Any] | None) -> Mapping[str, Any]:
+        total = 0 if current is None else current["total"]
+        time.sleep(0.001)
+        return {"total": total + 1}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: gateway.transform_document("resumos", "r", increment), range(40)))
+
+    assert gateway.get_document("resumos", "r") == {"total": 40, "id": "r"}
+
+
+@pytest.mark.parametrize("backend", ["tinydb", "sqlite"])
+def test_gateway_update_documents_patches_existing_and_reports_missing(backend, tmp_path) -> None:
+    if backend == "tinydb":
+        gateway = TinyDbGateway.from_file(str(tmp_path / "db.json"))
+    else:
+        gateway = SqliteGateway(str(tmp_path / "app.sqlite3"))
+    gateway.add_document("passivos", {"nome": "A", "saldo": 1}, document_id="a")
+    gateway.add_document("passivos", {"nome": "B", "saldo": 1}, document_id="b")
+
+    missing = gateway.update_documents(
+        "passivos", [("a", {"saldo": 2}), ("ghost", {"saldo": 3}), ("b", {"saldo": 4})]
+    )
+
+    assert missing == ["ghost"]
+    assert gateway.get_document("passivos", "a") == {"nome": "A", "saldo": 2, "id": "a"}
+    assert gateway.get_document("passivos", "b") == {"nome": "B", "saldo": 4, "id": "b"}
+    assert gateway.get_document("passivos", "ghost") is None
+
+
+def test_tinydb_gateway_transform_document_creates_and_replaces(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "db.json"))
+
+    created = gateway.transform_document("resumos", "r", lambda current: {"total": 1})
+    updated = gateway.transform_document(
+        "resumos", "r", lambda current: {"total": current["total"] + 1}
+    )
+
+    assert created == {"total": 1, "id": "r"}
+    assert updated == gateway.get_document("resumos", "r") == {"total": 2, "id": "r"}
+
+
+def test_create_app_selects_sqlite_backend(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("DATA_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_FILE", str(tmp_path / "app.sqlite3"))
+    monkeypatch.setenv("GATEWAY_METRICS_ENABLED", "false")
+    application = create_app("testing")
+    client = application.test_client()
+
+    created = client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 12.0},
+    ).get_json()["item"]
+    listed = client.get("/renda-variavel").get_json()
+
+    assert (tmp_path / "app.sqlite3").stat().st_size > 0
+    assert [item["id"] for item in listed["items"]["fiis"]] == [created["id"]]
+    assert listed["items"]["fiis"][0]["peso_percentual"] == pytest.approx(100.0)
+
+
+def test_instrumented_gateway_records_calls_documents_and_errors() -> None:
+    ticks = iter([0.0, 0.002, 1.0, 1.3, 2.0, 2.0, 3.0, 3.0])
+    gateway = InstrumentedGateway(TinyDbGateway.from_file(":memory:"), clock=lambda: next(ticks))
+
+    gateway.add_documents("passivos", [("a", {"nome": "A"}), ("b", {"nome": "B"})])
+    gateway.list_documents("passivos")
+    with pytest.raises(DocumentNotFoundError):
+        gateway.update_document("passivos", "missing", {"nome": "X"})
+    stream = gateway.iter_documents("passivos")
+    next(stream)
+    stream.close()
+
+    snapshot = gateway.metrics.snapshot()
+    assert snapshot[("add_documents", "passivos")] == {
+        "calls": 1,
+        "errors": 0,
+        "documents": 2,
+        "seconds": pytest.approx(0.002),
+    }
+    assert snapshot[("list_documents", "passivos")]["seconds"] == pytest.approx(0.3)
+    assert snapshot[("update_document", "passivos")]["errors"] == 1
+    assert snapshot[("iter_documents", "passivos")]["errors"] == 0
+    assert snapshot[("iter_documents", "passivos")]["documents"] == 1
+
+
+def test_gateway_metrics_renders_prometheus_histogram() -> None:
+    metrics = GatewayMetrics(buckets=(0.01, 0.1))
+    metrics.observe("get_document", "passivos", 0.005, documents=1)
+    metrics.observe("get_document", "passivos", 0.05, documents=0, error=True)
+
+    text = metrics.render_prometheus()
+
+    labels = 'operation="get_document",collection="passivos"'
+    assert f"gateway_operations_total{{{labels}}} 2" in text
+    assert f"gateway_operation_errors_total{{{labels}}} 1" in text
+    assert f"gateway_documents_total{{{labels}}} 1" in text
+    assert f'gateway_operation_duration_seconds_bucket{{{labels},le="0.01"}} 1' in text
+    assert f'gateway_operation_duration_seconds_bucket{{{labels},le="0.1"}} 2' in text
+    assert f'gateway_operation_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"gateway_operation_duration_seconds_count{{{labels}}} 2" in text
+
+
+def test_unit_of_work_serves_repeat_reads_and_flushes_once() -> None:
+    inner = mock.Mock(wraps=TinyDbGateway.from_file(":memory:"))
+    inner.add_document("passivos", {"nome": "A", "saldo": 1}, document_id="a")
+    inner.reset_mock()
+    unit_of_work = UnitOfWork(inner)
+
+    unit_of_work.get_document("passivos", "a")
+    unit_of_work.update_document("passivos", "a", {"saldo": 2})
+    created_id = unit_of_work.add_document("passivos", {"nome": "B", "saldo": 5})
+    fetched = unit_of_work.get_document("passivos", "a")
+    queried = unit_of_work.query_documents("passivos", [("saldo", ">=", 2)])
+
+    assert fetched == {"nome": "A", "saldo": 2, "id": "a"}
+    assert [item["id"] for item in queried] == ["a", created_id]
+    inner.get_document.assert_called_once_with("passivos", "a")
+    inner.add_documents.assert_not_called()
+
+    unit_of_work.commit()
+
+    inner.add_documents.assert_called_once_with(
+        "passivos", [(created_id, {"nome": "B", "saldo": 5})], merge=False
+    )
+    inner.update_documents.assert_called_once_with("passivos", [("a", {"saldo": 2})])
+    assert not unit_of_work.dirty
+
+
+def test_unit_of_work_sends_updates_as_patches_over_concurrent_writes() -> None:
+    inner = InMemoryGateway()
+    inner.add_document("posicoes", {"qtd": 10, "cot": 1}, document_id="a")
+    inner.add_document("posicoes", {"qtd": 5, "cot": 1}, document_id="b")
+    unit_of_work = UnitOfWork(inner)
+    unit_of_work.get_documents("posicoes", ["a", "b"])
+
+    unit_of_work.update_document("posicoes", "a", {"cot": 2})
+    unit_of_work.update_document("posicoes", "b", {"cot": 3})
+    # Another writer changes one document and deletes the other before commit.
+    inner.update_document("posicoes", "a", {"qtd": 15})
+    inner.delete_document("posicoes", "b")
+
+    assert unit_of_work.get_document("posicoes", "a") == {"qtd": 10, "cot": 2, "id": "a"}
+    with pytest.raises(DocumentNotFoundError):
+        unit_of_work.commit()
+    assert inner.get_document("posicoes", "a") == {"qtd": 15, "cot": 2, "id": "a"}
+    assert inner.get_document("posicoes", "b") is None
+
+
+def test_unit_of_work_update_documents_reports_documents_deleted_since_read() -> None:
+    inner = InMemoryGateway()
+    inner.add_document("posicoes", {"qtd": 10, "cot": 1}, document_id="a")
+    inner.add_document("posicoes", {"qtd": 5, "cot": 1}, document_id="b")
+    unit_of_work = UnitOfWork(inner)
+    unit_of_work.list_documents("posicoes")
+    inner.update_document("posicoes", "a", {"qtd": 15})
+    inner.delete_document("posicoes", "b")
+
+    missing = unit_of_work.update_documents("posicoes", [("a", {"cot": 2}), ("b", {"cot": 3})])
+
+    assert missing == ["b"]
+    assert inner.get_document("posicoes", "a") == {"qtd": 15, "cot": 2, "id": "a"}
+    assert unit_of_work.get_document("posicoes", "b") is None
+    assert not unit_of_work.dirty
+
+
+def test_unit_of_work_caches_queries_and_overlays_deletes() -> None:
+    inner = mock.Mock(wraps=TinyDbGateway.from_file(":memory:"))
+    inner.add_document("passivos", {"nome": "A"}, document_id="a")
+    inner.add_document("passivos", {"nome": "B"}, document_id="b")
+    unit_of_work = UnitOfWork(inner)
+
+    unit_of_work.query_documents("passivos", [("nome", "in", ["A", "B"])])
+    unit_of_work.delete_document("passivos", "b", must_exist=True)
+    remaining = unit_of_work.query_documents("passivos", [("nome", "in", ["A", "B"])])
+    unit_of_work.get_document("passivos", "a")
+
+    assert [item["id"] for item in remaining] == ["a"]
+    assert inner.query_documents.call_count == 1
+    inner.get_document.assert_not_called()
+    with pytest.raises(DocumentNotFoundError):
+        unit_of_work.delete_document("passivos", "b", must_exist=True)
+
+    unit_of_work.rollback()
+    assert inner.get_document("passivos", "b") is not None
+
+
+def test_unit_of_work_writes_unknown_documents_through() -> None:
+    inner = InMemoryGateway()
+    unit_of_work = UnitOfWork(inner)
+
+    with pytest.raises(DocumentNotFoundError):
+        unit_of_work.update_document("passivos", "missing", {"nome": "X"})
+    assert not unit_of_work.dirty
+
+
+def test_unit_of_work_replays_transforms_on_the_stored_document_at_commit() -> None:
+    inner = InMemoryGateway()
+    inner.add_document("resumos", {"total": 10}, document_id="r")
+    unit_of_work = UnitOfWork(inner)
+
+    def increment(current: Mapping[str, Any] | None) -> Mapping[str, Any]:
+        return {"total": current["total"] + 1}
+
+    staged = unit_of_work.transform_document("resumos", "r", increment)
+    unit_of_work.transform_document("resumos", "r", increment)
+    # Another writer commits in between.
+    inner.add_document("resumos", {"total": 20}, document_id="r")
+
+    assert staged == {"total": 11, "id": "r"}
+    assert unit_of_work.get_document("resumos", "r") == {"total": 12, "id": "r"}
+    unit_of_work.commit()
+    assert inner.get_document("resumos", "r") == {"total": 22, "id": "r"}
+
+
+def test_versioned_gateway_bumps_written_collections_only() -> None:
+    inner = TinyDbGateway.from_file(":memory:")
+    versions = CollectionVersions(inner)
+    gateway = VersionedGateway(inner, versions)
+    initial = versions.tag("passivos", "renda_fixa_positions")
+
+    doc_id = gateway.add_document("passivos", {"nome": "A"})
+    gateway.list_documents("passivos")
+    gateway.get_document("renda_fixa_positions", "missing")
+    assert versions.get("passivos") == 1
+    assert versions.get("renda_fixa_positions") == 0
+
+    gateway.update_document("passivos", doc_id, {"nome": "B"})
+    gateway.add_documents("passivos", [(None, {"nome": "C"})])
+    with pytest.raises(DocumentNotFoundError):
+        gateway.delete_document("passivos", "missing", must_exist=True)
+    assert versions.get("passivos") == 4
+    assert versions.tag("passivos", "renda_fixa_positions") != initial
+
+
+def test_collection_versions_are_shared_through_the_datastore(tmp_path) -> None:
+    # Two processes (e.g. the server and a CLI command) on one database.
+    path = str(tmp_path / "app.sqlite3")
+    server = CollectionVersions(SqliteGateway(path))
+    cli = VersionedGateway(SqliteGateway(path), CollectionVersions(SqliteGateway(path)))
+    before = server.tag("passivos")
+
+    cli.add_document("passivos", {"nome": "A"})
+
+    assert server.get("passivos") == 1
+    assert server.tag("passivos") != before
+
+
+def test_trusted_reads_hydrate_in_bulk_like_model_validate() -> None:
+    gateway = InMemoryGateway()
+    repo = RendaVariavelPositionsRepository(gateway)
+    created = repo.create(_sample_position_payload())
+
+    with mock.patch.object(RendaVariavelPosition, "model_validate") as per_document:
+        items = repo.list()
+        per_document.assert_not_called()
+
+    assert items == [created]
+    assert items[0].tipo is RendaVariavelTipo.FII
+    assert repo.get_many([created.id]) == {created.id: created}
+
+
+def test_trusted_reads_still_reject_corrupt_documents_and_service_recovers() -> None:
+    gateway = InMemoryGateway()
+    repo = RendaVariavelPositionsRepository(gateway)
+    created = repo.create(_sample_position_payload())
+    gateway.add_document(RendaVariavelPositionsRepository.COLLECTION, {"ticker": ""}, "corrupt")
+
+    with pytest.raises(ValidationError):
+        repo.list()
+    assert RendaVariavelService(repo).list_positions() == [created]
@@ -0,0 +1,107 @@
+"""Tests for the append-only columnar snapshot store."""
+from __future__ import annotations
+
+import os
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.repositories import DocumentConflictError, RepositoryError, SnapshotStore
+
+COLUNAS = ("fii", "acao_br")
+
+
+def _append(store: SnapshotStore, dia: int, posicoes: dict[str, float]) -> None:
+    valores = list(posicoes.values())
+    store.append(
+        date(2024, 1, dia),
+        list(posicoes),
+        [position_id.upper() for position_id in posicoes],
+        [sum(valores), 0.0],
+        {"quantidade": [1.0] * len(valores), "cotacao": valores, "total_mercado": valores},
+    )
+
+
+def test_store_serves_group_series_over_ranges(tmp_path) -> None:
+    store = SnapshotStore(str(tmp_path), COLUNAS)
+    for dia in (1, 2, 5, 6):
+        _append(store, dia, {"a": float(dia)})
+
+    datas, valores = store.serie_grupos(date(2024, 1, 2), date(2024, 1, 5))
+
+    assert datas == [date(2024, 1, 2), date(2024, 1, 5)]
+    np.testing.assert_array_equal(valores, [[2.0, 0.0], [5.0, 0.0]])
+    assert store.serie_grupos(date(2024, 1, 3), date(2024, 1, 4))[0] == []
+    assert len(store.serie_grupos()[0]) == 4
+
+
+def test_store_serves_position_series_across_days(tmp_path) -> None:
+    store = SnapshotStore(str(tmp_path), COLUNAS)
+    _append(store, 1, {"a": 10.0})
+    _append(store, 2, {"a": 11.0, "b": 20.0})
+    _append(store, 3, {"b": 21.0})
+    _append(store, 4, {"b": 22.0, "a": 12.0})
+
+    datas, valores = store.serie_posicao("a", date(2024, 1, 2))
+
+    assert datas == [date(2024, 1, 2), date(2024, 1, 4)]
+    assert valores["total_mercado"].tolist() == [11.0, 12.0]
+    assert store.ticker("b") == "B"
+    assert store.serie_posicao("c")[0] == []
+
+
+def test_store_only_appends_later_days(tmp_path) -> None:
+    store = SnapshotStore(str(tmp_path), COLUNAS)
+    _append(store, 2, {"a": 1.0})
+
+    with pytest.raises(DocumentConflictError):
+        _append(store, 2, {"a": 1.0})
+    with pytest.raises(DocumentConflictError):
+        _append(store, 1, {"a": 1.0})
+
+
+def test_store_reopens_and_drops_interrupted_append(tmp_path) -> None:
+    store = SnapshotStore(str(tmp_path), COLUNAS)
+    _append(store, 1, {"a": 1.0, "b": 2.0})
+    _append(store, 2, {"a": 3.0})
+    # A crash after the value columns but before ``datas`` leaves a tail.
+    with open(tmp_path / "total_mercado.bin", "ab") as handle:
+        np.array([99.0]).tofile(handle)
+    with open(tmp_path / "posicao.bin", "ab") as handle:
+        np.array([0], dtype=np.int32).tofile(handle)
+
+    reopened = SnapshotStore(str(tmp_path), COLUNAS)
+    _append(reopened, 3, {"a": 4.0})
+
+    assert len(reopened) == 3
+    assert reopened.ultimo_dia() == date(2024, 1, 3)
+    assert reopened.serie_posicao("a")[1]["total_mercado"].tolist() == [1.0, 3.0, 4.0]
+    assert os.path.getsize(tmp_path / "total_mercado.bin") == 4 * 8
+
+
+def test_store_rejects_different_columns(tmp_path) -> None:
+    _append(SnapshotStore(str(tmp_path), COLUNAS), 1, {"a": 1.0})
+
+    with pytest.raises(RepositoryError):
+        SnapshotStore(str(tmp_path), ("fii",))
+
+
+def test_stores_sharing_a_directory_see_each_others_appends(tmp_path) -> None:
+    # e.g. a web worker and the ``registrar-snapshot`` CLI in another process.
+    servidor = SnapshotStore(str(tmp_path), COLUNAS)
+    cli = SnapshotStore(str(tmp_path), COLUNAS)
+    _append(servidor, 1, {"p1": 1.0})
+    _append(cli, 2, {"p2": 2.0})
+
+    _append(servidor, 3, {"p1": 3.0, "p3": 4.0})
+
+    assert len(servidor) == 3
+    assert servidor.ticker("p1") == "P1"
+    assert servidor.ticker("p2") == "P2"
+    assert cli.ticker("p3") == "P3"
+    assert cli.serie_posicao("p1")[1]["total_mercado"].tolist() == [1.0, 3.0]
+    datas, valores = cli.serie_posicao("p2")
+    assert datas == [date(2024, 1, 2)] and valores["total_mercado"].tolist() == [2.0]
+    with pytest.raises(DocumentConflictError):
+        _append(cli, 3, {"p1": 1.0})
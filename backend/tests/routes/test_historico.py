@@ -0,0 +1,74 @@
+"""Route-level tests for the snapshot history endpoints."""
+from __future__ import annotations
+
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture()
+def historico_app(monkeypatch, tmp_path):
+    monkeypatch.setenv("SNAPSHOTS_DIR", str(tmp_path / "snapshots"))
+    return create_app("testing")
+
+
+def _snapshot(app, dia: str) -> None:
+    result = app.test_cli_runner().invoke(args=["registrar-snapshot", "--data", dia])
+    assert result.exit_code == 0, result.output
+
+
+def test_historico_serves_series_over_a_date_range(historico_app) -> None:
+    client = historico_app.test_client()
+    created = client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 10.0},
+    ).get_json()["item"]
+    client.post(
+        "/renda-variavel/stocks",
+        json={"ticker": "AAPL", "quantidade": 2, "preco_medio": 100.0, "cotacao_atual": 150.0},
+    )
+    _snapshot(historico_app, "2024-03-01")
+    client.patch("/renda-variavel/cotacoes", json={"HGLG11": 12.0})
+    _snapshot(historico_app, "2024-03-02")
+    client.patch("/renda-variavel/cotacoes", json={"HGLG11": 11.0})
+    _snapshot(historico_app, "2024-03-03")
+
+    response = client.get("/historico?inicio=2024-03-02")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["datas"] == ["2024-03-02", "2024-03-03"]
+    assert body["tipos"]["fii"] == [pytest.approx(120.0), pytest.approx(110.0)]
+    assert body["tipos"]["stock_us"] == [pytest.approx(300.0), pytest.approx(300.0)]
+    assert body["patrimonio"] == {
+        "brl": [pytest.approx(120.0), pytest.approx(110.0)],
+        "usd": [pytest.approx(300.0), pytest.approx(300.0)],
+    }
+
+    posicao = client.get(f"/historico/posicoes/{created['id']}?fim=2024-03-02").get_json()
+    assert posicao["ticker"] == "HGLG11"
+    assert posicao["datas"] == ["2024-03-01", "2024-03-02"]
+    assert posicao["cotacao"] == [10.0, 12.0]
+
+
+def test_registrar_snapshot_is_once_per_day(historico_app) -> None:
+    _snapshot(historico_app, "2024-03-01")
+
+    result = historico_app.test_cli_runner().invoke(
+        args=["registrar-snapshot", "--data", "2024-03-01"]
+    )
+
+    assert "snapshot ja registrado" in result.output
+    assert historico_app.test_client().get("/historico").get_json()["datas"] == ["2024-03-01"]
+
+
+def test_historico_validates_ranges_and_positions(historico_app) -> None:
+    client = historico_app.test_client()
+
+    assert client.get("/historico?inicio=ontem").status_code == 400
+    assert client.get("/historico?inicio=2024-03-02&fim=2024-03-01").status_code == 400
+    assert client.get("/historico/posicoes/desconhecida").status_code == 404
+
+
+def test_historico_requires_a_snapshots_dir(client) -> None:
+    assert client.get("/historico").status_code == 503
@@ -0,0 +1,31 @@
+"""Route-level tests for the home blueprint."""
+from __future__ import annotations
+
+
+def test_index_returns_heartbeat(client) -> None:
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok"}
+
+
+def test_metrics_exposes_gateway_round_trips(client) -> None:
+    client.post("/passivos", json={"nome": "Financiamento", "categoria": "financiamento"})
+    client.get("/passivos")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert 'gateway_operations_total{operation="list_documents",collection="passivos"} 1' in body
+    assert "# TYPE gateway_operation_duration_seconds histogram" in body
+
+
+def test_metrics_returns_404_when_disabled(monkeypatch) -> None:
+    from app import create_app
+
+    monkeypatch.setenv("GATEWAY_METRICS_ENABLED", "false")
+    client = create_app("testing").test_client()
+
+    assert client.get("/metrics").status_code == 404
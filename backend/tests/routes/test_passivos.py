@@ -5,6 +5,7 @@ from typing import Any
 
 import pytest
 
+from app import create_app
 from app.models import Passivo, PassivoCategoria
 
 
@@ -14,7 +15,7 @@ class StubPassivosRepository:
     def __init__(self) -> None:
         self._items: list[Passivo] = []
 
-    def list(self) -> list[Passivo]:
+    def list(self, fields: list[str] | None = None) -> list[Passivo]:
         return list(self._items)
 
     def create(self, payload: dict[str, Any]) -> Passivo:
@@ -110,3 +111,70 @@ def test_passivos_endpoints_use_tinydb_gateway_when_not_stubbed(client) -> None:
     items = list_response.get_json()["items"]
     assert len(items) == 1
     assert items[0]["nome"] == "Consorcio"
+
+
+def test_list_passivos_paginates_with_cursor(client) -> None:
+    for nome in ("A", "B", "C"):
+        client.post("/passivos", json={"nome": nome, "categoria": "outros", "saldo_atual": 1.0})
+
+    first = client.get("/passivos?limit=2").get_json()
+    assert len(first["items"]) == 2
+    assert first["next_cursor"] == first["items"][-1]["id"]
+
+    second = client.get(f"/passivos?limit=2&cursor={first['next_cursor']}").get_json()
+    assert len(second["items"]) == 1
+    assert second["next_cursor"] is None
+
+    nomes = {item["nome"] for item in first["items"] + second["items"]}
+    assert nomes == {"A", "B", "C"}
+
+
+def test_list_passivos_rejects_invalid_limit(client) -> None:
+    response = client.get("/passivos?limit=0")
+
+    assert response.status_code == 400
+    assert "limit" in response.get_json()["error"]
+
+
+def test_list_passivos_revalidates_with_etag(app, client) -> None:
+    first = client.get("/passivos")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    metrics = app.extensions["gateway_metrics"]
+    before = metrics.snapshot()
+
+    cached = client.get("/passivos", headers={"If-None-Match": etag})
+
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.get_data() == b""
+    calls = {
+        key: values["calls"] - before.get(key, {"calls": 0})["calls"]
+        for key, values in metrics.snapshot().items()
+    }
+    # Only the version counters behind the tag are read.
+    assert {key: count for key, count in calls.items() if count} == {("get_documents", "versoes"): 1}
+
+    client.post(
+        "/passivos", json={"nome": "Cartao", "categoria": "cartao", "saldo_atual": 10.0}
+    )
+    changed = client.get("/passivos", headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [item["nome"] for item in changed.get_json()["items"]] == ["Cartao"]
+
+
+def test_list_passivos_etag_changes_after_writes_from_another_process(monkeypatch, tmp_path) -> None:
+    monkeypatch.setenv("DATA_BACKEND", "sqlite")
+    monkeypatch.setenv("SQLITE_FILE", str(tmp_path / "app.sqlite3"))
+    server = create_app("testing").test_client()
+    # A second app on the same database, as a CLI command or another worker.
+    other = create_app("testing").test_client()
+    etag = server.get("/passivos").headers["ETag"]
+
+    other.post("/passivos", json={"nome": "Cartao", "categoria": "cartao", "saldo_atual": 10.0})
+    changed = server.get("/passivos", headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert [item["nome"] for item in changed.get_json()["items"]] == ["Cartao"]
@@ -16,7 +16,7 @@ class StubRendaFixaRepository:
     def __init__(self) -> None:
         self._items: dict[str, RendaFixaPosition] = {}
 
-    def list(self) -> list[RendaFixaPosition]:
+    def list(self, fields: list[str] | None = None) -> list[RendaFixaPosition]:
         return list(self._items.values())
 
     def create(self, payload: dict[str, Any]) -> RendaFixaPosition:
@@ -26,6 +26,11 @@ class StubRendaFixaRepository:
         self._items[next_id] = position
         return position
 
+    def get(self, position_id: str) -> RendaFixaPosition:
+        if position_id not in self._items:
+            raise DocumentNotFoundError("position not found")
+        return self._items[position_id]
+
     def update(self, position_id: str, payload: dict[str, Any]) -> RendaFixaPosition:
         if position_id not in self._items:
             raise DocumentNotFoundError("position not found")
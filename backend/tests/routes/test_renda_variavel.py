@@ -1,13 +1,18 @@
 """Route-level tests for renda variavel endpoints."""
 from __future__ import annotations
 
+import csv
+import io
+import json
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable
 
 import pytest
 
+from app import create_app
 from app.models import RendaVariavelPosition, RendaVariavelTipo, RendaVariavelTrade
-from app.repositories import DocumentNotFoundError
+from app.repositories import DocumentNotFoundError, PersistenceLayerError
+from app.routes import unit_of_work
 
 
 class StubPositionsRepository:
@@ -16,9 +21,19 @@ class StubPositionsRepository:
     def __init__(self) -> None:
         self._items: dict[str, RendaVariavelPosition] = {}
 
-    def list(self) -> list[RendaVariavelPosition]:
+    def list(self, fields: list[str] | None = None) -> list[RendaVariavelPosition]:
         return list(self._items.values())
 
+    def list_by_tipo(
+        self, tipo: RendaVariavelTipo, fields: list[str] | None = None
+    ) -> list[RendaVariavelPosition]:
+        return [item for item in self._items.values() if item.tipo is tipo]
+
+    async def alist_by_tipo(
+        self, tipo: RendaVariavelTipo, fields: list[str] | None = None
+    ) -> list[RendaVariavelPosition]:
+        return self.list_by_tipo(tipo, fields)
+
     def create(self, payload: dict[str, Any]) -> RendaVariavelPosition:
         next_id = f"position-{len(self._items) + 1}"
         data = dict(payload, id=next_id)
@@ -38,12 +53,18 @@ class StubPositionsRepository:
         self._items[position_id] = position
         return position
 
+    def update_many(self, payloads: dict[str, dict[str, Any]]) -> list[RendaVariavelPosition]:
+        return [self.update(position_id, payload) for position_id, payload in payloads.items()]
+
     def get(self, position_id: str) -> RendaVariavelPosition:
         try:
             return self._items[position_id]
         except KeyError as exc:  # pragma: no cover - defensive
             raise DocumentNotFoundError("position not found") from exc
 
+    async def aget(self, position_id: str) -> RendaVariavelPosition:
+        return self.get(position_id)
+
     def delete(self, position_id: str) -> None:
         if position_id not in self._items:
             raise DocumentNotFoundError("position not found")
@@ -69,6 +90,9 @@ class StubTradesRepository:
     def list_by_position(self, position_id: str) -> list[RendaVariavelTrade]:
         return [item for item in self._items if item.position_id == position_id]
 
+    async def alist_by_position(self, position_id: str) -> list[RendaVariavelTrade]:
+        return self.list_by_position(position_id)
+
     def create(self, payload: dict[str, Any]) -> RendaVariavelTrade:
         data = dict(payload, id=f"trade-{len(self._items) + 1}")
         trade = RendaVariavelTrade.model_validate(data)
@@ -136,6 +160,21 @@ def test_list_renda_variavel_returns_grouped_payload(client, stub_positions_repo
     assert [item["ticker"] for item in body["items"]["etf"]] == ["IVVB11"]
 
 
+def test_list_renda_variavel_returns_503_when_datastore_fails(
+    client, stub_positions_repository: StubPositionsRepository
+) -> None:
+    async def failing_list_by_tipo(tipo, fields=None):
+        raise PersistenceLayerError("datastore indisponivel")
+
+    stub_positions_repository.create(_position_payload("HGLG11", RendaVariavelTipo.FII))
+    stub_positions_repository.alist_by_tipo = failing_list_by_tipo  # type: ignore[method-assign]
+
+    response = client.get("/renda-variavel")
+
+    assert response.status_code == 503
+    assert response.get_json() == {"error": "datastore indisponivel"}
+
+
 def test_list_renda_variavel_por_categoria_filters_by_slug(client, stub_positions_repository: StubPositionsRepository) -> None:
     stub_positions_repository.seed(
         [
@@ -250,11 +289,13 @@ def test_recalculate_pesos_after_new_position(
 
     assert response.status_code == 201
 
-    items = {item.ticker: item for item in stub_positions_repository.list()}
-    total = sum(item.total_mercado for item in items.values())
-    assert total == pytest.approx(5500.0)
-    assert items["ITUB4"].peso_percentual == pytest.approx(3000.0 / total * 100)
-    assert items["BBDC4"].peso_percentual == pytest.approx(2500.0 / total * 100)
+    assert response.get_json()["item"]["peso_percentual"] == pytest.approx(2500.0 / 5500.0 * 100)
+    listed = client.get("/renda-variavel/acoes").get_json()["items"]
+    items = {item["ticker"]: item for item in listed}
+    assert items["ITUB4"]["peso_percentual"] == pytest.approx(3000.0 / 5500.0 * 100)
+    assert items["BBDC4"]["peso_percentual"] == pytest.approx(2500.0 / 5500.0 * 100)
+    # Other positions keep their stored peso; it is derived when read.
+    assert stub_positions_repository.get("acao-1").peso_percentual == pytest.approx(100.0)
 
 def test_delete_renda_variavel_recalculates_weights(
     client, stub_positions_repository: StubPositionsRepository
@@ -288,10 +329,10 @@ def test_delete_renda_variavel_recalculates_weights(
 
     assert response.status_code == 204
 
-    remaining = stub_positions_repository.list()
+    remaining = client.get("/renda-variavel/acoes").get_json()["items"]
     assert len(remaining) == 1
-    assert remaining[0].ticker == "ITSA4"
-    assert remaining[0].peso_percentual == pytest.approx(100.0)
+    assert remaining[0]["ticker"] == "ITSA4"
+    assert remaining[0]["peso_percentual"] == pytest.approx(100.0)
 
 
 def test_create_trade_compra_updates_position(
@@ -408,3 +449,536 @@ def test_list_trades_returns_sorted_items(
     items = response.get_json()["items"]
     assert len(items) == 2
     assert items[0]["tipo_operacao"] == "venda"  # latest first
+
+
+def test_create_trade_reads_each_document_once_and_flushes_once(app, client) -> None:
+    created = client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 10.0},
+    ).get_json()["item"]
+    client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "KNRI11", "quantidade": 5, "preco_medio": 10.0, "cotacao_atual": 10.0},
+    )
+    metrics = app.extensions["gateway_metrics"]
+    before = metrics.snapshot()
+
+    response = client.post(
+        f"/renda-variavel/fiis/{created['id']}/transacoes",
+        json={"tipo_operacao": "compra", "quantidade": 10, "cotacao": 10.0},
+    )
+
+    assert response.status_code == 201
+    deltas = {
+        key: (
+            values["calls"] - before.get(key, {"calls": 0})["calls"],
+            values["documents"] - before.get(key, {"documents": 0})["documents"],
+        )
+        for key, values in metrics.snapshot().items()
+    }
+    positions = "renda_variavel_positions"
+    # Only the traded position and the summary document are read and written.
+    assert {key: delta for key, delta in deltas.items() if delta[0]} == {
+        ("get_document", positions): (1, 1),
+        ("get_document", "resumos"): (1, 1),
+        ("update_documents", positions): (1, 1),
+        # The summary delta is re-applied in one atomic read-modify-write.
+        ("transform_document", "resumos"): (1, 1),
+        # One version bump per collection written.
+        ("transform_document", "versoes"): (3, 3),
+        ("add_documents", "renda_variavel_trades"): (1, 1),
+    }
+    fiis = {item["ticker"]: item for item in client.get("/renda-variavel/fiis").get_json()["items"]}
+    assert fiis["HGLG11"]["quantidade"] == 20
+    assert fiis["HGLG11"]["peso_percentual"] == pytest.approx(80.0)
+
+
+def test_list_trades_returns_404_for_missing_position(client) -> None:
+    response = client.get("/renda-variavel/fiis/missing/transacoes")
+
+    assert response.status_code == 404
+    assert response.get_json()["error"] == "position nao encontrada"
+
+
+def test_list_renda_variavel_por_categoria_paginates(client) -> None:
+    for ticker in ("PETR4", "VALE3", "ITUB4"):
+        client.post(
+            "/renda-variavel/acoes",
+            json={"ticker": ticker, "quantidade": 1, "preco_medio": 10.0, "cotacao_atual": 10.0},
+        )
+    client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 1, "preco_medio": 10.0, "cotacao_atual": 10.0},
+    )
+
+    first = client.get("/renda-variavel/acoes?limit=2").get_json()
+    second = client.get(f"/renda-variavel/acoes?limit=2&cursor={first['next_cursor']}").get_json()
+
+    assert len(first["items"]) == 2
+    assert second["next_cursor"] is None
+    tickers = {item["ticker"] for item in first["items"] + second["items"]}
+    assert tickers == {"PETR4", "VALE3", "ITUB4"}
+
+
+def test_list_renda_variavel_por_categoria_page_skips_corrupt_documents(client) -> None:
+    for ticker in ("PETR4", "VALE3"):
+        client.post(
+            "/renda-variavel/acoes",
+            json={"ticker": ticker, "quantidade": 1, "preco_medio": 10.0, "cotacao_atual": 10.0},
+        )
+    gateway = client.application.extensions["data_gateway"]
+    gateway.add_document("renda_variavel_positions", {"tipo": "acao_br", "ticker": ""}, "corrupt")
+
+    response = client.get("/renda-variavel/acoes?limit=5")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert {item["ticker"] for item in body["items"]} == {"PETR4", "VALE3"}
+    assert body["next_cursor"] is None
+
+
+def test_list_trades_paginates_newest_first(client) -> None:
+    created = client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 10.0},
+    ).get_json()["item"]
+    for day in (1, 3, 2):
+        client.post(
+            f"/renda-variavel/fiis/{created['id']}/transacoes",
+            json={
+                "tipo_operacao": "compra",
+                "quantidade": 1,
+                "cotacao": 10.0,
+                "data": f"2024-01-0{day}T12:00:00",
+            },
+        )
+
+    first = client.get(f"/renda-variavel/fiis/{created['id']}/transacoes?limit=2").get_json()
+    second = client.get(
+        f"/renda-variavel/fiis/{created['id']}/transacoes?limit=2&cursor={first['next_cursor']}"
+    ).get_json()
+
+    datas = [item["data"][:10] for item in first["items"] + second["items"]]
+    assert datas == ["2024-01-03", "2024-01-02", "2024-01-01"]
+    assert second["next_cursor"] is None
+
+
+def _seed_ledger(client) -> dict[str, str]:
+    ids: dict[str, str] = {}
+    for categoria, ticker in (("fiis", "HGLG11"), ("acoes", "PETR4")):
+        created = client.post(
+            f"/renda-variavel/{categoria}",
+            json={"ticker": ticker, "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 10.0},
+        ).get_json()["item"]
+        ids[ticker] = created["id"]
+        for day in (1, 2):
+            client.post(
+                f"/renda-variavel/{categoria}/{created['id']}/transacoes",
+                json={
+                    "tipo_operacao": "compra",
+                    "quantidade": 1,
+                    "cotacao": 10.0,
+                    "data": f"2024-02-0{day}T10:00:00",
+                },
+            )
+    return ids
+
+
+def test_export_trades_streams_ndjson_filtered_by_date(client) -> None:
+    _seed_ledger(client)
+
+    response = client.get("/renda-variavel/transacoes/export?inicio=2024-02-02")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(row["ticker"] for row in rows) == ["HGLG11", "PETR4"]
+    assert all(row["data"].startswith("2024-02-02") for row in rows)
+
+
+def test_export_trades_streams_csv_filtered_by_tipo(client) -> None:
+    ids = _seed_ledger(client)
+
+    response = client.get("/renda-variavel/transacoes/export?format=csv&tipo=fiis")
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 2
+    assert {row["position_id"] for row in rows} == {ids["HGLG11"]}
+    assert [row["data"][:10] for row in rows] == ["2024-02-01", "2024-02-02"]
+
+
+def test_export_trades_rejects_unknown_format(client) -> None:
+    response = client.get("/renda-variavel/transacoes/export?format=xml")
+
+    assert response.status_code == 400
+
+
+def test_list_renda_variavel_fields_limits_payload(client) -> None:
+    client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 12.0},
+    )
+
+    grouped = client.get("/renda-variavel?fields=ticker,total_mercado").get_json()
+    por_categoria = client.get("/renda-variavel/fiis?fields=ticker,peso_percentual").get_json()
+
+    [item] = grouped["items"]["fiis"]
+    assert set(item) == {"id", "ticker", "total_mercado"}
+    assert item["total_mercado"] == pytest.approx(120.0)
+    assert set(por_categoria["items"][0]) == {"id", "ticker", "peso_percentual"}
+
+
+def test_list_renda_variavel_rejects_unknown_fields(client) -> None:
+    response = client.get("/renda-variavel/fiis?fields=ticker,segredo")
+
+    assert response.status_code == 400
+    assert "segredo" in response.get_json()["error"]
+
+
+def test_list_renda_variavel_answers_304_until_positions_change(client) -> None:
+    first = client.get("/renda-variavel")
+    etag = first.headers["ETag"]
+
+    assert client.get("/renda-variavel", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/renda-variavel/fiis", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 12.0},
+    )
+    changed = client.get("/renda-variavel", headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert [item["ticker"] for item in changed.get_json()["items"]["fiis"]] == ["HGLG11"]
+
+
+
+def test_list_renda_variavel_etag_changes_after_writes_outside_requests(app, client, tmp_path) -> None:
+    etag = client.get("/renda-variavel").headers["ETag"]
+    arquivo = tmp_path / "notas.csv"
+    arquivo.write_text(
+        "ticker,tipo,tipo_operacao,quantidade,cotacao,data\nHGLG11,fii,compra,10,12,2024-01-10\n",
+        encoding="utf-8",
+    )
+
+    result = app.test_cli_runner().invoke(args=["importar-transacoes", str(arquivo)])
+    changed = client.get("/renda-variavel", headers={"If-None-Match": etag})
+
+    assert result.exit_code == 0, result.output
+    assert changed.status_code == 200
+    assert [item["ticker"] for item in changed.get_json()["items"]["fiis"]] == ["HGLG11"]
+
+
+def test_back_dated_trade_and_recompute_rebuild_position_from_ledger(client) -> None:
+    created = client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 20.0, "cotacao_atual": 25.0},
+    ).get_json()["item"]
+    url = f"/renda-variavel/fiis/{created['id']}"
+    client.post(
+        f"{url}/transacoes",
+        json={"tipo_operacao": "venda", "quantidade": 5, "cotacao": 30.0, "data": "2024-03-01T00:00:00"},
+    )
+
+    response = client.post(
+        f"{url}/transacoes",
+        json={"tipo_operacao": "compra", "quantidade": 10, "cotacao": 5.0, "data": "2024-02-01T00:00:00"},
+    )
+
+    assert response.status_code == 201
+    position = response.get_json()["position"]
+    # The sale now happens after the back-dated buy, at an average of 12.5.
+    assert position["quantidade"] == pytest.approx(15.0)
+    assert position["preco_medio"] == pytest.approx(12.5)
+
+    recomputed = client.post("/renda-variavel/recalcular")
+    rebuilt = client.post(f"{url}/recalcular?desde=2024-02-15T00:00:00")
+
+    assert recomputed.get_json() == {"atualizadas": 1, "erros": {}}
+    assert rebuilt.status_code == 200
+    assert rebuilt.get_json()["item"]["total_compra"] == pytest.approx(187.5)
+    assert client.post(f"{url}/recalcular?desde=ontem").status_code == 400
+
+
+
+def test_naive_back_dated_trade_is_read_as_utc(client) -> None:
+    created = client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 20.0, "cotacao_atual": 25.0},
+    ).get_json()["item"]
+    url = f"/renda-variavel/fiis/{created['id']}"
+    # Dated by the server, with a time zone.
+    client.post(f"{url}/transacoes", json={"tipo_operacao": "venda", "quantidade": 5, "cotacao": 30.0})
+
+    response = client.post(
+        f"{url}/transacoes",
+        json={"tipo_operacao": "compra", "quantidade": 10, "cotacao": 5.0, "data": "2024-01-01T00:00:00"},
+    )
+
+    assert response.status_code == 201
+    assert response.get_json()["item"]["data"].startswith("2024-01-01T00:00:00")
+    assert response.get_json()["position"]["quantidade"] == pytest.approx(15.0)
+    assert client.post(f"{url}/recalcular?desde=2023-12-01T00:00:00").status_code == 200
+
+
+_NOTAS_CSV = """ticker;tipo;tipo_operacao;quantidade;cotacao;data
+knri11;fii;compra;10;100;2024-01-10T00:00:00
+KNRI11;;venda;4;120;2024-02-10T00:00:00
+HGLG11;;compra;5;20;2024-03-01T00:00:00
+KNRI11;;compra;2;90;2024-01-20T00:00:00
+"""
+
+
+def test_import_trades_applies_csv_with_batched_writes(app, client) -> None:
+    client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 15.0},
+    )
+    metrics = app.extensions["gateway_metrics"]
+    before = metrics.snapshot()
+
+    response = client.post(
+        "/renda-variavel/transacoes/importar", data=_NOTAS_CSV, content_type="text/csv"
+    )
+
+    assert response.status_code == 201
+    assert response.get_json() == {"transacoes": 4, "posicoes": 2, "criadas": 1, "reprocessadas": 0}
+    writes = {
+        key: (
+            values["calls"] - before.get(key, {"calls": 0})["calls"],
+            values["documents"] - before.get(key, {"documents": 0})["documents"],
+        )
+        for key, values in metrics.snapshot().items()
+        if key[0] in {"add_document", "add_documents", "update_document", "transform_document"}
+    }
+    # One batch per collection: a created and an updated position, 4 trades.
+    assert {key: delta for key, delta in writes.items() if delta[0]} == {
+        ("add_documents", "renda_variavel_positions"): (1, 2),
+        ("add_documents", "renda_variavel_trades"): (1, 4),
+        ("transform_document", "resumos"): (1, 1),
+        # One version bump per collection written.
+        ("transform_document", "versoes"): (3, 3),
+    }
+
+    items = {item["ticker"]: item for item in client.get("/renda-variavel").get_json()["items"]["fiis"]}
+    # KNRI11: 10 @ 100 and 2 @ 90 (sorted by date), then 4 sold at 98.33.
+    assert items["KNRI11"]["quantidade"] == pytest.approx(8.0)
+    assert items["KNRI11"]["total_compra"] == pytest.approx(1180.0 * 8 / 12)
+    assert items["HGLG11"]["quantidade"] == pytest.approx(15.0)
+    assert items["HGLG11"]["cotacao_atual"] == pytest.approx(15.0)
+    assert items["HGLG11"]["peso_percentual"] + items["KNRI11"]["peso_percentual"] == pytest.approx(100.0)
+
+
+def test_import_trades_rejects_file_with_invalid_rows(client) -> None:
+    response = client.post(
+        "/renda-variavel/transacoes/importar",
+        data="ticker,tipo_operacao,quantidade,cotacao,data\n"
+        "PETR4,compra,10,30,2024-01-01T00:00:00\n"
+        "VALE3,doacao,1,1,2024-01-01T00:00:00\n",
+        content_type="text/csv",
+    )
+
+    assert response.status_code == 400
+    erros = response.get_json()["errors"]
+    assert [erro["linha"] for erro in erros] == [2, 3]
+    assert erros[0]["error"] == "tipo obrigatorio para o novo ativo PETR4"
+    assert client.get("/renda-variavel").get_json()["items"]["acoes"] == []
+
+
+def test_import_trades_replays_back_dated_positions(client) -> None:
+    created = client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "KNRI11", "quantidade": 10, "preco_medio": 20.0, "cotacao_atual": 25.0},
+    ).get_json()["item"]
+    client.post(
+        f"/renda-variavel/fiis/{created['id']}/transacoes",
+        json={"tipo_operacao": "venda", "quantidade": 5, "cotacao": 30.0, "data": "2024-03-01T00:00:00"},
+    )
+
+    response = client.post(
+        "/renda-variavel/transacoes/importar",
+        data={"arquivo": (io.BytesIO(b"ticker,tipo_operacao,quantidade,cotacao,data\n" b"KNRI11,compra,10,5,2024-02-01\n"), "notas.csv")},
+        content_type="multipart/form-data",
+    )
+
+    assert response.get_json()["reprocessadas"] == 1
+    [position] = client.get("/renda-variavel/fiis").get_json()["items"]
+    assert position["quantidade"] == pytest.approx(15.0)
+    assert position["preco_medio"] == pytest.approx(12.5)
+
+
+
+def test_import_trades_accepts_dates_with_and_without_time_zone(client) -> None:
+    response = client.post(
+        "/renda-variavel/transacoes/importar",
+        data="ticker,tipo,tipo_operacao,quantidade,cotacao,data\n"
+        "KNRI11,fii,compra,10,100,2024-01-15\n"
+        "KNRI11,,compra,2,90,2024-01-10T12:00:00-03:00\n"
+        "KNRI11,,venda,4,120,2024-01-20T00:00:00Z\n",
+        content_type="text/csv",
+    )
+
+    assert response.status_code == 201
+    [position] = client.get("/renda-variavel/fiis").get_json()["items"]
+    assert position["quantidade"] == pytest.approx(8.0)
+
+
+def test_import_trades_writes_nothing_when_a_back_dated_replay_fails(client) -> None:
+    ids = {}
+    for ticker in ("KNRI11", "HGLG11"):
+        created = client.post(
+            "/renda-variavel/fiis",
+            json={"ticker": ticker, "quantidade": 10, "preco_medio": 20.0, "cotacao_atual": 25.0},
+        ).get_json()["item"]
+        ids[ticker] = created["id"]
+        client.post(
+            f"/renda-variavel/fiis/{created['id']}/transacoes",
+            json={"tipo_operacao": "venda", "quantidade": 5, "cotacao": 30.0, "data": "2024-03-01T00:00:00"},
+        )
+
+    response = client.post(
+        "/renda-variavel/transacoes/importar",
+        # KNRI11 replays fine; HGLG11 would sell more than it holds.
+        data="ticker,tipo_operacao,quantidade,cotacao,data\n"
+        "KNRI11,compra,10,5,2024-02-01\n"
+        "HGLG11,venda,8,30,2024-02-01\n",
+        content_type="text/csv",
+    )
+
+    assert response.status_code == 400
+    assert [erro["ticker"] for erro in response.get_json()["errors"]] == ["HGLG11"]
+    for position_id in ids.values():
+        trades = client.get(f"/renda-variavel/fiis/{position_id}/transacoes").get_json()["items"]
+        assert len(trades) == 1
+    items = client.get("/renda-variavel/fiis").get_json()["items"]
+    assert [item["quantidade"] for item in items] == [pytest.approx(5.0)] * 2
+
+
+def test_importar_transacoes_command(app, tmp_path) -> None:
+    arquivo = tmp_path / "notas.csv"
+    arquivo.write_text(_NOTAS_CSV.replace("HGLG11;;", "HGLG11;fii;"), encoding="utf-8")
+
+    result = app.test_cli_runner().invoke(args=["importar-transacoes", str(arquivo)])
+
+    assert result.exit_code == 0, result.output
+    assert "4 transacoes importadas em 2 posicoes (2 criadas" in result.output
+
+
+def test_update_quotes_writes_changed_positions_in_one_batch(app, client) -> None:
+    for ticker, cotacao in (("HGLG11", 10.0), ("KNRI11", 20.0), ("XPLG11", 30.0)):
+        client.post(
+            "/renda-variavel/fiis",
+            json={"ticker": ticker, "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": cotacao},
+        )
+    metrics = app.extensions["gateway_metrics"]
+    before = metrics.snapshot()
+
+    response = client.patch(
+        "/renda-variavel/cotacoes", json={"hglg11": 15.0, "KNRI11": 20.0, "MXRF11": 9.0}
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {"atualizadas": 1, "inalteradas": 1, "nao_encontradas": ["MXRF11"]}
+    writes = {
+        key: values["documents"] - before.get(key, {"documents": 0})["documents"]
+        for key, values in metrics.snapshot().items()
+        if key[0] in {"add_documents", "update_documents", "transform_document"}
+    }
+    # Only HGLG11 changed; the summary is written once for the batch.
+    assert {key: count for key, count in writes.items() if count} == {
+        ("update_documents", "renda_variavel_positions"): 1,
+        ("transform_document", "resumos"): 1,
+        # One version bump per collection written.
+        ("transform_document", "versoes"): 2,
+    }
+
+    items = {item["ticker"]: item for item in client.get("/renda-variavel/fiis").get_json()["items"]}
+    assert items["HGLG11"]["cotacao_atual"] == 15.0
+    assert items["HGLG11"]["total_mercado"] == pytest.approx(150.0)
+    assert items["HGLG11"]["resultado_monetario"] == pytest.approx(50.0)
+    assert items["HGLG11"]["performance_percentual"] == pytest.approx(50.0)
+    assert items["HGLG11"]["peso_percentual"] == pytest.approx(150.0 / 650.0 * 100)
+
+
+def test_update_quotes_rejects_non_positive_quotes(client) -> None:
+    response = client.patch("/renda-variavel/cotacoes", json={"HGLG11": 0})
+
+    assert response.status_code == 400
+    assert client.patch("/renda-variavel/cotacoes", json=["HGLG11"]).status_code == 400
+
+
+def test_atualizar_cotacoes_cli_refreshes_from_quotes_file(monkeypatch, tmp_path) -> None:
+    arquivo = tmp_path / "cotacoes.json"
+    arquivo.write_text('{"HGLG11": 15.0, "PETR4": 40.0}', encoding="utf-8")
+    monkeypatch.setenv("QUOTE_PROVIDER", "local")
+    monkeypatch.setenv("QUOTES_FILE", str(arquivo))
+    app = create_app("testing")
+    client = app.test_client()
+    for ticker in ("HGLG11", "KNRI11"):
+        client.post(
+            "/renda-variavel/fiis",
+            json={"ticker": ticker, "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 10.0},
+        )
+
+    result = app.test_cli_runner().invoke(args=["atualizar-cotacoes"])
+
+    assert result.exit_code == 0, result.output
+    assert "1 cotacoes atualizadas, 0 inalteradas" in result.output
+    items = {item["ticker"]: item for item in client.get("/renda-variavel/fiis").get_json()["items"]}
+    assert items["HGLG11"]["cotacao_atual"] == 15.0
+    assert items["KNRI11"]["cotacao_atual"] == 10.0
+
+
+def test_atualizar_cotacoes_cli_requires_a_provider(app) -> None:
+    result = app.test_cli_runner().invoke(args=["atualizar-cotacoes"])
+
+    assert result.exit_code != 0
+    assert "nenhum provedor de cotacoes configurado" in result.output
+
+
+class QuoteRaceGateway:
+    """Gateway double running ``during`` before the first batch of field updates."""
+
+    def __init__(self, gateway: Any, during: Callable[[], None]) -> None:
+        self._gateway = gateway
+        self._during: Callable[[], None] | None = during
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._gateway, name)
+
+    def update_documents(self, collection: str, documents: list[tuple[str, Any]]) -> list[str]:
+        if self._during is not None:
+            during, self._during = self._during, None
+            during()
+        return self._gateway.update_documents(collection, documents)
+
+
+def test_update_quotes_keeps_concurrent_position_writes(app, client) -> None:
+    ids = {}
+    for ticker in ("HGLG11", "KNRI11"):
+        ids[ticker] = client.post(
+            "/renda-variavel/fiis",
+            json={"ticker": ticker, "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 10.0},
+        ).get_json()["item"]["id"]
+    data_gateway = app.extensions["data_gateway"]
+
+    def concurrent_writes() -> None:
+        # A trade lands on HGLG11 and KNRI11 is deleted after the positions were read.
+        data_gateway.update_document(
+            "renda_variavel_positions", ids["HGLG11"], {"quantidade": 20, "total_compra": 200.0}
+        )
+        data_gateway.delete_document("renda_variavel_positions", ids["KNRI11"])
+
+    gateway = QuoteRaceGateway(data_gateway, concurrent_writes)
+    app.config["DATA_GATEWAY_FACTORY"] = lambda: unit_of_work.request_gateway(gateway)
+
+    response = client.patch("/renda-variavel/cotacoes", json={"HGLG11": 15.0, "KNRI11": 12.0})
+
+    assert response.status_code == 200
+    assert response.get_json()["atualizadas"] == 1
+    stored = data_gateway.list_documents("renda_variavel_positions")
+    assert [item["ticker"] for item in stored] == ["HGLG11"]
+    assert (stored[0]["quantidade"], stored[0]["total_compra"]) == (20, 200.0)
+    assert stored[0]["cotacao_atual"] == 15.0
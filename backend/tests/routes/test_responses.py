@@ -0,0 +1,64 @@
+"""Tests for the pydantic-core JSON provider and response helper."""
+from __future__ import annotations
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from flask import jsonify
+
+from app.models import Passivo, PassivoCategoria
+from app.repositories.base import projection_model
+from app.routes.responses import PydanticJSONProvider, json_response
+
+
+def _passivo(index: int) -> Passivo:
+    return Passivo(
+        id=f"passivo-{index}",
+        nome=f"Emprestimo {index}",
+        categoria=PassivoCategoria.EMPRESTIMO,
+        saldo_atual=1000.0 * index,
+        vencimento=datetime(2030, 1, index),
+    )
+
+
+def test_app_uses_pydantic_json_provider(app) -> None:
+    assert isinstance(app.json, PydanticJSONProvider)
+
+
+def test_json_response_matches_model_dump(app) -> None:
+    items = [_passivo(1), _passivo(2)]
+
+    with app.test_request_context():
+        response = json_response({"items": items, "next_cursor": None}, 201)
+
+    assert response.status_code == 201
+    assert response.mimetype == "application/json"
+    assert json.loads(response.get_data()) == {
+        "items": [item.model_dump(mode="json") for item in items],
+        "next_cursor": None,
+    }
+
+
+def test_json_response_serialises_projections_without_extra_fields(app) -> None:
+    model = projection_model(Passivo, ("nome",))
+    item = model.model_validate({"id": "passivo-1", "nome": "Cartao"})
+
+    with app.test_request_context():
+        response = json_response({"items": [item]})
+
+    assert response.get_json() == {"items": [{"id": "passivo-1", "nome": "Cartao"}]}
+
+
+def test_jsonify_accepts_models_and_stdlib_fallbacks(app) -> None:
+    with app.test_request_context():
+        response = jsonify(
+            item=_passivo(3),
+            total=Decimal("1.50"),
+            gerado_em=datetime(2024, 1, 2, 3, 4, 5),
+        )
+
+    body = response.get_json()
+    assert body["item"]["vencimento"] == "2030-01-03T00:00:00"
+    assert body["total"] == "1.50"
+    assert body["gerado_em"] == "2024-01-02T03:04:05"
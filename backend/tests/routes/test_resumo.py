@@ -0,0 +1,93 @@
+"""Tests for the portfolio summary endpoint."""
+from __future__ import annotations
+
+import pytest
+
+
+def _seed(client) -> None:
+    client.post(
+        "/passivos", json={"nome": "Cartao", "categoria": "cartao", "saldo_atual": 150.0}
+    )
+    client.post(
+        "/renda-fixa",
+        json={
+            "ativo": "CDB Banco",
+            "tipo": "cdb",
+            "indexador": "pos_cdi",
+            "rentabilidade_aa": 11.0,
+            "valor": 1000.0,
+            "data_inicio": "2024-01-01T00:00:00",
+            "vencimento": "2027-01-01T00:00:00",
+            "moeda": "BRL",
+        },
+    )
+    client.post(
+        "/renda-variavel/acoes",
+        json={"ticker": "PETR4", "quantidade": 10, "preco_medio": 20.0, "cotacao_atual": 30.0},
+    )
+
+
+def test_get_resumo_returns_summary_per_dominio(client) -> None:
+    _seed(client)
+
+    response = client.get("/resumo")
+
+    assert response.status_code == 200
+    items = response.get_json()["items"]
+    assert list(items) == ["renda_variavel", "renda_fixa", "passivos"]
+    acoes = items["renda_variavel"]["grupos"]["tipo"]["acao_br"]
+    assert acoes["quantidade"] == 1
+    assert acoes["totais"]["total_mercado"] == pytest.approx(300.0)
+    assert acoes["totais"]["total_compra"] == pytest.approx(200.0)
+    assert items["renda_variavel"]["grupos"]["moeda"]["brl"]["quantidade"] == 1
+    assert items["renda_fixa"]["grupos"]["moeda"]["brl"]["totais"] == {"valor": 1000.0}
+    assert items["renda_fixa"]["grupos"]["indexador"]["pos_cdi"]["quantidade"] == 1
+    assert items["passivos"]["grupos"]["categoria"]["cartao"]["totais"] == {"saldo_atual": 150.0}
+
+
+def test_get_resumo_follows_updates_and_deletes(client) -> None:
+    created = client.post(
+        "/passivos", json={"nome": "Cartao", "categoria": "cartao", "saldo_atual": 150.0}
+    ).get_json()["item"]
+    client.put(
+        f"/passivos/{created['id']}",
+        json={"nome": "Cartao", "categoria": "cartao", "saldo_atual": 90.0},
+    )
+    client.post(
+        "/passivos", json={"nome": "Carro", "categoria": "emprestimo", "saldo_atual": 40.0}
+    )
+
+    grupos = client.get("/resumo").get_json()["items"]["passivos"]["grupos"]["categoria"]
+    assert grupos["cartao"]["totais"] == {"saldo_atual": 90.0}
+    assert grupos["emprestimo"]["totais"] == {"saldo_atual": 40.0}
+
+    client.delete(f"/passivos/{created['id']}")
+
+    grupos = client.get("/resumo").get_json()["items"]["passivos"]["grupos"]["categoria"]
+    assert list(grupos) == ["emprestimo"]
+
+
+def test_get_resumo_answers_304_until_a_summary_changes(app, client) -> None:
+    _seed(client)
+    # The first read stores nothing new: every summary was written by the seed.
+    etag = client.get("/resumo").headers["ETag"]
+    metrics = app.extensions["gateway_metrics"]
+    before = metrics.snapshot()
+
+    cached = client.get("/resumo", headers={"If-None-Match": etag})
+
+    assert cached.status_code == 304
+    calls = {
+        key: values["calls"] - before.get(key, {"calls": 0})["calls"]
+        for key, values in metrics.snapshot().items()
+    }
+    # Only the version counters behind the tag are read.
+    assert {key: count for key, count in calls.items() if count} == {("get_documents", "versoes"): 1}
+
+    client.post(
+        "/passivos", json={"nome": "Carro", "categoria": "emprestimo", "saldo_atual": 40.0}
+    )
+    changed = client.get("/resumo", headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
@@ -0,0 +1,102 @@
+"""Route-level tests for the request-scoped unit of work."""
+from __future__ import annotations
+
+from typing import Any, Callable, Mapping, Sequence
+
+from app.repositories import PersistenceLayerError
+from app.routes import unit_of_work
+
+
+class FailingCommitGateway:
+    """Gateway double whose batched writes (used by commits) always fail."""
+
+    def __init__(self, gateway: Any) -> None:
+        self._gateway = gateway
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._gateway, name)
+
+    def add_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str | None, Mapping[str, Any]]],
+        merge: bool = False,
+    ) -> list[str]:
+        raise PersistenceLayerError("datastore indisponivel")
+
+
+def test_failed_commit_returns_service_unavailable(app, client) -> None:
+    gateway = FailingCommitGateway(app.extensions["data_gateway"])
+    app.config["DATA_GATEWAY_FACTORY"] = lambda: unit_of_work.request_gateway(gateway)
+
+    response = client.post(
+        "/passivos",
+        json={"nome": "Financiamento", "categoria": "financiamento", "saldo_atual": 1000.0},
+    )
+
+    assert response.status_code == 503
+    assert response.get_json() == {"error": "datastore indisponivel"}
+
+
+class ConcurrentWriteGateway:
+    """Gateway double running ``during`` once, just before the first field update."""
+
+    def __init__(self, gateway: Any, during: Callable[[], None]) -> None:
+        self._gateway = gateway
+        self._during: Callable[[], None] | None = during
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._gateway, name)
+
+    def update_documents(
+        self,
+        collection: str,
+        documents: Sequence[tuple[str, Mapping[str, Any]]],
+    ) -> list[str]:
+        if self._during is not None:
+            during, self._during = self._during, None
+            during()
+        return self._gateway.update_documents(collection, documents)
+
+
+def test_commit_keeps_fields_written_since_the_request_read_them(app) -> None:
+    data_gateway = app.extensions["data_gateway"]
+    data_gateway.add_document("passivos", {"nome": "Cartao", "saldo_atual": 10.0}, "p1")
+    gateway = ConcurrentWriteGateway(
+        data_gateway,
+        lambda: data_gateway.update_document("passivos", "p1", {"saldo_atual": 25.0}),
+    )
+
+    with app.test_request_context("/"):
+        request = unit_of_work.request_gateway(gateway)
+        request.get_document("passivos", "p1")
+        request.update_document("passivos", "p1", {"nome": "Cartao Visa"})
+        app.process_response(app.response_class())
+
+    assert data_gateway.get_document("passivos", "p1") == {
+        "nome": "Cartao Visa",
+        "saldo_atual": 25.0,
+        "id": "p1",
+    }
+
+
+def test_commit_does_not_recreate_a_position_deleted_since_the_read(app, client) -> None:
+    created = client.post(
+        "/renda-variavel/fiis",
+        json={"ticker": "HGLG11", "quantidade": 10, "preco_medio": 10.0, "cotacao_atual": 10.0},
+    ).get_json()["item"]
+    data_gateway = app.extensions["data_gateway"]
+    gateway = ConcurrentWriteGateway(
+        data_gateway,
+        lambda: data_gateway.delete_document("renda_variavel_positions", created["id"]),
+    )
+    app.config["DATA_GATEWAY_FACTORY"] = lambda: unit_of_work.request_gateway(gateway)
+
+    response = client.post(
+        f"/renda-variavel/fiis/{created['id']}/transacoes",
+        json={"tipo_operacao": "compra", "quantidade": 10, "cotacao": 10.0},
+    )
+
+    assert response.status_code == 409
+    assert data_gateway.get_document("renda_variavel_positions", created["id"]) is None
+    assert data_gateway.list_documents("renda_variavel_trades") == []
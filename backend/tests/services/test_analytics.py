@@ -0,0 +1,105 @@
+"""Tests for the vectorised renda variavel analytics."""
+from __future__ import annotations
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.models import RendaVariavelPosition, RendaVariavelTipo
+from app.services.analytics import (
+    SEM_TIPO,
+    PositionColumns,
+    metricas,
+    pesos,
+    rows,
+    tipo_codes,
+    totais_por_tipo,
+)
+
+
+def _position(ticker: str, tipo: RendaVariavelTipo, quantidade: float, cotacao: float) -> RendaVariavelPosition:
+    return RendaVariavelPosition(
+        id=ticker,
+        ticker=ticker,
+        tipo=tipo,
+        quantidade=quantidade,
+        preco_medio=10.0,
+        cotacao_atual=cotacao,
+        total_compra=0.0,
+        total_mercado=0.0,
+        resultado_monetario=0.0,
+        performance_percentual=0.0,
+        peso_percentual=0.0,
+        peso_desejado_percentual=0.0,
+        atualizado_em=datetime(2024, 1, 1),
+    )
+
+
+def test_metricas_match_scalar_formulas() -> None:
+    derived = metricas([10, 5, 3], [10.0, 0.0, 4.0], [12.0, 7.0, 3.0])
+
+    assert derived["total_compra"].tolist() == [100.0, 0.0, 12.0]
+    assert derived["total_mercado"].tolist() == [120.0, 35.0, 9.0]
+    assert derived["resultado_monetario"].tolist() == [20.0, 35.0, -3.0]
+    # No preco_medio means no performance rather than a division error.
+    assert derived["performance_percentual"].tolist() == pytest.approx([20.0, 0.0, -25.0])
+
+
+def test_metricas_accept_scalars() -> None:
+    derived = metricas(2, 5.0, 6.0)
+
+    assert float(derived["total_mercado"]) == 12.0
+    assert float(derived["performance_percentual"]) == pytest.approx(20.0)
+
+
+def test_pesos_are_relative_to_each_tipo_total() -> None:
+    codes = tipo_codes([RendaVariavelTipo.FII, RendaVariavelTipo.ETF, RendaVariavelTipo.FII, None])
+
+    result = pesos([30.0, 50.0, 90.0, 0.0], codes)
+
+    assert result.tolist() == pytest.approx([25.0, 100.0, 75.0, 0.0])
+    assert codes[-1] == SEM_TIPO
+
+
+def test_pesos_use_the_given_total_and_ignore_non_positive_ones() -> None:
+    assert pesos([10.0, 30.0], total=40.0).tolist() == pytest.approx([25.0, 75.0])
+    assert pesos([10.0, 30.0], total=np.array([0.0, 60.0])).tolist() == [0.0, 50.0]
+    with pytest.raises(ValueError):
+        pesos([1.0])
+
+
+def test_totais_por_tipo_cover_every_tipo() -> None:
+    codes = tipo_codes([RendaVariavelTipo.REIT, RendaVariavelTipo.REIT])
+
+    totals = totais_por_tipo([1.5, 2.5], codes)
+
+    assert totals[codes[0]] == 4.0
+    assert totals.sum() == 4.0
+    assert len(totals) == SEM_TIPO + 1
+
+
+def test_position_columns_refresh_derived_fields_in_bulk() -> None:
+    positions = [
+        _position("KNRI11", RendaVariavelTipo.FII, 10, 15.0),
+        _position("HGLG11", RendaVariavelTipo.FII, 30, 15.0),
+        _position("IVVB11", RendaVariavelTipo.ETF, 2, 5.0),
+    ]
+    columns = PositionColumns.from_positions(positions)
+    derived = columns.metricas()
+    derived["peso_percentual"] = pesos(derived["total_mercado"], columns.codes)
+
+    recomputed = rows(derived)
+
+    assert [item["total_mercado"] for item in recomputed] == [150.0, 450.0, 10.0]
+    assert [item["peso_percentual"] for item in recomputed] == pytest.approx([25.0, 75.0, 100.0])
+    assert recomputed[2]["performance_percentual"] == pytest.approx(-50.0)
+    assert all(type(value) is float for value in recomputed[0].values())
+    assert rows(PositionColumns.from_positions([]).metricas()) == []
+
+
+def test_position_columns_load_each_field_once() -> None:
+    columns = PositionColumns.from_positions([_position("PETR4", RendaVariavelTipo.ACAO_BR, 4, 2.5)])
+
+    assert columns.quantidade.tolist() == [4.0]
+    assert columns.metricas()["total_compra"].tolist() == [40.0]
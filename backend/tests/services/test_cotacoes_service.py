@@ -0,0 +1,251 @@
+"""Tests for quote providers, the concurrent fetcher and the refresher."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Mapping, Sequence
+
+import pytest
+
+from app.models import RendaVariavelPosition, RendaVariavelTipo
+from app.repositories import RendaVariavelPositionsRepository, ResumosRepository
+from app.repositories.tinydb_gateway import TinyDbGateway
+from app.services import RendaVariavelService
+from app.services.cotacoes import (
+    Cotacao,
+    LocalQuoteProvider,
+    QuoteCache,
+    QuoteFetcher,
+    QuoteProviderError,
+    QuoteRefresher,
+)
+
+
+class CountingProvider(LocalQuoteProvider):
+    """Local provider recording the most calls it ever had in flight."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.em_andamento = 0
+        self.pico = 0
+
+    async def cotacoes(self, tickers: Sequence[str]) -> Mapping[str, Cotacao]:
+        self.em_andamento += 1
+        self.pico = max(self.pico, self.em_andamento)
+        try:
+            return await super().cotacoes(tickers)
+        finally:
+            self.em_andamento -= 1
+
+
+class FailingProvider:
+    nome = "falha"
+    max_concorrencia = 1
+    tamanho_lote = 10
+
+    async def cotacoes(self, tickers: Sequence[str]) -> Mapping[str, Cotacao]:
+        raise QuoteProviderError("indisponivel")
+
+
+def test_local_provider_reads_prices_and_timestamps_from_file(tmp_path) -> None:
+    arquivo = tmp_path / "cotacoes.json"
+    arquivo.write_text(
+        json.dumps({"petr4": 37.5, "AAPL": {"preco": 190.0, "cotado_em": "2024-05-02T20:00:00+00:00"}})
+    )
+    provider = LocalQuoteProvider.from_file(arquivo)
+
+    result = asyncio.run(provider.cotacoes(["PETR4", "aapl", "VALE3"]))
+
+    assert set(result) == {"PETR4", "AAPL"}
+    assert result["PETR4"].preco == 37.5
+    assert result["AAPL"].cotado_em == datetime(2024, 5, 2, 20, tzinfo=timezone.utc)
+
+
+def test_local_provider_rejects_invalid_file(tmp_path) -> None:
+    arquivo = tmp_path / "cotacoes.json"
+    arquivo.write_text("[1, 2]")
+
+    with pytest.raises(QuoteProviderError):
+        LocalQuoteProvider.from_file(arquivo)
+
+
+def test_quote_cache_expires_entries_after_ttl() -> None:
+    agora = [100.0]
+    cache = QuoteCache(ttl_seconds=30, clock=lambda: agora[0])
+    cotacao = Cotacao("PETR4", 37.5, datetime.now(timezone.utc))
+    cache.put_many([cotacao])
+
+    assert cache.get_many(["PETR4", "VALE3"]) == ({"PETR4": cotacao}, ["VALE3"])
+    agora[0] = 130.0
+    assert cache.get_many(["PETR4"]) == ({}, ["PETR4"])
+
+
+def test_fetcher_batches_tickers_within_provider_concurrency_limit() -> None:
+    tickers = [f"T{index:03d}" for index in range(300)]
+    provider = CountingProvider(
+        dict.fromkeys(tickers, 10.0), max_concorrencia=3, tamanho_lote=25, latencia=0.02
+    )
+    fetcher = QuoteFetcher({RendaVariavelTipo.ACAO_BR: provider})
+
+    inicio = time.perf_counter()
+    busca = asyncio.run(fetcher.fetch(dict.fromkeys(tickers, RendaVariavelTipo.ACAO_BR)))
+    elapsed = time.perf_counter() - inicio
+
+    assert len(busca.cotacoes) == 300 and busca.falhas == []
+    assert provider.chamadas == 12
+    assert provider.pico == 3
+    # 12 batches, 3 at a time: about 4 round trips rather than 12.
+    assert elapsed < 12 * 0.02
+
+
+def test_fetcher_serves_fresh_quotes_from_cache() -> None:
+    provider = LocalQuoteProvider({"PETR4": 37.5, "VALE3": 60.0})
+    fetcher = QuoteFetcher({RendaVariavelTipo.ACAO_BR: provider}, QuoteCache(60))
+    ativos = {"PETR4": RendaVariavelTipo.ACAO_BR, "VALE3": RendaVariavelTipo.ACAO_BR}
+
+    asyncio.run(fetcher.fetch(ativos))
+    busca = asyncio.run(fetcher.fetch(ativos))
+
+    assert provider.chamadas == 1
+    assert {ticker: cotacao.preco for ticker, cotacao in busca.cotacoes.items()} == {
+        "PETR4": 37.5,
+        "VALE3": 60.0,
+    }
+
+
+def test_fetcher_reports_failures_without_losing_other_providers() -> None:
+    fetcher = QuoteFetcher(
+        {
+            RendaVariavelTipo.ACAO_BR: LocalQuoteProvider({"PETR4": 37.5}),
+            RendaVariavelTipo.STOCK_US: FailingProvider(),
+        }
+    )
+
+    busca = asyncio.run(
+        fetcher.fetch(
+            {
+                "PETR4": RendaVariavelTipo.ACAO_BR,
+                "BBAS3": RendaVariavelTipo.ACAO_BR,
+                "AAPL": RendaVariavelTipo.STOCK_US,
+                "HGLG11": RendaVariavelTipo.FII,
+            }
+        )
+    )
+
+    assert set(busca.cotacoes) == {"PETR4"}
+    assert busca.falhas == ["AAPL", "BBAS3", "HGLG11"]
+
+
+def _position(ticker: str, tipo: RendaVariavelTipo, cotacao: float) -> RendaVariavelPosition:
+    return RendaVariavelPosition(
+        ticker=ticker,
+        tipo=tipo,
+        quantidade=10,
+        preco_medio=10.0,
+        cotacao_atual=cotacao,
+        total_compra=100.0,
+        total_mercado=10 * cotacao,
+        resultado_monetario=10 * cotacao - 100.0,
+        performance_percentual=(cotacao / 10.0 - 1) * 100,
+        peso_percentual=0.0,
+        peso_desejado_percentual=0.0,
+        atualizado_em=datetime.now(timezone.utc),
+    )
+
+
+def test_refresher_pushes_quotes_in_batches(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "cotacoes.json"))
+    positions = RendaVariavelPositionsRepository(gateway)
+    service = RendaVariavelService(positions, resumos_repository=ResumosRepository(gateway))
+    for ticker, tipo in (
+        ("PETR4", RendaVariavelTipo.ACAO_BR),
+        ("HGLG11", RendaVariavelTipo.FII),
+        ("AAPL", RendaVariavelTipo.STOCK_US),
+        ("O", RendaVariavelTipo.REIT),
+    ):
+        positions.create(_position(ticker, tipo, 10.0))
+    provider = LocalQuoteProvider({"PETR4": 12.0, "HGLG11": 10.0, "AAPL": 20.0})
+    updates: list[int] = []
+    update_quotes = service.update_quotes
+
+    def counting_update(cotacoes, positions=None):
+        updates.append(len(cotacoes))
+        return update_quotes(cotacoes, positions)
+
+    service.update_quotes = counting_update  # type: ignore[method-assign]
+    refresher = QuoteRefresher(
+        QuoteFetcher(dict.fromkeys(RendaVariavelTipo, provider)), service, tamanho_lote=2
+    )
+
+    result = refresher.refresh()
+
+    assert result == {"atualizadas": 2, "inalteradas": 1, "falhas": ["O"]}
+    assert updates == [2, 1]
+    stored = {position.ticker: position for position in positions.list()}
+    assert stored["PETR4"].cotacao_atual == 12.0
+    assert stored["PETR4"].total_mercado == pytest.approx(120.0)
+    assert stored["AAPL"].resultado_monetario == pytest.approx(100.0)
+    assert stored["O"].cotacao_atual == 10.0
+    resumo = ResumosRepository(gateway).get("renda_variavel")
+    assert resumo.grupos["tipo"]["acao_br"].totais["total_mercado"] == pytest.approx(120.0)
+
+
+class ConcurrentWriteProvider(LocalQuoteProvider):
+    """Local provider running ``during`` while the fetch is in flight."""
+
+    def __init__(self, precos, during) -> None:
+        super().__init__(precos)
+        self._during = during
+
+    async def cotacoes(self, tickers: Sequence[str]) -> Mapping[str, Cotacao]:
+        self._during()
+        return await super().cotacoes(tickers)
+
+
+def test_refresher_keeps_writes_made_during_the_fetch(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "cotacoes.json"))
+    positions = RendaVariavelPositionsRepository(gateway)
+    service = RendaVariavelService(positions, resumos_repository=ResumosRepository(gateway))
+    petr = positions.create(_position("PETR4", RendaVariavelTipo.ACAO_BR, 10.0))
+    vale = positions.create(_position("VALE3", RendaVariavelTipo.ACAO_BR, 10.0))
+
+    def concurrent_writes() -> None:
+        # A trade lands on PETR4 and VALE3 is deleted while quotes are fetched.
+        positions.update(
+            petr.id,
+            petr.model_copy(update={"quantidade": 15, "total_compra": 150.0}).model_dump(
+                mode="json"
+            ),
+        )
+        positions.delete(vale.id)
+
+    provider = ConcurrentWriteProvider({"PETR4": 12.0, "VALE3": 20.0}, concurrent_writes)
+    refresher = QuoteRefresher(QuoteFetcher(dict.fromkeys(RendaVariavelTipo, provider)), service)
+
+    result = refresher.refresh()
+
+    assert result["atualizadas"] == 1
+    stored = positions.list()
+    assert [position.ticker for position in stored] == ["PETR4"]
+    assert stored[0].quantidade == 15
+    assert stored[0].total_compra == 150.0
+    assert stored[0].cotacao_atual == 12.0
+    assert stored[0].total_mercado == pytest.approx(180.0)
+
+
+def test_update_quotes_writes_only_quote_fields(tmp_path) -> None:
+    gateway = TinyDbGateway.from_file(str(tmp_path / "cotacoes.json"))
+    positions = RendaVariavelPositionsRepository(gateway)
+    service = RendaVariavelService(positions, resumos_repository=ResumosRepository(gateway))
+    stale = positions.create(_position("PETR4", RendaVariavelTipo.ACAO_BR, 10.0))
+    positions.update(
+        stale.id,
+        stale.model_copy(update={"quantidade": 15, "total_compra": 150.0}).model_dump(mode="json"),
+    )
+
+    service.update_quotes({"PETR4": 12.0}, positions=[stale])
+
+    stored = positions.get(stale.id)
+    assert (stored.quantidade, stored.total_compra, stored.cotacao_atual) == (15, 150.0, 12.0)
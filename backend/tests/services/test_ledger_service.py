@@ -0,0 +1,180 @@
+"""Tests for the trade ledger replay engine."""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from app.models import RendaVariavelPosition, RendaVariavelTipo
+from app.repositories import (
+    RendaVariavelCheckpointsRepository,
+    RendaVariavelPositionsRepository,
+    RendaVariavelTradesRepository,
+    ResumosRepository,
+)
+from app.repositories.tinydb_gateway import TinyDbGateway
+from app.services import LedgerService, RendaVariavelService, TradeNotAllowedError
+from app.services import ledger as ledger_module
+from app.services.ledger import Lancamento, Saldo, desfazer, replay
+
+
+def _lancamento(dia: int, tipo_operacao: str, quantidade: float, cotacao: float) -> Lancamento:
+    return Lancamento(f"trade-{dia}", datetime(2024, 1, dia), tipo_operacao, quantidade, cotacao)
+
+
+def test_replay_applies_average_cost_rules() -> None:
+    result = replay(
+        [
+            _lancamento(1, "compra", 10, 10.0),
+            _lancamento(2, "compra", 10, 20.0),
+            _lancamento(3, "venda", 5, 30.0),
+        ]
+    )
+
+    assert result.saldo == Saldo(15.0, 225.0)
+    assert result.saldo.preco_medio == pytest.approx(15.0)
+    venda = result.efeitos[2]
+    assert venda.preco_medio_no_ato == pytest.approx(15.0)
+    assert venda.resultado_monetario == pytest.approx(75.0)
+    assert venda.performance_percentual == pytest.approx(100.0)
+
+
+def test_replay_rejects_selling_more_than_held() -> None:
+    with pytest.raises(TradeNotAllowedError):
+        replay([_lancamento(1, "compra", 1, 10.0), _lancamento(2, "venda", 2, 10.0)])
+
+
+def test_replay_checkpoints_only_between_distinct_dates() -> None:
+    lancamentos = [
+        _lancamento(1, "compra", 1, 10.0),
+        _lancamento(2, "compra", 1, 10.0),
+        _lancamento(2, "compra", 1, 10.0),
+        _lancamento(3, "compra", 1, 10.0),
+        _lancamento(4, "compra", 1, 10.0),
+    ]
+
+    result = replay(lancamentos, Saldo(2.0, 20.0), aplicadas=7, intervalo=2)
+
+    # Day 2 holds two trades, so the first checkpoint waits for day 2 to end.
+    assert [(trades, data.day) for trades, data, _ in result.checkpoints] == [
+        (10, 2),
+        (12, 4),
+    ]
+    assert result.checkpoints[0][2] == Saldo(5.0, 50.0)
+
+
+def test_desfazer_undoes_buys_and_sells() -> None:
+    compra = RendaVariavelTradeStub("compra", 10, 30.0, 25.0)
+    venda = RendaVariavelTradeStub("venda", 5, 40.0, 25.0)
+
+    assert desfazer(Saldo(15.0, 375.0), venda) == Saldo(20.0, 500.0)
+    assert desfazer(Saldo(20.0, 500.0), compra) == Saldo(10.0, 200.0)
+
+
+class RendaVariavelTradeStub:
+    def __init__(self, tipo_operacao: str, quantidade: float, cotacao: float, preco_medio: float):
+        self.tipo_operacao = tipo_operacao
+        self.quantidade = quantidade
+        self.cotacao = cotacao
+        self.preco_medio_no_ato = preco_medio
+
+
+@pytest.fixture()
+def ledger(tmp_path):
+    gateway = TinyDbGateway.from_file(str(tmp_path / "ledger.json"))
+    positions = RendaVariavelPositionsRepository(gateway)
+    trades = RendaVariavelTradesRepository(gateway)
+    checkpoints = RendaVariavelCheckpointsRepository(gateway)
+    service = RendaVariavelService(positions, trades, ResumosRepository(gateway))
+    positions.create(
+        RendaVariavelPosition(
+            id="knri",
+            ticker="KNRI11",
+            tipo=RendaVariavelTipo.FII,
+            quantidade=10,
+            preco_medio=20.0,
+            cotacao_atual=25.0,
+            total_compra=200.0,
+            total_mercado=250.0,
+            resultado_monetario=50.0,
+            performance_percentual=25.0,
+            peso_percentual=0.0,
+            peso_desejado_percentual=0.0,
+            atualizado_em=datetime(2024, 1, 1),
+        ).model_dump(mode="json")
+    )
+    yield LedgerService(service, positions, trades, checkpoints, intervalo=2), service, checkpoints
+    gateway.close()
+
+
+def test_back_dated_trade_replays_later_trades(ledger) -> None:
+    engine, service, checkpoints = ledger
+    engine.record_trade("knri", tipo_operacao="compra", quantidade=10, cotacao=30.0, data=datetime(2024, 3, 1))
+    engine.record_trade("knri", tipo_operacao="venda", quantidade=5, cotacao=35.0, data=datetime(2024, 4, 1))
+
+    position, trade = engine.record_trade(
+        "knri", tipo_operacao="compra", quantidade=10, cotacao=10.0, data=datetime(2024, 2, 1)
+    )
+
+    # Opening 10 @ 20, then 10 @ 10, 10 @ 30 and a sale of 5 at an average of 20.
+    assert position.quantidade == pytest.approx(25.0)
+    assert position.total_compra == pytest.approx(500.0)
+    assert position.preco_medio == pytest.approx(20.0)
+    assert trade.id is not None and trade.preco_medio_no_ato == pytest.approx(15.0)
+    venda = next(item for item in service.list_trades("knri") if item.tipo_operacao == "venda")
+    assert venda.preco_medio_no_ato == pytest.approx(20.0)
+    assert venda.resultado_monetario == pytest.approx(75.0)
+    assert sorted(item.trades for item in checkpoints.list_by_position("knri")) == [0, 2]
+
+
+def test_rebuild_from_checkpoint_matches_full_replay(ledger) -> None:
+    engine, _, checkpoints = ledger
+    for month in range(2, 7):
+        engine.record_trade(
+            "knri", tipo_operacao="compra", quantidade=1, cotacao=10.0 * month, data=datetime(2024, month, 1)
+        )
+    engine.rebuild_position("knri")
+    assert sorted(item.trades for item in checkpoints.list_by_position("knri")) == [0, 2, 4]
+
+    partial = engine.rebuild_position("knri", datetime(2024, 5, 15))
+    full = engine.rebuild_position("knri")
+
+    assert partial.quantidade == full.quantidade == pytest.approx(15.0)
+    assert partial.total_compra == pytest.approx(full.total_compra)
+    assert full.total_compra == pytest.approx(200.0 + 200.0)
+
+
+def test_recompute_all_uses_process_pool(ledger, monkeypatch) -> None:
+    engine, service, _ = ledger
+    engine.record_trade("knri", tipo_operacao="compra", quantidade=10, cotacao=30.0, data=datetime(2024, 3, 1))
+    monkeypatch.setattr(ledger_module, "MIN_POSITIONS_PER_POOL", 1)
+
+    result = engine.recompute_all(workers=2)
+
+    assert result == {"atualizadas": 1, "erros": {}}
+    (position,) = service.list_positions()
+    assert position.quantidade == pytest.approx(20.0)
+    assert position.total_compra == pytest.approx(500.0)
+    assert position.peso_percentual == pytest.approx(100.0)
+
+
+class RecordingPool(ProcessPoolExecutor):
+    """Process pool that remembers the start method it was created with."""
+
+    start_methods: list[str] = []
+
+    def __init__(self, *args, mp_context=None, **kwargs) -> None:
+        self.start_methods.append(mp_context.get_start_method() if mp_context else "default")
+        super().__init__(*args, mp_context=mp_context, **kwargs)
+
+
+def test_recompute_all_spawns_workers_instead_of_forking(ledger, monkeypatch) -> None:
+    engine, _, _ = ledger
+    engine.record_trade("knri", tipo_operacao="compra", quantidade=10, cotacao=30.0, data=datetime(2024, 3, 1))
+    monkeypatch.setattr(ledger_module, "MIN_POSITIONS_PER_POOL", 1)
+    monkeypatch.setattr(ledger_module, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(RecordingPool, "start_methods", [])
+
+    assert engine.recompute_all(workers=2) == {"atualizadas": 1, "erros": {}}
+    assert RecordingPool.start_methods == ["spawn"]
@@ -1,11 +1,14 @@
 """Tests for the renda variavel service helpers."""
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
+from unittest import mock
 
 import pytest
 
-from app.models import RendaVariavelPosition, RendaVariavelTipo, RendaVariavelTrade
+from app.models import RendaVariavelPosition, RendaVariavelTipo, RendaVariavelTrade, Resumo
+from app.repositories import DocumentNotFoundError
 from app.services import RendaVariavelService, TradeNotAllowedError
 
 
@@ -18,9 +21,19 @@ class StubPositionsRepository:
             identifier = item.id or f"position-{index}"
             self._items[identifier] = item.model_copy(update={"id": identifier})
 
-    def list(self) -> list[RendaVariavelPosition]:
+    def list(self, fields: list[str] | None = None) -> list[RendaVariavelPosition]:
         return list(self._items.values())
 
+    def list_by_tipo(
+        self, tipo: RendaVariavelTipo, fields: list[str] | None = None
+    ) -> list[RendaVariavelPosition]:
+        return [item for item in self._items.values() if item.tipo is tipo]
+
+    async def alist_by_tipo(
+        self, tipo: RendaVariavelTipo, fields: list[str] | None = None
+    ) -> list[RendaVariavelPosition]:
+        return self.list_by_tipo(tipo, fields)
+
     def get(self, position_id: str) -> RendaVariavelPosition:
         return self._items[position_id]
 
@@ -30,6 +43,47 @@ class StubPositionsRepository:
         self._items[position_id] = updated
         return updated
 
+    def update_many(self, payloads: dict[str, dict[str, object]]) -> list[RendaVariavelPosition]:
+        return [self.update(position_id, payload) for position_id, payload in payloads.items()]
+
+    def create(self, payload: dict[str, object]) -> RendaVariavelPosition:
+        position = RendaVariavelPosition.model_validate(
+            {**payload, "id": f"position-{len(self._items) + 1}"}
+        )
+        self._items[position.id] = position
+        return position
+
+    def delete(self, position_id: str) -> None:
+        del self._items[position_id]
+
+
+class StubResumosRepository:
+    """In-memory double for the summaries repository."""
+
+    def __init__(self) -> None:
+        self.items: dict[str, Resumo] = {}
+
+    def get(self, dominio: str) -> Resumo:
+        if dominio not in self.items:
+            raise DocumentNotFoundError(dominio)
+        return self.items[dominio].model_copy(deep=True)
+
+    def get_many(self, dominios: list[str]) -> dict[str, Resumo]:
+        return {dominio: self.get(dominio) for dominio in dominios if dominio in self.items}
+
+    def save_many(self, resumos: list[Resumo]) -> None:
+        for resumo in resumos:
+            self.items[resumo.dominio] = resumo.model_copy(deep=True)
+
+    def transform(self, dominio: str, transform) -> Resumo:
+        current = self.items.get(dominio)
+        stored = transform(None if current is None else current.model_copy(deep=True))
+        self.items[dominio] = stored.model_copy(deep=True)
+        return stored
+
+    def total(self, tipo: RendaVariavelTipo) -> float:
+        return self.items["renda_variavel"].grupos["tipo"][tipo.value].totais["total_mercado"]
+
 
 class StubTradesRepository:
     """In-memory repository double for renda variavel trades."""
@@ -100,6 +154,59 @@ def test_list_positions_grouped_respects_requested_tipos() -> None:
     assert [item.ticker for item in grouped[RendaVariavelTipo.FII]] == ["VISC11"]
 
 
+def test_alist_positions_grouped_queries_tipos_concurrently() -> None:
+    repository = StubPositionsRepository(
+        [
+            _make_position("IVVB11", RendaVariavelTipo.ETF),
+            _make_position("VISC11", RendaVariavelTipo.FII),
+        ]
+    )
+    in_flight: list[int] = [0, 0]
+
+    async def slow_list_by_tipo(
+        tipo: RendaVariavelTipo, fields: list[str] | None = None
+    ) -> list[RendaVariavelPosition]:
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        return repository.list_by_tipo(tipo)
+
+    repository.alist_by_tipo = slow_list_by_tipo  # type: ignore[method-assign]
+    service = RendaVariavelService(repository)
+
+    grouped = asyncio.run(
+        service.alist_positions_grouped((RendaVariavelTipo.ETF, RendaVariavelTipo.FII))
+    )
+
+    assert in_flight[1] == 2
+    assert [item.ticker for item in grouped[RendaVariavelTipo.ETF]] == ["IVVB11"]
+    assert [item.ticker for item in grouped[RendaVariavelTipo.FII]] == ["VISC11"]
+
+
+def test_alist_positions_by_tipo_recovers_from_corrupt_documents_without_blocking() -> None:
+    healthy = _make_position("HGLG11", RendaVariavelTipo.FII, identifier="p-1")
+    repository = StubPositionsRepository([healthy])
+
+    async def corrupt_list_by_tipo(
+        tipo: RendaVariavelTipo, fields: list[str] | None = None
+    ) -> list[RendaVariavelPosition]:
+        return [RendaVariavelPosition.model_validate({"ticker": "XPTO11"})]
+
+    async def alist_raw_documents() -> list[dict[str, object]]:
+        return [healthy.model_dump(mode="json"), {"id": "p-2", "ticker": "XPTO11"}]
+
+    repository.alist_by_tipo = corrupt_list_by_tipo  # type: ignore[method-assign]
+    repository.alist_raw_documents = alist_raw_documents  # type: ignore[attr-defined]
+    # The synchronous reads would block the event loop.
+    repository.list = mock.Mock(side_effect=AssertionError("leitura sincrona"))  # type: ignore[method-assign]
+    service = RendaVariavelService(repository)
+
+    positions = asyncio.run(service.alist_positions_by_tipo(RendaVariavelTipo.FII))
+
+    assert [item.ticker for item in positions] == ["HGLG11"]
+
+
 def test_record_trade_compra_updates_position_totals() -> None:
     positions = StubPositionsRepository(
         [_make_position("HGLG11", RendaVariavelTipo.FII, identifier="position-1")]
@@ -156,3 +263,54 @@ def test_record_trade_venda_rejects_excess_quantity() -> None:
             quantidade=50,
             cotacao=18.0,
         )
+
+
+def test_position_writes_adjust_the_tipo_aggregate_incrementally() -> None:
+    positions = StubPositionsRepository(
+        [_make_position("HGLG11", RendaVariavelTipo.FII, identifier="position-1")]
+    )
+    resumos = StubResumosRepository()
+    service = RendaVariavelService(positions, StubTradesRepository(), resumos)
+
+    created = service.create_position(
+        _make_position("KNRI11", RendaVariavelTipo.FII).model_copy(update={"total_mercado": 22.0})
+    )
+    assert resumos.total(RendaVariavelTipo.FII) == pytest.approx(200.0)
+    assert created.peso_percentual == pytest.approx(11.0)
+
+    with mock.patch.object(positions, "update_many") as rewrite_all:
+        updated, _ = service.record_trade(
+            "position-1", tipo_operacao="venda", quantidade=5, cotacao=17.8
+        )
+    rewrite_all.assert_not_called()
+    assert resumos.total(RendaVariavelTipo.FII) == pytest.approx(89.0 + 22.0)
+    assert updated.peso_percentual == pytest.approx(89.0 / 111.0 * 100)
+    # The other position keeps its stored peso; reads derive the current one.
+    assert positions.get(created.id).peso_percentual == pytest.approx(11.0)
+    listed = {item.ticker: item for item in service.list_positions_by_tipo(RendaVariavelTipo.FII)}
+    assert listed["KNRI11"].peso_percentual == pytest.approx(22.0 / 111.0 * 100)
+
+    service.delete_position("position-1")
+    assert resumos.total(RendaVariavelTipo.FII) == pytest.approx(22.0)
+    assert resumos.items["renda_variavel"].grupos["moeda"]["brl"].quantidade == 1
+
+
+def test_recalculate_pesos_rebuilds_a_drifted_aggregate() -> None:
+    positions = StubPositionsRepository(
+        [
+            _make_position("IVVB11", RendaVariavelTipo.ETF),
+            _make_position("BOVA11", RendaVariavelTipo.ETF),
+        ]
+    )
+    resumos = StubResumosRepository()
+    service = RendaVariavelService(positions, resumos_repository=resumos)
+    drifted = service.create_position(_make_position("SMAL11", RendaVariavelTipo.ETF))
+    del positions._items[drifted.id]
+
+    recalculated = service.recalculate_pesos(RendaVariavelTipo.ETF)
+
+    assert resumos.total(RendaVariavelTipo.ETF) == pytest.approx(356.0)
+    assert [item.peso_percentual for item in recalculated] == [
+        pytest.approx(50.0),
+        pytest.approx(50.0),
+    ]
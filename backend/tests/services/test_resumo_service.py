@@ -0,0 +1,92 @@
+"""Tests for the per-dominio summary service."""
+from __future__ import annotations
+
+import pytest
+
+from app.models import Passivo, PassivoCategoria, Resumo
+from app.repositories import DocumentNotFoundError
+from app.services import ResumoService
+from app.services.resumo import DOMINIOS, PASSIVOS
+
+
+class StubResumosRepository:
+    """In-memory double for the summaries repository."""
+
+    def __init__(self) -> None:
+        self.items: dict[str, Resumo] = {}
+
+    def get(self, dominio: str) -> Resumo:
+        if dominio not in self.items:
+            raise DocumentNotFoundError(dominio)
+        return self.items[dominio].model_copy(deep=True)
+
+    def get_many(self, dominios: list[str]) -> dict[str, Resumo]:
+        return {dominio: self.get(dominio) for dominio in dominios if dominio in self.items}
+
+    def save_many(self, resumos: list[Resumo]) -> None:
+        for resumo in resumos:
+            self.items[resumo.dominio] = resumo.model_copy(deep=True)
+
+    def transform(self, dominio: str, transform) -> Resumo:
+        current = self.items.get(dominio)
+        stored = transform(None if current is None else current.model_copy(deep=True))
+        self.items[dominio] = stored.model_copy(deep=True)
+        return stored
+
+
+def _passivo(categoria: PassivoCategoria, saldo: float) -> Passivo:
+    return Passivo(nome=f"{categoria.value} {saldo}", categoria=categoria, saldo_atual=saldo)
+
+
+def test_with_delta_rebuilds_missing_summary_then_applies_change() -> None:
+    stored = [_passivo(PassivoCategoria.CARTAO, 100.0)]
+    service = ResumoService(StubResumosRepository(), {PASSIVOS: lambda: stored})
+
+    resumo = service.with_delta(PASSIVOS, None, _passivo(PassivoCategoria.CARTAO, 50.0))
+
+    cartao = resumo.grupos["categoria"]["cartao"]
+    assert cartao.quantidade == 2
+    assert cartao.totais == {"saldo_atual": pytest.approx(150.0)}
+
+
+def test_with_delta_drops_groups_left_empty() -> None:
+    repository = StubResumosRepository()
+    stored = [_passivo(PassivoCategoria.CARTAO, 100.0), _passivo(PassivoCategoria.EMPRESTIMO, 30.0)]
+    service = ResumoService(repository, {PASSIVOS: lambda: stored})
+    service.save(service.rebuild(PASSIVOS))
+
+    resumo = service.with_delta(PASSIVOS, stored[0], None)
+
+    assert list(resumo.grupos["categoria"]) == ["emprestimo"]
+
+
+def test_list_saves_only_rebuilt_summaries() -> None:
+    repository = StubResumosRepository()
+    loaders = {dominio: list for dominio in DOMINIOS}
+    service = ResumoService(repository, loaders)
+    service.save(service.rebuild(PASSIVOS))
+    stored_at = repository.items[PASSIVOS].atualizado_em
+
+    resumos = service.list()
+
+    assert [resumo.dominio for resumo in resumos] == list(DOMINIOS)
+    assert set(repository.items) == set(DOMINIOS)
+    assert repository.items[PASSIVOS].atualizado_em == stored_at
+
+
+def test_save_keeps_deltas_computed_from_the_same_stale_read() -> None:
+    repository = StubResumosRepository()
+    stored = [_passivo(PassivoCategoria.CARTAO, 100.0)]
+    service = ResumoService(repository, {PASSIVOS: lambda: stored})
+    service.save(service.rebuild(PASSIVOS))
+
+    # Two writers read the summary before either of them saved.
+    primeiro = service.with_delta(PASSIVOS, None, _passivo(PassivoCategoria.CARTAO, 50.0))
+    segundo = service.with_delta(PASSIVOS, None, _passivo(PassivoCategoria.CARTAO, 20.0))
+    service.save(primeiro)
+    service.save(segundo)
+
+    cartao = repository.items[PASSIVOS].grupos["categoria"]["cartao"]
+    assert cartao.quantidade == 3
+    assert cartao.totais == {"saldo_atual": pytest.approx(170.0)}
+    assert not repository.items[PASSIVOS].mudancas